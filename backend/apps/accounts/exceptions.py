@@ -0,0 +1,2 @@
+class InsufficientBalance(ValueError):
+    """Raised when a debit or hold is more than the available balance covers"""
@@ -0,0 +1,90 @@
+"""
+Balance holds for auctions a user is leading.
+
+While a user leads an auction, its current price is held in
+``User.reserved_balance`` and is not available for other bids, so bid
+validation only compares the bid with ``balance - reserved_balance`` on
+the user row. The bid engine moves holds in the bid transaction when the
+lead or the price changes, checking the increase of whoever leads,
+including a proxy that answers automatically. Hot lots take a hold for every bid they accept
+and the hot-lot flush releases those of the bids it writes as outbid. The
+closer releases the leaders' holds in bulk when auctions end.
+
+Holds are moved with one UPDATE for all users involved. An increase for a
+user listed in ``checked`` only applies if their available balance
+covers it; a hold never drops below zero.
+"""
+from collections import Counter
+
+from django.db import connection
+
+from .exceptions import InsufficientBalance
+
+MOVE_SQL = """
+    UPDATE users u
+    SET reserved_balance = greatest(u.reserved_balance + d.delta, 0)
+    FROM (
+        SELECT unnest(%s::bigint[]) AS id,
+               unnest(%s::numeric[]) AS delta,
+               unnest(%s::boolean[]) AS checked
+    ) d
+    WHERE u.id = d.id
+      AND (NOT d.checked OR d.delta <= 0 OR u.balance - u.reserved_balance >= d.delta)
+    RETURNING u.id
+"""
+
+COVER_SQL = """
+    SELECT balance - reserved_balance >= %s FROM users WHERE id = %s FOR UPDATE
+"""
+
+
+def move(changes, checked=()):
+    """
+    Apply ``{user_id: delta}`` to the users' holds.
+
+    Raises InsufficientBalance if a user in ``checked`` cannot cover an
+    increase; call it inside the transaction that changes the lead so
+    nothing is applied then.
+    """
+    changes = {user_id: delta for user_id, delta in changes.items() if user_id and delta}
+    if not changes:
+        return
+
+    user_ids = sorted(changes)
+    with connection.cursor() as cursor:
+        cursor.execute(MOVE_SQL, [
+            user_ids,
+            [changes[user_id] for user_id in user_ids],
+            [user_id in checked for user_id in user_ids],
+        ])
+        applied = {user_id for user_id, in cursor.fetchall()}
+
+    if any(user_id not in applied for user_id in checked if changes.get(user_id, 0) > 0):
+        raise InsufficientBalance("Insufficient balance")
+
+
+def can_cover(user_id, amount):
+    """Check, locking the user row, if the user's available balance covers ``amount``"""
+    with connection.cursor() as cursor:
+        cursor.execute(COVER_SQL, [amount, user_id])
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def lead_changed(previous_leader_id, previous_price, leader_id, price):
+    """Changes for a lead passing from one user and price to another"""
+    changes = Counter()
+    if previous_leader_id:
+        changes[previous_leader_id] -= previous_price
+    if leader_id:
+        changes[leader_id] += price
+    return changes
+
+
+def release(leads):
+    """Release the holds of ended auctions, given as ``(leader_id, price)`` pairs"""
+    changes = Counter()
+    for leader_id, price in leads:
+        if leader_id:
+            changes[leader_id] -= price
+    move(changes)
@@ -0,0 +1,177 @@
+"""
+Balance ledger.
+
+Every balance change is a completed UserTransaction, and the balance is
+only ever moved in the database, never read-modify-written in Python:
+
+* ``post`` applies one entry in its own transaction: a single
+  ``UPDATE users SET balance = balance + delta`` that, for debits, only
+  matches while the available balance (``balance - reserved_balance``,
+  see apps.accounts.holds) covers the amount, followed by the transaction
+  row. A debit that does not fit raises InsufficientBalance and leaves
+  nothing behind. Credits always apply.
+* A debit that settles money held for the user, such as paying for a won
+  auction, passes the amount as ``held``: it is taken out of
+  ``reserved_balance`` in the same UPDATE, so only the rest of the debit
+  has to be available.
+* ``post_batch`` applies many entries with one UPDATE over all users
+  involved. A user's entries are accepted or rejected together, based on
+  the net change; rejected entries are recorded as failed transactions.
+* ``reconcile`` checks that each balance equals the sum of the user's
+  completed transactions. Balances from before the ledger were opened
+  with one adjustment entry each (accounts migration 0004).
+"""
+from collections import defaultdict
+from decimal import Decimal
+import logging
+
+from django.db import connection, transaction
+
+from .exceptions import InsufficientBalance
+from .models import UserTransaction
+
+logger = logging.getLogger(__name__)
+
+CREDIT_TYPES = ('deposit', 'refund', 'bonus', 'adjustment_credit')
+DEBIT_TYPES = ('withdraw', 'bid', 'payment', 'penalty', 'adjustment_debit')
+
+POST_SQL = """
+    UPDATE users
+    SET balance = balance + %(delta)s,
+        reserved_balance = reserved_balance - %(held)s
+    WHERE id = %(user_id)s
+      AND reserved_balance >= %(held)s
+      AND (%(delta)s >= 0 OR balance - reserved_balance + %(held)s + %(delta)s >= 0)
+    RETURNING balance, reserved_balance
+"""
+
+POST_BATCH_SQL = """
+    UPDATE users u SET balance = u.balance + d.delta
+    FROM (
+        SELECT unnest(%s::bigint[]) AS id,
+               unnest(%s::numeric[]) AS delta
+    ) d
+    WHERE u.id = d.id AND (d.delta >= 0 OR u.balance - u.reserved_balance + d.delta >= 0)
+    RETURNING u.id, u.balance
+"""
+
+RECONCILE_SQL = """
+    SELECT u.id, u.balance, coalesce(t.total, 0)
+    FROM users u
+    LEFT JOIN (
+        SELECT user_id,
+               sum(CASE WHEN transaction_type = ANY(%s) THEN amount ELSE -amount END) AS total
+        FROM user_transactions
+        WHERE status = 'completed'
+        GROUP BY user_id
+    ) t ON t.user_id = u.id
+    WHERE u.balance <> coalesce(t.total, 0)
+    ORDER BY u.id
+"""
+
+
+def signed_amount(transaction_type, amount):
+    """The change to the balance made by a transaction"""
+    amount = Decimal(amount)
+    if transaction_type in CREDIT_TYPES:
+        return amount
+    if transaction_type in DEBIT_TYPES:
+        return -amount
+    raise ValueError(f"Unknown transaction type: {transaction_type}")
+
+
+def apply(user_id, delta, held=0):
+    """
+    Move a balance by ``delta`` without recording a transaction, settling
+    ``held`` of it from the user's hold; returns the new ``(balance,
+    reserved_balance)``.
+
+    Raises InsufficientBalance if a debit is more than the available
+    balance plus ``held``, or ``held`` is more than the hold. Call it
+    inside the transaction that records the change.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(POST_SQL, {'user_id': user_id, 'delta': delta, 'held': held})
+        row = cursor.fetchone()
+    if row is None:
+        raise InsufficientBalance("Insufficient balance")
+    return row
+
+
+def post(user, transaction_type, amount, held=0, **fields):
+    """
+    Record a completed transaction and apply it to the user's balance.
+
+    For a debit, ``held`` is the part of the amount paid out of the user's
+    hold. Returns the transaction; ``user.balance`` and
+    ``user.reserved_balance`` are updated to the new values.
+    """
+    amount = Decimal(amount)
+    held = Decimal(held)
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    delta = signed_amount(transaction_type, amount)
+    if held < 0 or held > amount or (held and delta > 0):
+        raise ValueError("Only debits can be paid from a hold, up to their amount")
+
+    with transaction.atomic():
+        balance, reserved_balance = apply(user.pk, delta, held)
+        entry = UserTransaction(
+            user=user,
+            transaction_type=transaction_type,
+            amount=amount,
+            status='completed',
+            **fields,
+        )
+        entry._balance_applied = True
+        entry.save()
+
+    user.balance = balance
+    user.reserved_balance = reserved_balance
+    return entry
+
+
+def post_batch(entries):
+    """
+    Apply many unsaved UserTransaction instances at once.
+
+    Returns ``(posted, failed)``. Entries of users whose balance cannot
+    cover their net change are saved as failed transactions.
+    """
+    entries = list(entries)
+    if not entries:
+        return [], []
+
+    deltas = defaultdict(Decimal)
+    for entry in entries:
+        deltas[entry.user_id] += signed_amount(entry.transaction_type, entry.amount)
+    user_ids = sorted(deltas)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(POST_BATCH_SQL, [user_ids, [deltas[user_id] for user_id in user_ids]])
+            applied = dict(cursor.fetchall())
+
+        posted, failed = [], []
+        for entry in entries:
+            if entry.user_id in applied:
+                entry.status = 'completed'
+                posted.append(entry)
+            else:
+                entry.status = 'failed'
+                failed.append(entry)
+        UserTransaction.objects.bulk_create(entries)
+
+    if failed:
+        logger.warning(
+            f"Rejected {len(failed)} ledger entries for "
+            f"{len(deltas) - len(applied)} users with insufficient balance"
+        )
+    return posted, failed
+
+
+def reconcile():
+    """Get ``[(user_id, balance, ledger_total)]`` for balances that do not match the ledger"""
+    with connection.cursor() as cursor:
+        cursor.execute(RECONCILE_SQL, [list(CREDIT_TYPES)])
+        return cursor.fetchall()
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:41
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_create_user'),
+        ('auctions', '0006_item_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='reserved_balance',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        # Hold the current price of every auction a user is leading
+        migrations.RunSQL(
+            sql="""
+                UPDATE users u SET reserved_balance = h.held
+                FROM (
+                    SELECT b.bidder_id, sum(i.current_price) AS held
+                    FROM auction_items i
+                    JOIN auction_bids b ON b.id = i.leading_bid_id
+                    WHERE i.status = 'active'
+                    GROUP BY b.bidder_id
+                ) h
+                WHERE u.id = h.bidder_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_reserved_balance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='usertransaction',
+            name='transaction_type',
+            field=models.CharField(choices=[('deposit', 'Deposit'), ('withdraw', 'Withdrawal'), ('bid', 'Bid Placed'), ('refund', 'Bid Refund'), ('payment', 'Payment'), ('bonus', 'Bonus'), ('penalty', 'Penalty'), ('adjustment_credit', 'Balance Adjustment'), ('adjustment_debit', 'Balance Adjustment Debit')], max_length=20),
+        ),
+        # Open the ledger at each user's current balance: balances moved
+        # outside it before (such as deposits the old signal applied twice)
+        # get one completed adjustment for the difference, so reconcile
+        # starts from zero mismatches
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO user_transactions
+                    (user_id, transaction_type, amount, status, description, reference_id,
+                     created_at, updated_at)
+                SELECT u.id,
+                       CASE WHEN u.balance > coalesce(t.total, 0)
+                            THEN 'adjustment_credit' ELSE 'adjustment_debit' END,
+                       abs(u.balance - coalesce(t.total, 0)),
+                       'completed', 'Opening balance', 'opening_balance', now(), now()
+                FROM users u
+                LEFT JOIN (
+                    SELECT user_id,
+                           sum(CASE WHEN transaction_type IN ('deposit', 'refund', 'bonus')
+                                    THEN amount ELSE -amount END) AS total
+                    FROM user_transactions
+                    WHERE status = 'completed'
+                    GROUP BY user_id
+                ) t ON t.user_id = u.id
+                WHERE u.balance <> coalesce(t.total, 0)
+            """,
+            reverse_sql="""
+                DELETE FROM user_transactions
+                WHERE reference_id = 'opening_balance'
+                  AND transaction_type IN ('adjustment_credit', 'adjustment_debit')
+            """,
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
 from phonenumber_field.modelfields import PhoneNumberField
@@ -36,6 +36,13 @@ class User(AbstractUser):
         default=0.00,
         validators=[MinValueValidator(0)]
     )
+    # Held against auctions the user is leading (see apps.accounts.holds)
+    reserved_balance = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0.00,
+        validators=[MinValueValidator(0)]
+    )
 
     # Bot Integration
     api_key = models.CharField(max_length=64, unique=True, blank=True)
@@ -118,22 +125,31 @@ class User(AbstractUser):
         self.save()
         return self.api_key
 
-    def can_bid(self, amount):
-        """Check if user can place a bid of given amount"""
-        return self.balance >= amount and not self.is_banned
+    @property
+    def available_balance(self):
+        """Balance not held against leading bids"""
+        return self.balance - self.reserved_balance
 
-    def deduct_balance(self, amount):
-        """Deduct amount from user balance"""
-        if self.balance >= amount:
-            self.balance -= amount
-            self.save()
-            return True
-        return False
+    def can_bid(self, amount, held=0):
+        """Check if user can place a bid of given amount, on top of what is already held for it"""
+        return self.available_balance + held >= amount and not self.is_banned
 
-    def add_balance(self, amount):
-        """Add amount to user balance"""
-        self.balance += amount
-        self.save()
+    def deduct_balance(self, amount, transaction_type='withdraw', **fields):
+        """Deduct amount from user balance, recording the transaction"""
+        from .exceptions import InsufficientBalance
+        from .ledger import post
+
+        try:
+            post(self, transaction_type, amount, **fields)
+        except InsufficientBalance:
+            return False
+        return True
+
+    def add_balance(self, amount, transaction_type='deposit', **fields):
+        """Add amount to user balance, recording the transaction"""
+        from .ledger import post
+
+        return post(self, transaction_type, amount, **fields)
 
     def update_rating(self, new_rating):
         """Update user rating"""
@@ -243,6 +259,8 @@ class UserTransaction(models.Model):
         ('payment', 'Payment'),
         ('bonus', 'Bonus'),
         ('penalty', 'Penalty'),
+        ('adjustment_credit', 'Balance Adjustment'),
+        ('adjustment_debit', 'Balance Adjustment Debit'),
     ]
 
     TRANSACTION_STATUS = [
@@ -285,6 +303,26 @@ class UserTransaction(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.transaction_type} - {self.amount}"
 
+    def save(self, *args, **kwargs):
+        """
+        Save the transaction. A completed one created outside
+        apps.accounts.ledger moves the balance in the same database
+        transaction, and is saved as failed if the balance cannot cover it.
+        """
+        if not (self._state.adding and self.status == 'completed' and not getattr(self, '_balance_applied', False)):
+            return super().save(*args, **kwargs)
+
+        from .exceptions import InsufficientBalance
+        from .ledger import apply, signed_amount
+
+        with transaction.atomic():
+            try:
+                apply(self.user_id, signed_amount(self.transaction_type, self.amount))
+            except InsufficientBalance:
+                self.status = 'failed'
+            self._balance_applied = True
+            super().save(*args, **kwargs)
+
 
 class UserVerification(models.Model):
     """User verification records"""
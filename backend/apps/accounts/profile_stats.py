@@ -0,0 +1,217 @@
+"""
+Incremental maintenance of the auction statistics on UserProfile.
+
+The bid engine, the hot-lot flush and the auction closer pass per-user
+deltas here inside their own transactions, so the counters move
+atomically with the bids and results they describe:
+
+* ``total_bids``        - bids placed by the user (proxy bids included);
+* ``total_wins``        - auctions won;
+* ``total_spent``       - final prices of auctions won;
+* ``total_earned``      - final prices of the user's items that sold;
+* ``total_items_sold``  - the user's items that sold.
+
+All deltas of a call are applied with one UPDATE, locking the profiles in
+user id order.
+
+``recompute`` rebuilds the figures from bids and items with three grouped
+queries per chunk of users and writes back only the profiles that differ.
+In incremental mode it only looks at users with bids or item changes
+since the previous run.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LAST_RUN_KEY = 'accounts:profile_stats:last_run'
+
+# Incremental runs look back this far before the previous run, to catch
+# transactions that were still open when it started
+OVERLAP = timedelta(minutes=5)
+
+FIELDS = ('total_bids', 'total_wins', 'total_spent', 'total_earned', 'total_items_sold')
+
+ADJUST_SQL = """
+    UPDATE user_profiles p
+    SET total_bids = p.total_bids + d.total_bids,
+        total_wins = p.total_wins + d.total_wins,
+        total_spent = p.total_spent + d.total_spent,
+        total_earned = p.total_earned + d.total_earned,
+        total_items_sold = p.total_items_sold + d.total_items_sold
+    FROM (
+        SELECT unnest(%s::bigint[]) AS user_id,
+               unnest(%s::integer[]) AS total_bids,
+               unnest(%s::integer[]) AS total_wins,
+               unnest(%s::numeric[]) AS total_spent,
+               unnest(%s::numeric[]) AS total_earned,
+               unnest(%s::integer[]) AS total_items_sold
+    ) d
+    WHERE p.user_id = d.user_id
+"""
+
+# Users with activity since a point in time
+ACTIVE_USERS_SQL = """
+    SELECT bidder_id FROM auction_bids WHERE created_at >= %(since)s
+    UNION
+    SELECT winner_id FROM auction_items WHERE updated_at >= %(since)s AND winner_id IS NOT NULL
+    UNION
+    SELECT seller_id FROM auction_items WHERE updated_at >= %(since)s
+"""
+
+# Profiles of the given users whose stored figures are out of date, with
+# the recomputed figures
+STALE_PROFILES_SQL = """
+    SELECT p.id,
+           coalesce(b.total_bids, 0),
+           coalesce(w.total_wins, 0),
+           coalesce(w.total_spent, 0),
+           coalesce(s.total_earned, 0),
+           coalesce(s.total_items_sold, 0)
+    FROM user_profiles p
+    LEFT JOIN (
+        SELECT bidder_id, count(*) AS total_bids
+        FROM auction_bids
+        WHERE bidder_id = ANY(%(users)s)
+        GROUP BY bidder_id
+    ) b ON b.bidder_id = p.user_id
+    LEFT JOIN (
+        SELECT winner_id, count(*) AS total_wins,
+               sum(current_price) FILTER (WHERE status = 'sold') AS total_spent
+        FROM auction_items
+        WHERE winner_id = ANY(%(users)s)
+        GROUP BY winner_id
+    ) w ON w.winner_id = p.user_id
+    LEFT JOIN (
+        SELECT seller_id, count(*) AS total_items_sold, sum(current_price) AS total_earned
+        FROM auction_items
+        WHERE seller_id = ANY(%(users)s) AND status = 'sold'
+        GROUP BY seller_id
+    ) s ON s.seller_id = p.user_id
+    WHERE p.user_id = ANY(%(users)s)
+      AND (p.total_bids, p.total_wins, p.total_spent, p.total_earned, p.total_items_sold)
+          IS DISTINCT FROM
+          (coalesce(b.total_bids, 0), coalesce(w.total_wins, 0), coalesce(w.total_spent, 0),
+           coalesce(s.total_earned, 0), coalesce(s.total_items_sold, 0))
+"""
+
+
+def deltas():
+    """Get an empty ``{user_id: Counter}`` to collect deltas in"""
+    return defaultdict(Counter)
+
+
+def adjust(changes):
+    """Apply ``{user_id: {field: delta}}`` to the users' profiles"""
+    user_ids = sorted(user_id for user_id, fields in changes.items() if any(fields.values()))
+    if not user_ids:
+        return
+
+    columns = [user_ids]
+    for field in FIELDS:
+        default = Decimal('0') if field in ('total_spent', 'total_earned') else 0
+        columns.append([changes[user_id].get(field, default) for user_id in user_ids])
+
+    with connection.cursor() as cursor:
+        cursor.execute(ADJUST_SQL, columns)
+
+
+def bids_placed(bidder_ids):
+    """Deltas for bids placed, one bidder id per bid"""
+    changes = deltas()
+    for bidder_id in bidder_ids:
+        changes[bidder_id]['total_bids'] += 1
+    return changes
+
+
+def auctions_settled(results):
+    """Deltas for settled auctions, given the closer's result rows"""
+    changes = deltas()
+    for result in results:
+        if result['sold']:
+            price = result['current_price']
+            changes[result['bidder_id']]['total_wins'] += 1
+            changes[result['bidder_id']]['total_spent'] += price
+            changes[result['seller_id']]['total_items_sold'] += 1
+            changes[result['seller_id']]['total_earned'] += price
+    return changes
+
+
+def _user_chunks(since, batch_size):
+    from .models import UserProfile
+
+    if since is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(ACTIVE_USERS_SQL, {'since': since})
+            user_ids = sorted(user_id for user_id, in cursor.fetchall())
+        for start in range(0, len(user_ids), batch_size):
+            yield user_ids[start:start + batch_size]
+        return
+
+    last_id = 0
+    while True:
+        user_ids = list(
+            UserProfile.objects.filter(user_id__gt=last_id)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return
+        yield user_ids
+        last_id = user_ids[-1]
+
+
+def _recompute_chunk(user_ids):
+    from .models import UserProfile
+
+    with connection.cursor() as cursor:
+        cursor.execute(STALE_PROFILES_SQL, {'users': user_ids})
+        rows = cursor.fetchall()
+
+    profiles = [
+        UserProfile(id=profile_id, **dict(zip(
+            ('total_bids', 'total_wins', 'total_spent', 'total_earned', 'total_items_sold'),
+            values,
+        )))
+        for profile_id, *values in rows
+    ]
+    if profiles:
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(profiles, FIELDS)
+    return len(profiles)
+
+
+def recompute(incremental=False, batch_size=1000):
+    """
+    Recompute profile statistics from bids and items.
+
+    With ``incremental`` only users active since the previous run are
+    checked; without a previous run everyone is. Returns ``(checked,
+    updated, elapsed)``.
+    """
+    started_at = timezone.now()
+    started = time.perf_counter()
+    since = cache.get(LAST_RUN_KEY) if incremental else None
+    if since is not None:
+        since -= OVERLAP
+
+    checked = updated = 0
+    for user_ids in _user_chunks(since, batch_size):
+        updated += _recompute_chunk(user_ids)
+        checked += len(user_ids)
+
+    cache.set(LAST_RUN_KEY, started_at, None)
+    elapsed = time.perf_counter() - started
+    rate = checked / elapsed if elapsed else 0
+    logger.info(
+        f"Recomputed statistics for {checked} users ({updated} updated) "
+        f"in {elapsed:.1f}s, {rate:.0f} rows/s"
+    )
+    return checked, updated, elapsed
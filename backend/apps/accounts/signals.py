@@ -6,7 +6,7 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-from .models import User, UserProfile, UserTransaction, UserVerification
+from .models import User, UserProfile, UserVerification
 from apps.notifications.models import Notification
 import logging
 
@@ -24,19 +24,6 @@ def create_user_profile(sender, instance, created, **kwargs):
             logger.error(f"Error creating profile for user {instance.username}: {e}")
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    try:
-        if hasattr(instance, 'profile'):
-            instance.profile.save()
-        else:
-            # Create profile if it doesn't exist
-            UserProfile.objects.create(user=instance)
-    except Exception as e:
-        logger.error(f"Error saving profile for user {instance.username}: {e}")
-
-
 @receiver(post_save, sender=User)
 def send_welcome_notification(sender, instance, created, **kwargs):
     """Send welcome notification to new users"""
@@ -81,10 +68,6 @@ def user_logged_in_handler(sender, request, user, **kwargs):
                 user.last_login_ip = ip.split(',')[0].strip()
                 user.save(update_fields=['last_login_ip'])
 
-        # Update profile last login
-        if hasattr(user, 'profile'):
-            user.profile.save()
-
         logger.info(f"User {user.username} logged in from IP: {user.last_login_ip}")
     except Exception as e:
         logger.error(f"Error handling login for user {user.username}: {e}")
@@ -100,35 +83,6 @@ def user_logged_out_handler(sender, request, user, **kwargs):
         logger.error(f"Error handling logout: {e}")
 
 
-@receiver(post_save, sender=UserTransaction)
-def update_user_balance(sender, instance, created, **kwargs):
-    """Update user balance when transaction is completed"""
-    if instance.status == 'completed' and created:
-        try:
-            user = instance.user
-
-            # Update balance based on transaction type
-            if instance.transaction_type in ['deposit', 'refund', 'bonus']:
-                user.balance += instance.amount
-            elif instance.transaction_type in ['withdraw', 'bid', 'payment', 'penalty']:
-                user.balance -= instance.amount
-
-            user.save(update_fields=['balance'])
-
-            # Update profile statistics
-            if hasattr(user, 'profile'):
-                profile = user.profile
-                if instance.transaction_type == 'deposit':
-                    profile.total_spent += instance.amount
-                elif instance.transaction_type == 'payment':
-                    profile.total_earned += instance.amount
-                profile.save(update_fields=['total_spent', 'total_earned'])
-
-            logger.info(f"Updated balance for user {user.username}: {instance.transaction_type} ${instance.amount}")
-        except Exception as e:
-            logger.error(f"Error updating balance for transaction {instance.id}: {e}")
-
-
 @receiver(post_save, sender=UserVerification)
 def handle_verification_status(sender, instance, created, **kwargs):
     """Handle verification status changes"""
@@ -160,14 +114,19 @@ def handle_verification_status(sender, instance, created, **kwargs):
 
 
 @receiver(pre_save, sender=User)
-def handle_user_status_changes(sender, instance, **kwargs):
+def handle_user_status_changes(sender, instance, update_fields=None, **kwargs):
     """Handle user status changes (ban, suspension, etc.)"""
+    if update_fields is not None and not {'is_banned', 'is_verified'} & set(update_fields):
+        return
+
     if instance.pk:
         try:
-            old_user = User.objects.get(pk=instance.pk)
+            was_banned, was_verified = User.objects.values_list(
+                'is_banned', 'is_verified'
+            ).get(pk=instance.pk)
 
             # Handle ban status change
-            if old_user.is_banned != instance.is_banned:
+            if was_banned != instance.is_banned:
                 if instance.is_banned:
                     # User was banned
                     Notification.objects.create(
@@ -190,7 +149,7 @@ def handle_user_status_changes(sender, instance, **kwargs):
                     logger.info(f"User {instance.username} was unbanned")
 
             # Handle verification status change
-            if old_user.is_verified != instance.is_verified and instance.is_verified:
+            if was_verified != instance.is_verified and instance.is_verified:
                 logger.info(f"User {instance.username} verification status changed to verified")
 
         except User.DoesNotExist:
@@ -213,8 +172,11 @@ def handle_user_deletion(sender, instance, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def update_telegram_integration(sender, instance, **kwargs):
+def update_telegram_integration(sender, instance, created, update_fields=None, **kwargs):
     """Update Telegram bot integration when user data changes"""
+    if not created and update_fields is not None and 'telegram_user_id' not in update_fields:
+        return
+
     if instance.telegram_user_id:
         try:
             # Update bot user if exists
@@ -229,59 +191,3 @@ def update_telegram_integration(sender, instance, **kwargs):
         except Exception as e:
             logger.error(f"Error updating Telegram integration for {instance.username}: {e}")
 
-
-@receiver(post_save, sender=UserProfile)
-def update_user_statistics(sender, instance, created, **kwargs):
-    """Update user statistics when profile is saved"""
-    # Skip if this is just a profile creation or if we're already updating statistics
-    if created or getattr(instance, '_updating_statistics', False):
-        return
-
-    try:
-        user = instance.user
-
-        # Update auction-related statistics
-        from apps.auctions.models import Bid, AuctionItem
-
-        # Update bid statistics
-        bid_stats = Bid.objects.filter(bidder=user).aggregate(
-            total_bids=models.Count('id'),
-            total_spent=models.Sum('amount', filter=models.Q(status='won'))
-        )
-
-        total_bids = bid_stats['total_bids'] or 0
-        total_spent = bid_stats['total_spent'] or 0
-
-        # Update win statistics
-        won_items = AuctionItem.objects.filter(winner=user).count()
-        total_wins = won_items
-
-        # Update seller statistics
-        sold_items = AuctionItem.objects.filter(seller=user, status='sold').count()
-        total_items_sold = sold_items
-
-        # Calculate earnings
-        earnings = AuctionItem.objects.filter(
-            seller=user,
-            status='sold'
-        ).aggregate(
-            total=models.Sum('current_price')
-        )['total'] or 0
-
-        total_earned = earnings
-
-        # Use update() to avoid triggering post_save signal again
-        UserProfile.objects.filter(id=instance.id).update(
-            total_bids=total_bids,
-            total_wins=total_wins,
-            total_spent=total_spent,
-            total_earned=total_earned,
-            total_items_sold=total_items_sold
-        )
-
-    except Exception as e:
-        logger.error(f"Error updating statistics for user {instance.user.username}: {e}")
-
-
-# Import models for aggregation
-from django.db import models
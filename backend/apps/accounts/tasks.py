@@ -5,7 +5,7 @@ from django.utils.html import strip_tags
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db.models import Count, Sum, Q
+from django.db.models import Sum
 from datetime import timedelta
 import logging
 import requests
@@ -140,57 +140,41 @@ def cleanup_expired_verifications():
 
 
 @shared_task
-def update_user_statistics():
-    """Update user statistics for all users"""
+def update_user_statistics(incremental=False):
+    """Recompute user profile statistics, for everyone or only users active since the last run"""
     try:
-        from .models import UserProfile
-        from apps.auctions.models import Bid, AuctionItem
-
-        users_updated = 0
-
-        for profile in UserProfile.objects.select_related('user'):
-            user = profile.user
-
-            # Update bid statistics
-            bid_stats = Bid.objects.filter(bidder=user).aggregate(
-                total_bids=Count('id'),
-                total_spent=Sum('amount', filter=Q(status='won'))
-            )
-
-            profile.total_bids = bid_stats['total_bids'] or 0
-            profile.total_spent = bid_stats['total_spent'] or 0
+        from .profile_stats import recompute
 
-            # Update win statistics
-            won_items = AuctionItem.objects.filter(winner=user).count()
-            profile.total_wins = won_items
-
-            # Update seller statistics
-            sold_items = AuctionItem.objects.filter(seller=user, status='sold').count()
-            profile.total_items_sold = sold_items
+        checked, updated, elapsed = recompute(
+            incremental=incremental,
+            batch_size=settings.USER_STATS_BATCH_SIZE,
+        )
+        rate = checked / elapsed if elapsed else 0
+        return f"Checked {checked} users, updated {updated} in {elapsed:.1f}s ({rate:.0f} rows/s)"
 
-            # Calculate earnings
-            earnings = AuctionItem.objects.filter(
-                seller=user,
-                status='sold'
-            ).aggregate(
-                total=Sum('current_price')
-            )['total'] or 0
+    except Exception as exc:
+        logger.error(f"Error updating user statistics: {exc}")
+        return f"Error updating user statistics: {exc}"
 
-            profile.total_earned = earnings
 
-            profile.save(update_fields=[
-                'total_bids', 'total_wins', 'total_spent',
-                'total_earned', 'total_items_sold'
-            ])
+@shared_task
+def reconcile_balances():
+    """Check every user balance against the sum of their completed transactions"""
+    try:
+        from .ledger import reconcile
 
-            users_updated += 1
+        mismatches = reconcile()
+        for user_id, balance, ledger_total in mismatches:
+            logger.warning(
+                f"Balance mismatch for user {user_id}: balance {balance}, ledger {ledger_total}"
+            )
 
-        logger.info(f"Updated statistics for {users_updated} users")
-        return f"Updated statistics for {users_updated} users"
+        logger.info(f"Reconciled balances, {len(mismatches)} mismatches")
+        return f"Reconciled balances, {len(mismatches)} mismatches"
 
     except Exception as exc:
-        logger.error(f"Error updating user statistics: {exc}")
-        return f"Error updating user statistics: {exc}"
+        logger.error(f"Error reconciling balances: {exc}")
+        return f"Error reconciling balances: {exc}"
 
 
 @shared_task
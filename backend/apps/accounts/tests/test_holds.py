@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import pytest
+
+from apps.accounts import holds, ledger
+from apps.accounts.exceptions import InsufficientBalance
+from apps.accounts.models import User
+
+
+def funds_of(user):
+    return User.objects.values_list('balance', 'reserved_balance').get(pk=user.pk)
+
+
+def test_lead_changed():
+    assert holds.lead_changed(1, Decimal('10'), 2, Decimal('12')) == {1: Decimal('-10'), 2: Decimal('12')}
+    assert holds.lead_changed(None, Decimal('0'), 2, Decimal('12')) == {2: Decimal('12')}
+
+
+def test_checked_increase_must_fit_available_balance(make_user):
+    user = make_user(balance='50.00')
+    holds.move({user.pk: Decimal('40.00')}, checked={user.pk})
+
+    with pytest.raises(InsufficientBalance):
+        holds.move({user.pk: Decimal('20.00')}, checked={user.pk})
+
+    assert funds_of(user) == (Decimal('50.00'), Decimal('40.00'))
+
+
+def test_release_never_goes_below_zero(make_user):
+    user = make_user(balance='50.00')
+    holds.move({user.pk: Decimal('10.00')})
+
+    holds.release([(user.pk, Decimal('25.00')), (None, Decimal('5.00'))])
+
+    assert funds_of(user) == (Decimal('50.00'), Decimal('0.00'))
+
+
+def test_debits_cannot_spend_held_funds(make_user):
+    user = make_user(balance='100.00')
+    holds.move({user.pk: Decimal('80.00')}, checked={user.pk})
+
+    with pytest.raises(InsufficientBalance):
+        ledger.post(user, 'withdraw', '30.00')
+    ledger.post(user, 'withdraw', '20.00')
+
+    assert funds_of(user) == (Decimal('80.00'), Decimal('80.00'))
+
+
+def test_debit_paid_from_hold(make_user):
+    user = make_user(balance='100.00')
+    holds.move({user.pk: Decimal('80.00')}, checked={user.pk})
+
+    ledger.post(user, 'payment', '90.00', held='80.00')
+
+    assert funds_of(user) == (Decimal('10.00'), Decimal('0.00'))
+    assert user.reserved_balance == Decimal('0.00')
+
+
+def test_hold_payment_cannot_exceed_hold(make_user):
+    user = make_user(balance='100.00')
+    holds.move({user.pk: Decimal('10.00')})
+
+    with pytest.raises(InsufficientBalance):
+        ledger.post(user, 'payment', '20.00', held='20.00')
+    with pytest.raises(ValueError):
+        ledger.post(user, 'deposit', '20.00', held='20.00')
+
+
+def test_credits_apply_even_when_over_reserved(make_user):
+    user = make_user(balance='100.00')
+    User.objects.filter(pk=user.pk).update(reserved_balance=Decimal('120.00'))
+
+    ledger.post(user, 'deposit', '10.00')
+
+    assert funds_of(user) == (Decimal('110.00'), Decimal('120.00'))
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+import pytest
+
+from apps.accounts import ledger
+from apps.accounts.exceptions import InsufficientBalance
+from apps.accounts.models import User, UserTransaction
+
+
+def balance_of(user):
+    return User.objects.values_list('balance', flat=True).get(pk=user.pk)
+
+
+def test_signed_amount():
+    assert ledger.signed_amount('deposit', '5.00') == Decimal('5.00')
+    assert ledger.signed_amount('payment', '5.00') == Decimal('-5.00')
+    assert ledger.signed_amount('adjustment_credit', '5.00') == Decimal('5.00')
+    assert ledger.signed_amount('adjustment_debit', '5.00') == Decimal('-5.00')
+    with pytest.raises(ValueError):
+        ledger.signed_amount('gift', '5.00')
+
+
+def test_post_credit_moves_balance_once(make_user):
+    user = make_user()
+
+    entry = ledger.post(user, 'deposit', '25.00')
+
+    assert user.balance == Decimal('25.00')
+    assert balance_of(user) == Decimal('25.00')
+    assert entry.status == 'completed'
+    assert UserTransaction.objects.filter(user=user).count() == 1
+
+
+def test_post_debit_beyond_balance_leaves_nothing(make_user):
+    user = make_user()
+    ledger.post(user, 'deposit', '10.00')
+
+    with pytest.raises(InsufficientBalance):
+        ledger.post(user, 'withdraw', '10.01')
+
+    assert balance_of(user) == Decimal('10.00')
+    assert UserTransaction.objects.filter(user=user).count() == 1
+
+
+def test_add_and_deduct_balance(make_user):
+    user = make_user()
+
+    user.add_balance(Decimal('30.00'))
+    assert user.deduct_balance(Decimal('20.00')) is True
+    assert user.deduct_balance(Decimal('20.00')) is False
+
+    assert balance_of(user) == Decimal('10.00')
+
+
+def test_completed_transaction_saved_directly_applies_with_the_row(make_user):
+    user = make_user()
+
+    UserTransaction.objects.create(user=user, transaction_type='deposit', amount=Decimal('15.00'),
+                                   status='completed')
+
+    assert balance_of(user) == Decimal('15.00')
+
+
+def test_uncovered_transaction_saved_directly_is_failed(make_user):
+    user = make_user()
+
+    entry = UserTransaction.objects.create(user=user, transaction_type='withdraw',
+                                           amount=Decimal('5.00'), status='completed')
+
+    entry.refresh_from_db()
+    assert entry.status == 'failed'
+    assert balance_of(user) == Decimal('0.00')
+
+
+def test_post_batch_rejects_users_by_net_change(make_user):
+    rich, poor = make_user(), make_user()
+    ledger.post(rich, 'deposit', '50.00')
+
+    posted, failed = ledger.post_batch([
+        UserTransaction(user=rich, transaction_type='payment', amount=Decimal('30.00')),
+        UserTransaction(user=rich, transaction_type='bonus', amount=Decimal('5.00')),
+        UserTransaction(user=poor, transaction_type='payment', amount=Decimal('1.00')),
+    ])
+
+    assert len(posted) == 2 and len(failed) == 1
+    assert balance_of(rich) == Decimal('25.00')
+    assert balance_of(poor) == Decimal('0.00')
+    assert UserTransaction.objects.get(user=poor).status == 'failed'
+
+
+def test_reconcile_reports_balances_moved_outside_the_ledger(make_user):
+    clean, drifted = make_user(), make_user()
+    ledger.post(clean, 'deposit', '10.00')
+    ledger.post(drifted, 'deposit', '10.00')
+    User.objects.filter(pk=drifted.pk).update(balance=Decimal('12.00'))
+
+    assert ledger.reconcile() == [(drifted.pk, Decimal('12.00'), Decimal('10.00'))]
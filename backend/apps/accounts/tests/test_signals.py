@@ -0,0 +1,49 @@
+"""Query counts of common User writes (statistics are no longer recomputed on save)"""
+from django.contrib.auth.signals import user_logged_in
+from django.test import RequestFactory
+
+from apps.accounts.models import User, UserProfile
+
+
+def test_partial_save_is_one_update(make_user, django_assert_num_queries):
+    user = make_user()
+    user.last_login_ip = '10.0.0.1'
+
+    with django_assert_num_queries(1):
+        user.save(update_fields=['last_login_ip'])
+
+
+def test_full_save_reads_only_status_columns(make_user, django_assert_num_queries):
+    user = make_user()
+    user.first_name = 'Ada'
+
+    # The ban/verification handler reads two columns, then the UPDATE
+    with django_assert_num_queries(2):
+        user.save()
+
+
+def test_login_updates_last_login_and_ip_only(make_user, django_assert_num_queries):
+    user = make_user()
+    request = RequestFactory().post('/login/', REMOTE_ADDR='10.0.0.2')
+
+    with django_assert_num_queries(2):
+        user_logged_in.send(sender=User, request=request, user=user)
+
+    user.refresh_from_db()
+    assert user.last_login_ip == '10.0.0.2'
+    assert user.last_login is not None
+
+
+def test_profile_save_does_not_recompute_statistics(make_user, django_assert_num_queries):
+    profile = UserProfile.objects.get(user=make_user())
+    profile.website = 'https://example.com'
+
+    with django_assert_num_queries(1):
+        profile.save()
+
+
+def test_creating_a_user_creates_its_profile(make_user):
+    user = make_user()
+
+    profile = UserProfile.objects.get(user=user)
+    assert (profile.total_bids, profile.total_wins, profile.total_spent) == (0, 0, 0)
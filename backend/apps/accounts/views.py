@@ -10,7 +10,6 @@ from django.views.generic import TemplateView, UpdateView, ListView
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from django.db.models import Q, Sum, Count
-from django.core.paginator import Paginator
 from django.conf import settings
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
@@ -23,6 +22,8 @@ from decimal import Decimal
 import json
 import logging
 
+from auction.pagination import KeysetPagination
+
 from .models import User, UserProfile, UserTransaction, UserVerification, UserFeedback
 from .serializers import (
     UserSerializer, UserProfileSerializer, UserTransactionSerializer,
@@ -200,17 +201,8 @@ class UserBalanceAPIView(APIView):
                     'error': 'Amount must be positive'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create transaction
-            transaction = UserTransaction.objects.create(
-                user=user,
-                transaction_type='deposit',
-                amount=amount,
-                status='completed',
-                description=f'Balance deposit of ${amount}'
-            )
-
-            # Update balance
-            user.add_balance(amount)
+            # Record the deposit and update balance
+            transaction = user.add_balance(amount, description=f'Balance deposit of ${amount}')
 
             return Response({
                 'balance': float(user.balance),
@@ -234,32 +226,22 @@ class UserTransactionAPIView(APIView):
 
         # Get query parameters
         transaction_type = request.query_params.get('type')
-        page = int(request.query_params.get('page', 1))
-        per_page = int(request.query_params.get('per_page', 20))
 
         # Build queryset
-        transactions = UserTransaction.objects.filter(user=user)
+        transactions = UserTransaction.objects.filter(user=user).select_related(
+            'user', 'auction_item', 'bid'
+        )
 
         if transaction_type:
             transactions = transactions.filter(transaction_type=transaction_type)
 
-        transactions = transactions.order_by('-created_at')
-
-        # Paginate
-        paginator = Paginator(transactions, per_page)
-        page_obj = paginator.get_page(page)
+        # Keyset pagination on (created_at, id): no OFFSET scan or COUNT(*)
+        paginator = KeysetPagination('-created_at')
+        page = paginator.paginate_queryset(transactions, request)
 
-        return Response({
-            'transactions': UserTransactionSerializer(page_obj, many=True).data,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': paginator.count,
-                'pages': paginator.num_pages,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous()
-            }
-        })
+        return Response(paginator.get_paginated_data(
+            'transactions', UserTransactionSerializer(page, many=True).data
+        ))
 
 
 class UserStatisticsAPIView(APIView):
@@ -485,17 +467,8 @@ class BalanceView(LoginRequiredMixin, TemplateView):
         if form.is_valid():
             amount = form.cleaned_data['amount']
 
-            # Create transaction
-            transaction = UserTransaction.objects.create(
-                user=request.user,
-                transaction_type='deposit',
-                amount=amount,
-                status='completed',
-                description=f'Balance deposit of ${amount}'
-            )
-
-            # Update balance
-            request.user.add_balance(amount)
+            # Record the deposit and update balance
+            request.user.add_balance(amount, description=f'Balance deposit of ${amount}')
 
             messages.success(request, f'Successfully added ${amount} to your balance!')
             return redirect('accounts:balance')
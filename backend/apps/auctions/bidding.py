@@ -0,0 +1,187 @@
+"""
+Bid placement engine.
+
+Every bid goes through place_bid(), which does all of its work inside one
+transaction: the item row is locked with SELECT ... FOR UPDATE, the bid is
+validated against the locked price, the Bid row is inserted and the item's
+price, bid count, leading bid and end time are moved forward with a single
+conditional UPDATE. Concurrent bidders on the same lot therefore queue on
+the row lock instead of racing on a stale read of current_price.
+"""
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.accounts import holds, profile_stats
+from apps.accounts.exceptions import InsufficientBalance
+
+from . import fanout, hot_lots, live, proxy, scheduler, statistics, trending
+from .exceptions import BidRejected
+from .models import AuctionItem, Bid
+
+logger = logging.getLogger(__name__)
+
+
+def _to_amount(amount):
+    try:
+        return Decimal(str(amount)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        raise BidRejected("Invalid bid amount")
+
+
+def place_bid(item_id, user, amount, max_bid=None):
+    """
+    Place a bid of ``amount`` by ``user`` on item ``item_id``.
+
+    ``max_bid`` optionally sets a proxy ceiling: competing proxies are
+    settled in the same transaction (see apps.auctions.proxy) and only the
+    resulting visible bids are written.
+
+    Returns the user's Bid, which may already be outbid by a proxy;
+    ``bid.item`` carries the post-bid price, bid count and end time. Raises
+    BidRejected if the bid is not acceptable and AuctionItem.DoesNotExist if
+    the item is gone.
+    """
+    amount = _to_amount(amount)
+    if max_bid not in (None, ''):
+        max_bid = _to_amount(max_bid)
+        if max_bid < amount:
+            raise BidRejected("Maximum bid cannot be lower than the bid amount")
+    else:
+        max_bid = None
+
+    # Hot lots are validated and accepted in Redis, then written behind
+    if hot_lots.is_hot(item_id):
+        if max_bid is not None:
+            raise BidRejected("Automatic bidding is not available on this lot right now")
+        bid = hot_lots.place_bid(item_id, user, amount)
+        trending.record(item_id, bid.item.category_id, 'bid')
+        statistics.adjust({(bid.item.category_id, 'total_bids'): 1})
+        fanout.publish(item_id, {
+            'current_price': bid.item.current_price,
+            'total_bids': bid.item.total_bids,
+            'end_time': bid.item.end_time,
+            'leading_bidder': user.pk,
+        })
+        return bid
+
+    with transaction.atomic():
+        item = (
+            AuctionItem.objects.select_for_update(of=('self',))
+            .select_related('leading_bid')
+            .get(pk=item_id)
+        )
+        # The lot was switched to hot mode while this bid waited on the lock
+        if hot_lots.is_hot(item.pk):
+            raise BidRejected("Auction is busy, please retry")
+        previous_leader_id = item.leading_bid.bidder_id if item.leading_bid_id else None
+
+        can_bid, message = item.can_bid(user, amount)
+        if not can_bid:
+            raise BidRejected(message)
+        if max_bid is not None and not user.can_bid(max_bid, item.get_held_amount(user)):
+            raise BidRejected("Insufficient balance for maximum bid")
+
+        # Extend the auction if the bid lands inside the auto-extend window
+        now = timezone.now()
+        end_time = item.end_time
+        if (end_time - now).total_seconds() < item.auto_extend_time:
+            end_time = now + timedelta(seconds=item.auto_extend_time)
+            scheduler.schedule_on_commit(item.pk, end_time)
+
+        # Settle against every proxy that can still beat the next minimum
+        contenders = proxy.live_ceilings(item.pk, item.get_next_bid_amount())
+        own = contenders.pop(user.pk, None)
+        ceiling = max(max_bid or amount, own.ceiling if own else amount)
+        # Raising an existing ceiling keeps the bidder's time priority
+        while True:
+            price, rows = proxy.resolve(
+                proxy.ProxyBid(user.pk, ceiling, own.placed_at if own else now),
+                amount,
+                item.min_bid_increment,
+                list(contenders.values()),
+            )
+            # A proxy leader's balance was only checked when they set their
+            # ceiling; one that can no longer cover its lead is exhausted
+            leader_id = rows[-1][0]
+            increase = holds.lead_changed(
+                previous_leader_id, item.current_price, leader_id, price,
+            )[leader_id]
+            if leader_id == user.pk or increase <= 0 or holds.can_cover(leader_id, increase):
+                break
+            del contenders[leader_id]
+
+        # Only the last row leads; anything before it is already outbid
+        bid = None
+        for index, (bidder_id, row_amount, row_ceiling) in enumerate(rows):
+            row = Bid.objects.create(
+                item=item,
+                bidder_id=bidder_id,
+                amount=row_amount,
+                max_bid=row_ceiling if bidder_id != user.pk or max_bid else None,
+                status='active' if index == len(rows) - 1 else 'outbid',
+            )
+            if bidder_id == user.pk:
+                bid = row
+        leader = row
+
+        # Flip only the previous leader instead of every earlier bid
+        if item.leading_bid_id:
+            Bid.objects.filter(pk=item.leading_bid_id).update(status='outbid')
+
+        # The row is locked, so the price guard only trips if something
+        # wrote the row without taking the lock; the bid inserts roll back.
+        updated = AuctionItem.objects.filter(
+            pk=item.pk,
+            status='active',
+            current_price=item.current_price,
+        ).update(
+            current_price=price,
+            total_bids=F('total_bids') + len(rows),
+            leading_bid=leader,
+            end_time=end_time,
+        )
+        if not updated:
+            raise BidRejected("Auction changed while placing bid, please retry")
+
+        # Move the hold to the new leader; an increase must fit in the
+        # leader's available balance, read under the user row lock
+        try:
+            holds.move(
+                holds.lead_changed(previous_leader_id, item.current_price, leader.bidder_id, price),
+                checked={user.pk, leader.bidder_id},
+            )
+        except InsufficientBalance:
+            raise BidRejected("Insufficient balance")
+
+        item.leading_bid = leader
+        item.current_price = price
+        item.total_bids += len(rows)
+        item.end_time = end_time
+
+        profile_stats.adjust(profile_stats.bids_placed(bidder_id for bidder_id, _, _ in rows))
+
+        trending.record_on_commit(item.pk, item.category_id, 'bid')
+        statistics.adjust_on_commit({(item.category_id, 'total_bids'): len(rows)})
+
+        # Only the live state changes; cached item content stays valid
+        state = {
+            'current_price': price,
+            'total_bids': item.total_bids,
+            'start_time': item.start_time,
+            'end_time': end_time,
+            'status': item.status,
+            'leading_bidder': leader.bidder_id,
+        }
+        live.store_on_commit(item.pk, state)
+        fanout.publish_on_commit(item.pk, state)
+
+    if len(rows) > 1:
+        logger.info(f"Bid {bid.id} on item {item.pk} outbid by proxy, price now {price}")
+    else:
+        logger.info(f"Bid {bid.id} of {price} placed on item {item.pk} by {user.username}")
+    return bid
@@ -0,0 +1,203 @@
+"""
+Read-through response cache for the auction API.
+
+Keys are versioned: every cached fragment is stored under its key plus the
+current versions of the namespaces it depends on, so invalidation is a
+single INCR of a namespace version and stale entries simply age out.
+
+* ``item:<id>``    - the item's static fields (bumped on item edits)
+* ``slug:<slug>``  - the item id a slug resolves to (bumped on edits of
+                     the item that has or had the slug)
+* ``categories``   - the category tree (bumped on category edits)
+* ``listings``     - featured/trending lists (bumped on item edits and
+                     closes; bids only reach them when their short TTL
+                     expires)
+
+Live bidding fields are not cached here, see apps.auctions.live.
+
+Stampedes are prevented twice over. Entries carry the time their last
+computation took, and readers refresh them early with a probability that
+rises as expiry approaches (XFetch), so hot keys are normally recomputed
+before they expire. On a real miss only the caller holding the fill lock
+computes the value; the rest wait briefly for it.
+
+Hit/miss counts and latency are kept per endpoint in Redis hashes and
+exposed by ``CacheStatsAPIView``.
+"""
+import logging
+import math
+import random
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'cache:version:{namespace}'
+LOCK_KEY = 'cache:lock:{key}'
+STATS_KEY = 'cache:stats:{endpoint}'
+STATS_ENDPOINTS_KEY = 'cache:stats:endpoints'
+
+# Versions must outlive every fragment that embeds them
+VERSION_TTL = 7 * 24 * 3600
+
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 1.0
+LOCK_POLL = 0.05
+
+# XFetch aggressiveness; higher refreshes earlier
+BETA = 1.0
+
+CATEGORIES = 'categories'
+LISTINGS = 'listings'
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def item_namespace(item_id):
+    return f'item:{item_id}'
+
+
+def slug_namespace(slug):
+    return f'slug:{slug}'
+
+
+def bump(*namespaces):
+    """Invalidate everything cached under the given namespaces"""
+    if not namespaces:
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for namespace in namespaces:
+            key = cache.make_key(VERSION_KEY.format(namespace=namespace))
+            pipe.incr(key)
+            pipe.expire(key, VERSION_TTL)
+        pipe.execute()
+    except Exception as exc:
+        logger.error(f"Error bumping cache versions {namespaces}: {exc}")
+
+
+def bump_on_commit(*namespaces):
+    """Invalidate the namespaces once the current transaction commits"""
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def _versioned_key(key, namespaces):
+    if not namespaces:
+        return key
+    version_keys = [VERSION_KEY.format(namespace=namespace) for namespace in namespaces]
+    versions = cache.get_many(version_keys)
+    return f"{key}:v" + '.'.join(str(versions.get(k, 0)) for k in version_keys)
+
+
+def record(endpoint, outcome, elapsed_ms):
+    """Count a cache hit or miss and its latency for an endpoint"""
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        stats_key = STATS_KEY.format(endpoint=endpoint)
+        pipe.sadd(STATS_ENDPOINTS_KEY, endpoint)
+        pipe.hincrby(stats_key, outcome, 1)
+        pipe.hincrbyfloat(stats_key, f'{outcome}_ms', elapsed_ms)
+        pipe.execute()
+    except Exception as exc:
+        logger.error(f"Error recording cache stats for {endpoint}: {exc}")
+
+
+def _store(key, value, ttl, delta):
+    cache.set(key, (value, delta, time.time() + ttl), ttl)
+
+
+def _compute_and_store(key, compute, ttl):
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    if value is not None:
+        _store(key, value, ttl, delta)
+    return value
+
+
+def fetch(endpoint, key, compute, ttl, namespaces=()):
+    """
+    Get ``key`` from the cache, computing and storing it on a miss.
+
+    ``namespaces`` are folded into the key, so bumping any of them makes
+    the next read miss. ``None`` results are not cached.
+    """
+    started = time.perf_counter()
+    try:
+        full_key = _versioned_key(key, namespaces)
+        entry = cache.get(full_key)
+    except Exception as exc:
+        logger.error(f"Cache unavailable for {endpoint}: {exc}")
+        return compute()
+
+    if entry is not None:
+        value, delta, expires_at = entry
+
+        # XFetch: refresh early with rising probability near expiry; only
+        # the caller that wins the lock does it, the rest keep the cached value
+        if time.time() - delta * BETA * math.log(random.random() or 1e-12) >= expires_at:
+            lock_key = LOCK_KEY.format(key=full_key)
+            if cache.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    value = _compute_and_store(full_key, compute, ttl)
+                finally:
+                    cache.delete(lock_key)
+                record(endpoint, 'refreshes', (time.perf_counter() - started) * 1000)
+                return value
+
+        record(endpoint, 'hits', (time.perf_counter() - started) * 1000)
+        return value
+
+    # Miss: single-flight fill
+    lock_key = LOCK_KEY.format(key=full_key)
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = _compute_and_store(full_key, compute, ttl)
+        finally:
+            cache.delete(lock_key)
+    else:
+        deadline = time.perf_counter() + LOCK_WAIT
+        value = None
+        while time.perf_counter() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(full_key)
+            if entry is not None:
+                value = entry[0]
+                break
+        else:
+            value = compute()
+
+    record(endpoint, 'misses', (time.perf_counter() - started) * 1000)
+    return value
+
+
+def get_stats():
+    """Get hit ratio and mean latency per endpoint"""
+    redis = _redis()
+    endpoints = sorted(e.decode() for e in redis.smembers(STATS_ENDPOINTS_KEY))
+
+    pipe = redis.pipeline(transaction=False)
+    for endpoint in endpoints:
+        pipe.hgetall(STATS_KEY.format(endpoint=endpoint))
+
+    stats = {}
+    for endpoint, raw in zip(endpoints, pipe.execute()):
+        values = {k.decode(): float(v) for k, v in raw.items()}
+        hits = int(values.get('hits', 0))
+        misses = int(values.get('misses', 0))
+        refreshes = int(values.get('refreshes', 0))
+        total = hits + misses + refreshes
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'early_refreshes': refreshes,
+            'hit_ratio': round(hits / total, 4) if total else None,
+            'avg_hit_ms': round(values.get('hits_ms', 0) / hits, 3) if hits else None,
+            'avg_miss_ms': round(values.get('misses_ms', 0) / misses, 3) if misses else None,
+        }
+    return stats
@@ -0,0 +1,218 @@
+"""
+Materialized category tree.
+
+Each category stores its materialized ``path`` of ancestor ids
+(``"1/7/42/"``), its ``depth``, its ``full_name`` (``"A > B > C"``) and two
+counters: ``item_count`` (active items filed directly under it) and
+``subtree_item_count`` (active items anywhere below it, itself included).
+
+Descendants are a single ``path LIKE 'prefix%'`` range scan, ancestors are
+read straight from the path, and the whole sidebar with its counts is one
+query. Everything is maintained incrementally:
+
+* ``Category.save`` calls ``place`` to set the path and rewrite the
+  subtree when a category is renamed or moved;
+* item activation, closing and deletion call ``adjust_item_counts`` with
+  per-category deltas, which are rolled up to every ancestor in one UPDATE.
+
+``rebuild`` recomputes everything from scratch and runs periodically to
+repair any drift from bulk writes that bypass the hooks.
+"""
+from collections import Counter
+import logging
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+REBUILD_SQL = """
+    WITH RECURSIVE tree AS (
+        SELECT id, id::text || '/' AS path, 0 AS depth, name::text AS full_name
+        FROM auction_categories
+        WHERE parent_id IS NULL
+        UNION ALL
+        SELECT c.id, t.path || c.id || '/', t.depth + 1, t.full_name || ' > ' || c.name
+        FROM auction_categories c
+        JOIN tree t ON c.parent_id = t.id
+    )
+    UPDATE auction_categories c
+    SET path = t.path, depth = t.depth, full_name = t.full_name
+    FROM tree t
+    WHERE c.id = t.id;
+
+    UPDATE auction_categories c
+    SET item_count = coalesce(n.total, 0)
+    FROM auction_categories c2
+    LEFT JOIN (
+        SELECT category_id, count(*) AS total
+        FROM auction_items
+        WHERE status = 'active'
+        GROUP BY category_id
+    ) n ON n.category_id = c2.id
+    WHERE c.id = c2.id;
+
+    UPDATE auction_categories c
+    SET subtree_item_count = s.total
+    FROM (
+        SELECT a.id, sum(d.item_count) AS total
+        FROM auction_categories a
+        JOIN auction_categories d ON d.path LIKE a.path || '%'
+        GROUP BY a.id
+    ) s
+    WHERE c.id = s.id;
+"""
+
+MOVE_SUBTREE_SQL = """
+    UPDATE auction_categories
+    SET path = %(path)s || substr(path, %(old_path_len)s + 1),
+        full_name = %(full_name)s || substr(full_name, %(old_full_name_len)s + 1),
+        depth = depth + %(depth_delta)s
+    WHERE path LIKE %(old_path)s || '%%' AND id <> %(id)s
+"""
+
+ADJUST_COUNTS_SQL = """
+    UPDATE auction_categories c
+    SET subtree_item_count = c.subtree_item_count + d.subtree_delta,
+        item_count = c.item_count + d.item_delta
+    FROM (
+        SELECT unnest(%s::bigint[]) AS id,
+               unnest(%s::integer[]) AS subtree_delta,
+               unnest(%s::integer[]) AS item_delta
+    ) d
+    WHERE c.id = d.id
+"""
+
+
+def ancestor_ids(path):
+    """Get the ids on a materialized path, root first"""
+    return [int(part) for part in path.split('/') if part]
+
+
+def place(category, previous=None):
+    """
+    Set a saved category's path, depth and full name from its parent.
+
+    ``previous`` is the ``(path, full_name, depth, parent_id)`` the row had
+    before the save, or None for a new category. When it changes, the whole
+    subtree is rewritten and, on a move, the subtree's item count is moved
+    from the old ancestors to the new ones.
+    """
+    from .models import Category
+
+    parent = None
+    if category.parent_id:
+        parent = Category.objects.only('path', 'full_name', 'depth').get(pk=category.parent_id)
+
+    path = f"{parent.path if parent else ''}{category.pk}/"
+    full_name = f"{parent.full_name} > {category.name}" if parent else category.name
+    depth = parent.depth + 1 if parent else 0
+
+    if previous and (previous[0], previous[1], previous[2]) == (path, full_name, depth):
+        return
+
+    old_path, old_full_name, old_depth, old_parent_id = previous or ('', '', 0, None)
+    if old_path and parent and parent.path.startswith(old_path):
+        raise ValueError("A category cannot be moved under its own subtree")
+
+    with transaction.atomic():
+        Category.objects.filter(pk=category.pk).update(path=path, full_name=full_name, depth=depth)
+
+        if old_path:
+            with connection.cursor() as cursor:
+                cursor.execute(MOVE_SUBTREE_SQL, {
+                    'id': category.pk,
+                    'path': path,
+                    'old_path': old_path,
+                    'old_path_len': len(old_path),
+                    'full_name': full_name,
+                    'old_full_name_len': len(old_full_name),
+                    'depth_delta': depth - old_depth,
+                })
+
+            if old_parent_id != category.parent_id:
+                moved = Category.objects.values_list('subtree_item_count', flat=True).get(pk=category.pk)
+                if moved:
+                    deltas = Counter()
+                    for ancestor_id in ancestor_ids(old_path)[:-1]:
+                        deltas[ancestor_id] -= moved
+                    for ancestor_id in ancestor_ids(path)[:-1]:
+                        deltas[ancestor_id] += moved
+                    _apply(deltas, Counter())
+
+    category.path, category.full_name, category.depth = path, full_name, depth
+
+
+def adjust_item_counts(deltas):
+    """
+    Apply active-item count changes, given as ``{category_id: delta}``, to
+    each category and all of its ancestors.
+    """
+    from .models import Category
+
+    deltas = {category_id: delta for category_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    subtree = Counter()
+    paths = Category.objects.filter(pk__in=list(deltas)).values_list('id', 'path')
+    for category_id, path in paths:
+        for ancestor_id in ancestor_ids(path) or [category_id]:
+            subtree[ancestor_id] += deltas[category_id]
+
+    _apply(subtree, Counter(deltas))
+
+
+def _apply(subtree, direct):
+    ids = sorted(set(subtree) | set(direct))
+    if not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(ADJUST_COUNTS_SQL, [
+            ids,
+            [subtree[i] for i in ids],
+            [direct[i] for i in ids],
+        ])
+
+
+def get_descendant_ids(category, include_self=True):
+    """Get ids of every category in the subtree"""
+    from .models import Category
+
+    if not category.path:
+        return [category.pk] if include_self else []
+
+    queryset = Category.objects.filter(path__startswith=category.path)
+    if not include_self:
+        queryset = queryset.exclude(pk=category.pk)
+    return list(queryset.values_list('id', flat=True))
+
+
+def get_tree(active_only=True):
+    """Get the category tree as nested dicts, in one query"""
+    from .models import Category
+
+    queryset = Category.objects.order_by('depth', 'sort_order', 'name')
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+
+    nodes = {}
+    roots = []
+    for category in queryset.values(
+        'id', 'name', 'slug', 'parent_id', 'full_name', 'depth',
+        'item_count', 'subtree_item_count',
+    ):
+        category['children'] = []
+        nodes[category['id']] = category
+        parent = nodes.get(category['parent_id'])
+        if parent is not None:
+            parent['children'].append(category)
+        elif category['parent_id'] is None:
+            roots.append(category)
+    return roots
+
+
+def rebuild():
+    """Recompute paths, names and counts for the whole tree"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+    logger.info("Rebuilt category tree")
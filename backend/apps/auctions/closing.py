@@ -0,0 +1,245 @@
+"""
+Set-based auction closer.
+
+Due lots are settled in batches with a handful of statements per batch
+instead of a ``get_highest_bid()`` query and a ``save()`` per lot:
+
+1. lock the batch with ``FOR UPDATE SKIP LOCKED`` so concurrent closers and
+   the bid engine never wait on each other;
+2. take each lot's ``leading_bid`` as the winning bid and update
+   ``status``, ``winner`` and ``winning_bid`` for the whole batch in one
+   UPDATE;
+3. mark the leading bids won or lost in one UPDATE;
+4. take the lots out of the category tree's active counts in one UPDATE;
+5. write the win/lose/ended notifications with one ``bulk_create``.
+
+Hot lots in the batch are drained into the database first.
+"""
+from collections import Counter
+import logging
+import time
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts import holds, profile_stats
+
+from . import caching, categories, fanout, hot_lots, live, scheduler, statistics, trending
+from .exceptions import HotLotError
+from .models import AuctionItem, Bid
+
+logger = logging.getLogger(__name__)
+
+LOCK_SQL = """
+    SELECT id FROM auction_items
+    WHERE status = 'active' AND id = ANY(%s) {due}
+    ORDER BY id
+    FOR UPDATE SKIP LOCKED
+"""
+
+# The winner is the leading bid, the one the lot shows and holds were moved
+# to, if the reserve is met, matching AuctionItem.has_reserve_met().
+SETTLE_SQL = """
+    WITH settled AS (
+        SELECT i.id,
+               b.id AS bid_id,
+               b.bidder_id,
+               b.id IS NOT NULL AND (
+                   i.reserve_price IS NULL OR i.reserve_price = 0
+                   OR i.current_price >= i.reserve_price
+               ) AS sold
+        FROM auction_items i
+        LEFT JOIN auction_bids b ON b.id = i.leading_bid_id
+        WHERE i.id = ANY(%(ids)s)
+    )
+    UPDATE auction_items i
+    SET status = CASE WHEN s.sold THEN 'sold' ELSE 'ended' END,
+        winner_id = CASE WHEN s.sold THEN s.bidder_id END,
+        winning_bid_id = CASE WHEN s.sold THEN s.bid_id END,
+        updated_at = %(now)s
+    FROM settled s
+    WHERE i.id = s.id
+    RETURNING i.id, i.title, i.seller_id, i.category_id, i.current_price,
+              i.total_bids, i.start_time, i.end_time, i.status,
+              s.sold, s.bid_id, s.bidder_id
+"""
+
+
+def _lock(item_ids, now, due_only):
+    sql = LOCK_SQL.format(due='AND end_time <= %s' if due_only else '')
+    params = [list(item_ids), now] if due_only else [list(item_ids)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _settle(item_ids, now):
+    with connection.cursor() as cursor:
+        cursor.execute(SETTLE_SQL, {'ids': list(item_ids), 'now': now})
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _build_notifications(results):
+    from apps.notifications.models import Notification
+
+    content_type = ContentType.objects.get_for_model(AuctionItem)
+    by_id = {r['id']: r for r in results}
+
+    # Everyone who bid on a lot and did not win it gets an 'auction_lost'
+    bidders = (
+        Bid.objects.filter(item_id__in=list(by_id))
+        .values_list('item_id', 'bidder_id')
+        .distinct()
+        .order_by()
+    )
+
+    notifications = []
+
+    def add(result, recipient_id, notification_type, title, message):
+        notifications.append(Notification(
+            recipient_id=recipient_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            content_type=content_type,
+            object_id=result['id'],
+            data={'item_id': result['id'], 'final_price': str(result['current_price'])},
+            action_url=result['url'],
+        ))
+
+    for result in results:
+        result['url'] = reverse('auctions:item_detail', kwargs={'pk': result['id']})
+        if result['sold']:
+            add(result, result['bidder_id'], 'auction_won', 'You won the auction!',
+                f'You won "{result["title"]}" for {result["current_price"]}.')
+            add(result, result['seller_id'], 'auction_ended', 'Your item has been sold',
+                f'"{result["title"]}" sold for {result["current_price"]}.')
+        else:
+            add(result, result['seller_id'], 'auction_ended', 'Your auction has ended',
+                f'"{result["title"]}" ended without a sale.')
+
+    for item_id, bidder_id in bidders:
+        result = by_id[item_id]
+        if result['sold'] and bidder_id == result['bidder_id']:
+            continue
+        add(result, bidder_id, 'auction_lost', 'Auction ended',
+            f'You did not win "{result["title"]}".')
+
+    return notifications
+
+
+def close_auctions(item_ids, now=None, due_only=True):
+    """
+    Close the given auctions if they are active and past their end time
+    (or regardless of end time when ``due_only`` is False).
+
+    Lots that are locked elsewhere, not yet due or already closed are left
+    alone. Returns the settled rows as dicts with ``id``, ``sold``,
+    ``bid_id`` and ``bidder_id``.
+    """
+    from apps.notifications.models import Notification
+
+    item_ids = list(item_ids)
+    if not item_ids:
+        return []
+
+    # Drain hot lots first so their accepted bids take part in settlement;
+    # a lot that cannot be drained yet is left for the next run
+    hot = set(hot_lots.get_hot_lots())
+    for item_id in [item_id for item_id in item_ids if item_id in hot]:
+        try:
+            hot_lots.disable(item_id)
+        except HotLotError as e:
+            logger.warning(f"Not closing item {item_id} yet: {e}")
+            item_ids.remove(item_id)
+    if not item_ids:
+        return []
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        due = _lock(item_ids, now, due_only)
+        if not due:
+            return []
+
+        results = _settle(due, now)
+
+        leaders = [r['bid_id'] for r in results if r['bid_id']]
+        won = [r['bid_id'] for r in results if r['sold']]
+        if leaders:
+            Bid.objects.filter(pk__in=leaders).exclude(pk__in=won).update(status='lost')
+            Bid.objects.filter(pk__in=won).update(status='won')
+
+        profile_stats.adjust(profile_stats.auctions_settled(results))
+        holds.release((r['bidder_id'], r['current_price']) for r in results)
+
+        closed_per_category = Counter(r['category_id'] for r in results)
+        categories.adjust_item_counts({c: -n for c, n in closed_per_category.items()})
+
+        changes = Counter()
+        for r in results:
+            changes[(r['category_id'], 'active_auctions')] -= 1
+            if r['sold']:
+                changes[(r['category_id'], 'sold_items')] += 1
+                changes[(r['category_id'], 'gmv_cents')] += statistics.to_cents(r['current_price'])
+        statistics.adjust_on_commit(changes)
+
+        Notification.objects.bulk_create(
+            _build_notifications(results),
+            batch_size=settings.AUCTION_CLOSE_BATCH_SIZE,
+        )
+
+        scheduler.unschedule_many_on_commit(due)
+        caching.bump_on_commit(caching.LISTINGS)
+        trending.remove_on_commit((r['id'], r['category_id']) for r in results)
+        for result in results:
+            state = {
+                'current_price': result['current_price'],
+                'total_bids': result['total_bids'],
+                'start_time': result['start_time'],
+                'end_time': result['end_time'],
+                'status': result['status'],
+                'leading_bidder': result['bidder_id'],
+            }
+            live.store_on_commit(result['id'], state)
+            fanout.publish_on_commit(result['id'], state)
+
+    return results
+
+
+def close_due_auctions(batch_size=None):
+    """
+    Close every auction that is past its end time, in batches.
+
+    Returns ``(closed, sold, seconds)``.
+    """
+    batch_size = batch_size or settings.AUCTION_CLOSE_BATCH_SIZE
+    started = time.monotonic()
+    closed = sold = 0
+    last_id = 0
+
+    while True:
+        now = timezone.now()
+        batch = list(
+            AuctionItem.objects.filter(status='active', end_time__lte=now, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1]
+
+        results = close_auctions(batch, now)
+        closed += len(results)
+        sold += sum(1 for r in results if r['sold'])
+
+    elapsed = time.monotonic() - started
+    if closed:
+        logger.info(
+            f"Closed {closed} auctions ({sold} sold) in {elapsed:.2f}s, "
+            f"{closed / elapsed:.0f} lots/sec"
+        )
+    return closed, sold, elapsed
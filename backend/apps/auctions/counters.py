@@ -0,0 +1,193 @@
+"""
+Buffered view and watch counters.
+
+Bumping ``view_count`` on every page view would be an UPDATE, and a row
+lock, on the most contended rows in the system. Instead increments
+accumulate in Redis hashes keyed by item id and the
+``flush_item_counters`` task applies them to ``auction_items`` in batches,
+one UPDATE per batch.
+
+Views are counted once per viewer per ``ITEM_VIEW_DEDUP_WINDOW``: each item
+has a HyperLogLog of recent viewers and only a viewer it has not seen adds
+to the pending count. Readers that need current figures add the pending
+increments to the stored columns with ``get_pending``.
+
+A flush first renames the pending hash aside, so increments that arrive
+while it runs go into a fresh hash. If the database write fails, the
+renamed hash keeps the items whose batch did not commit and the next flush
+applies them first.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'auction:counters:{counter}'
+FLUSHING_KEY = 'auction:counters:{counter}:flushing'
+VIEWERS_KEY = 'auction:viewers:{item_id}'
+FLUSH_LOCK_KEY = 'auction:counters:flush'
+
+COUNTERS = ('views', 'watches')
+
+# KEYS: viewers HLL, pending views hash
+# ARGV: viewer, item id, dedup window (seconds)
+RECORD_VIEW_SCRIPT = """
+if redis.call('PFADD', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+return 1
+"""
+
+# KEYS: pending hash, flushing hash
+TAKE_PENDING_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 1
+end
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+
+FLUSH_SQL = """
+    UPDATE auction_items i
+    SET view_count = greatest(i.view_count + d.views, 0),
+        watch_count = greatest(i.watch_count + d.watches, 0)
+    FROM (
+        SELECT unnest(%s::bigint[]) AS id,
+               unnest(%s::integer[]) AS views,
+               unnest(%s::integer[]) AS watches
+    ) d
+    WHERE i.id = d.id
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def record_view(item_id, viewer):
+    """Count a view of an item unless this viewer was counted recently"""
+    try:
+        return bool(_script('record_view', RECORD_VIEW_SCRIPT)(
+            keys=[VIEWERS_KEY.format(item_id=item_id), PENDING_KEY.format(counter='views')],
+            args=[viewer, item_id, settings.ITEM_VIEW_DEDUP_WINDOW],
+        ))
+    except Exception as exc:
+        logger.error(f"Error recording view of item {item_id}: {exc}")
+        return False
+
+
+def record_watch(item_id, delta):
+    """Add ``delta`` (+1 or -1) to an item's watcher count"""
+    try:
+        _redis().hincrby(PENDING_KEY.format(counter='watches'), item_id, delta)
+    except Exception as exc:
+        logger.error(f"Error recording watch change of item {item_id}: {exc}")
+
+
+def record_watch_on_commit(item_id, delta):
+    """Add to an item's watcher count once the current transaction commits"""
+    transaction.on_commit(lambda: record_watch(item_id, delta))
+
+
+def get_pending(item_ids):
+    """Get ``{item_id: {'views': n, 'watches': n}}`` not yet flushed to the database"""
+    item_ids = list(item_ids)
+    if not item_ids:
+        return {}
+
+    pending = {item_id: dict.fromkeys(COUNTERS, 0) for item_id in item_ids}
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for counter in COUNTERS:
+            pipe.hmget(PENDING_KEY.format(counter=counter), item_ids)
+            pipe.hmget(FLUSHING_KEY.format(counter=counter), item_ids)
+        values = pipe.execute()
+    except Exception as exc:
+        logger.error(f"Error reading pending counters: {exc}")
+        return pending
+
+    for index, counter in enumerate(COUNTERS):
+        for rows in values[index * 2:index * 2 + 2]:
+            for item_id, value in zip(item_ids, rows):
+                if value is not None:
+                    pending[item_id][counter] += int(value)
+    return pending
+
+
+def _apply(deltas):
+    ids = sorted(deltas)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(FLUSH_SQL, [
+            ids,
+            [deltas[i]['views'] for i in ids],
+            [deltas[i]['watches'] for i in ids],
+        ])
+
+
+def flush(batch_size=None):
+    """
+    Apply pending increments to ``auction_items``.
+
+    Returns ``(items, elapsed)``: the number of items updated and the time
+    taken in seconds.
+    """
+    batch_size = batch_size or settings.COUNTER_FLUSH_BATCH_SIZE
+    redis = _redis()
+    started = time.perf_counter()
+
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=300, blocking_timeout=0)
+    if not lock.acquire():
+        return 0, 0.0
+
+    try:
+        deltas = {}
+        taken = []
+        for counter in COUNTERS:
+            pending_key = PENDING_KEY.format(counter=counter)
+            flushing_key = FLUSHING_KEY.format(counter=counter)
+            if not _script('take_pending', TAKE_PENDING_SCRIPT)(keys=[pending_key, flushing_key]):
+                continue
+            taken.append(flushing_key)
+            for item_id, value in redis.hscan_iter(flushing_key, count=batch_size):
+                entry = deltas.setdefault(int(item_id), dict.fromkeys(COUNTERS, 0))
+                entry[counter] += int(value)
+
+        ids = sorted(item_id for item_id, entry in deltas.items() if any(entry.values()))
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            _apply({item_id: deltas[item_id] for item_id in batch})
+
+            # Drop what is committed, so a failure later on never applies it twice
+            pipe = redis.pipeline(transaction=False)
+            for flushing_key in taken:
+                pipe.hdel(flushing_key, *batch)
+            pipe.execute()
+
+        if taken:
+            redis.delete(*taken)
+    finally:
+        lock.release()
+
+    elapsed = time.perf_counter() - started
+    if ids:
+        logger.info(f"Flushed view/watch counters for {len(ids)} items in {elapsed * 1000:.0f}ms")
+    return len(ids), elapsed
@@ -0,0 +1,6 @@
+class BidRejected(ValueError):
+    """Raised when a bid does not pass validation"""
+
+
+class HotLotError(RuntimeError):
+    """Raised when a hot lot's accepted bids cannot be written to the database"""
@@ -0,0 +1,253 @@
+"""
+Bid fan-out to WebSocket groups.
+
+Once a bid commits, one compact event describing the lot's new state is
+sent to the lot's group (``auction_{id}_notifications``). Sending it to
+the personal group (``user_{id}_notifications``) of every user watching
+the lot with bid notifications on takes a group send per watcher, so that
+is left to the ``send_bid_update_to_watchers`` task instead of the bid
+request. Events carry no bidder ids.
+
+Bursts are coalesced to at most ``BID_FANOUT_RATE`` events per second per
+lot. The latest state of each lot is kept in Redis, and a short-lived gate
+key decides whether an update goes out now. An update that arrives while
+the gate is closed only replaces the stored state, and the first such
+update schedules one trailing ``publish_bid_update`` task for when the
+gate reopens. That task sends whatever is latest by then, so the final
+price always goes out and intermediate ones may be skipped. States that
+arrive out of order, with fewer bids than the stored one, are dropped.
+
+Every accepted state gets the lot's next sequence number (``seq``) and is
+kept in a ring buffer of the last ``BID_FANOUT_RING_SIZE`` events, whether
+or not it was sent. Events are full states, so a client keeps the one with
+the highest seq and ignores older ones. A client that reconnects with the
+last seq it saw is sent ``resume``: the events it missed from the ring,
+or one snapshot of the lot when the ring no longer reaches back that far.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from apps.notifications import broadcast
+
+logger = logging.getLogger(__name__)
+
+LATEST_KEY = 'auction:fanout:{item_id}'
+GATE_KEY = 'auction:fanout:{item_id}:gate'
+TRAILING_KEY = 'auction:fanout:{item_id}:trailing'
+SEQ_KEY = 'auction:fanout:{item_id}:seq'
+RING_KEY = 'auction:fanout:{item_id}:ring'
+
+STATE_TTL = 24 * 3600
+
+# KEYS: latest state hash, gate, trailing flag, sequence, ring buffer
+# ARGV: encoded event without its closing brace, total bids, interval (ms),
+#       state TTL (s), ring size
+# Returns {0, event} to publish now, {delay in ms, event} when a trailing
+# publish should run after the delay, or {-1} if there is nothing to do
+PUBLISH_SCRIPT = """
+local stored = tonumber(redis.call('HGET', KEYS[1], 'total_bids') or '-1')
+if tonumber(ARGV[2]) < stored then
+    return {-1}
+end
+local seq = redis.call('INCR', KEYS[4])
+local event = ARGV[1] .. ',"seq":' .. seq .. '}'
+redis.call('HSET', KEYS[1], 'event', event, 'total_bids', ARGV[2])
+redis.call('LPUSH', KEYS[5], event)
+redis.call('LTRIM', KEYS[5], 0, tonumber(ARGV[5]) - 1)
+for i = 4, 5 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+if redis.call('SET', KEYS[2], 1, 'NX', 'PX', ARGV[3]) then
+    return {0, event}
+end
+if redis.call('SET', KEYS[3], 1, 'NX', 'PX', ARGV[3] * 10) then
+    return {math.max(redis.call('PTTL', KEYS[2]), 1), event}
+end
+return {-1}
+"""
+
+# KEYS: latest state hash, gate, trailing flag
+# ARGV: interval (ms)
+TRAILING_SCRIPT = """
+redis.call('DEL', KEYS[3])
+redis.call('SET', KEYS[2], 1, 'PX', ARGV[1])
+return redis.call('HGET', KEYS[1], 'event')
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def _keys(item_id):
+    return [
+        LATEST_KEY.format(item_id=item_id),
+        GATE_KEY.format(item_id=item_id),
+        TRAILING_KEY.format(item_id=item_id),
+        SEQ_KEY.format(item_id=item_id),
+        RING_KEY.format(item_id=item_id),
+    ]
+
+
+def _interval_ms():
+    return max(int(1000 / settings.BID_FANOUT_RATE), 1)
+
+
+def encode(item_id, state):
+    """Compact event for a lot's live state (see apps.auctions.live)"""
+    return {
+        'item': item_id,
+        'price': str(state['current_price']),
+        'bids': state['total_bids'],
+        'end': int(state['end_time'].timestamp()),
+        'status': state.get('status', 'active'),
+    }
+
+
+def _watcher_ids(item_id):
+    from .models import WatchList
+
+    return list(
+        WatchList.objects.filter(item_id=item_id, notify_on_bid=True)
+        .values_list('user_id', flat=True)
+    )
+
+
+def _send(item_id, groups, event):
+    broadcast.send(groups, 'auction.bid', 'bid_update', coalesce=f'bid:{item_id}', bid=event)
+
+
+def send_to_watchers(item_id, event):
+    """Send an encoded event to the lot's watchers' groups; returns how many"""
+    groups = [f'user_{user_id}_notifications' for user_id in _watcher_ids(item_id)]
+    if groups:
+        _send(item_id, groups, event)
+    return len(groups)
+
+
+def send(item_id, event):
+    """Send an encoded event to the lot's group and its watchers' groups"""
+    _send(item_id, [f'auction_{item_id}_notifications'], event)
+    send_to_watchers(item_id, event)
+
+
+def publish(item_id, state):
+    """Publish a lot's new state now, or coalesce it into a trailing update"""
+    # The script appends the sequence number to the encoded event
+    encoded = json.dumps(encode(item_id, state))[:-1]
+    try:
+        result = _script('publish', PUBLISH_SCRIPT)(
+            keys=_keys(item_id),
+            args=[encoded, state['total_bids'], _interval_ms(), STATE_TTL, settings.BID_FANOUT_RING_SIZE],
+        )
+    except Exception as exc:
+        logger.error(f"Error coalescing bid update for item {item_id}: {exc}")
+        return
+
+    delay = int(result[0])
+    try:
+        if delay == 0:
+            from .tasks import send_bid_update_to_watchers
+
+            event = json.loads(result[1])
+            _send(item_id, [f'auction_{item_id}_notifications'], event)
+            send_bid_update_to_watchers.delay(item_id, event)
+        elif delay > 0:
+            from .tasks import publish_bid_update
+
+            publish_bid_update.apply_async((item_id,), countdown=delay / 1000)
+    except Exception as exc:
+        logger.error(f"Error publishing bid update for item {item_id}: {exc}")
+
+
+def publish_on_commit(item_id, state):
+    """Publish a lot's new state once the current transaction commits"""
+    state = dict(state)
+    transaction.on_commit(lambda: publish(item_id, state))
+
+
+def publish_trailing(item_id):
+    """Send the latest coalesced state of a lot; returns True if there was one"""
+    raw = _script('trailing', TRAILING_SCRIPT)(keys=_keys(item_id)[:3], args=[_interval_ms()])
+    if raw is None:
+        return False
+    send(item_id, json.loads(raw))
+    return True
+
+
+def missed(item_id, since):
+    """
+    Get ``(seq, events)``: the lot's current sequence number and the events
+    after ``since``, oldest first, or None in place of the events if the
+    ring buffer no longer holds all of them.
+    """
+    pipe = _redis().pipeline(transaction=True)
+    pipe.get(SEQ_KEY.format(item_id=item_id))
+    pipe.lrange(RING_KEY.format(item_id=item_id), 0, -1)
+    seq, ring = pipe.execute()
+    seq = int(seq or 0)
+
+    if since == seq:
+        return seq, []
+    if since > seq:
+        # The sequence was reset, the client's seq means nothing now
+        return seq, None
+
+    events = [event for event in (json.loads(raw) for raw in reversed(ring)) if event['seq'] > since]
+    if not events or events[0]['seq'] != since + 1:
+        return seq, None
+    return seq, events
+
+
+def snapshot(item_id):
+    """The lot's full live state as an event, or None if the item does not exist"""
+    from . import live
+
+    # Read the sequence first: the state is at least as new as it
+    try:
+        seq = int(_redis().get(SEQ_KEY.format(item_id=item_id)) or 0)
+    except Exception as exc:
+        logger.error(f"Error reading bid sequence for item {item_id}: {exc}")
+        seq = 0
+
+    state = live.get(item_id)
+    if state is None:
+        return None
+    return dict(encode(item_id, state), seq=seq)
+
+
+def resume(item_id, since=None):
+    """
+    Frames that bring a client up to date on a lot: the bid updates it
+    missed since seq ``since`` followed by ``resumed``, or one snapshot.
+    """
+    if since is not None:
+        try:
+            seq, events = missed(item_id, int(since))
+        except (TypeError, ValueError):
+            events = None
+        except Exception as exc:
+            logger.error(f"Error reading missed bid updates for item {item_id}: {exc}")
+            events = None
+        if events is not None:
+            frames = [{'type': 'bid_update', 'bid': event} for event in events]
+            frames.append({'type': 'resumed', 'auction_id': item_id, 'seq': seq})
+            return frames
+
+    state = snapshot(item_id)
+    if state is None:
+        return []
+    return [{'type': 'snapshot', 'bid': state}]
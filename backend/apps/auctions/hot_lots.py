@@ -0,0 +1,333 @@
+"""
+Hot-lot mode: Redis order book with write-behind to Postgres.
+
+Lots that take many bids per second near close can be switched into hot
+mode. Their leading price, increment rules, end time and seller are kept in
+a Redis hash and every bid is validated and accepted atomically by a Lua
+script, so acceptance never waits on the item row in Postgres; the only
+database write is the bidder's balance hold. Accepted bids are appended
+to a per-lot Redis list and flushed into ``auction_bids`` in batches by the
+``flush_hot_lot_bids`` task, which also moves the item's price, bid count,
+leading bid and end time forward in one UPDATE per batch.
+
+Each entry carries the lot's bid count after it was accepted, which is
+also what ``total_bids`` on the item reads once the entry is written. A
+flush skips entries at or below the stored count, so a batch that
+committed but was not trimmed from the list is not written twice. Bids
+keep the time they were accepted as ``created_at``.
+
+Every accepted bid holds its full amount against the bidder's balance
+(see apps.accounts.holds): the hold is taken, checked against the
+available balance, in the same database transaction as the Redis accept
+and rolled back if Redis rejects the bid. The flush releases the holds of
+the bids its batch outbid, so until then a bidder raising their own lead
+has both amounts held.
+
+The Redis path does not run the proxy resolver, so lots with live proxy
+ceilings cannot be switched into hot mode and hot lots reject bids that
+set a ceiling.
+
+Amounts are stored as integer cents and times as epoch seconds so the Lua
+side never has to deal with decimals or time zones.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from apps.accounts import holds, profile_stats
+from apps.accounts.exceptions import InsufficientBalance
+
+from . import live, proxy, scheduler
+from .exceptions import BidRejected, HotLotError
+from .models import AuctionItem, Bid
+
+logger = logging.getLogger(__name__)
+
+HOT_LOTS_KEY = 'auction:hot:lots'
+STATE_KEY = 'auction:hot:{item_id}'
+PENDING_KEY = 'auction:hot:{item_id}:bids'
+FLUSH_LOCK_KEY = 'auction:hot:{item_id}:flush'
+
+# KEYS: state hash, pending list, closing schedule
+# ARGV: bidder id, amount in cents, now (epoch seconds), item id
+PLACE_BID_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'status', 'price', 'increment',
+                         'start_ts', 'end_ts', 'extend', 'seller_id', 'category_id')
+if state[1] == 'draining' then
+    return {0, 'Auction is busy, please retry'}
+end
+if state[1] ~= 'active' then
+    return {0, 'Auction is not active'}
+end
+
+local now = tonumber(ARGV[3])
+local end_ts = tonumber(state[5])
+if now < tonumber(state[4]) or now > end_ts then
+    return {0, 'Auction is not active'}
+end
+
+if ARGV[1] == state[7] then
+    return {0, 'You cannot bid on your own item'}
+end
+
+local amount = tonumber(ARGV[2])
+local minimum = tonumber(state[2]) + tonumber(state[3])
+if amount < minimum then
+    return {0, 'min', tostring(minimum)}
+end
+
+local extend = tonumber(state[6])
+if end_ts - now < extend then
+    end_ts = now + extend
+    redis.call('ZADD', KEYS[3], end_ts, ARGV[4])
+end
+
+local total = redis.call('HINCRBY', KEYS[1], 'total_bids', 1)
+redis.call('HSET', KEYS[1], 'price', ARGV[2], 'leader_id', ARGV[1],
+           'end_ts', tostring(end_ts))
+redis.call('RPUSH', KEYS[2], ARGV[1] .. ':' .. ARGV[2] .. ':' .. ARGV[3] .. ':' .. tostring(end_ts)
+           .. ':' .. total)
+return {1, tostring(end_ts), total, state[8] or ''}
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def _to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def _from_cents(cents):
+    return (Decimal(int(cents)) / 100).quantize(Decimal('0.01'))
+
+
+def _to_datetime(ts):
+    return datetime.fromtimestamp(float(ts), tz=dt_timezone.utc)
+
+
+def is_hot(item_id):
+    """Check if item is currently in hot mode"""
+    return bool(_redis().sismember(HOT_LOTS_KEY, item_id))
+
+
+def get_hot_lots():
+    """Get ids of all items in hot mode"""
+    return sorted(int(item_id) for item_id in _redis().smembers(HOT_LOTS_KEY))
+
+
+def get_state(item_id):
+    """Get a hot lot's live bidding fields from Redis, or None if it is not hot"""
+    state = _redis().hgetall(STATE_KEY.format(item_id=item_id))
+    if not state:
+        return None
+    state = {key.decode(): value.decode() for key, value in state.items()}
+    leader_id = state.get('leader_id')
+    return {
+        'current_price': _from_cents(state['price']),
+        'total_bids': int(state['total_bids']),
+        'start_time': _to_datetime(state['start_ts']),
+        'end_time': _to_datetime(state['end_ts']),
+        'status': 'active',
+        'leading_bidder': int(leader_id) if leader_id else None,
+    }
+
+
+def enable(item):
+    """Load an active item's bidding state into Redis and switch it to hot mode"""
+    with transaction.atomic():
+        # Copy the state under the row lock, so a database bid already in
+        # progress commits first and later ones see the lot is hot
+        item = AuctionItem.objects.select_for_update(of=('self',)).get(pk=item.pk)
+        if item.status != 'active':
+            raise ValueError("Only active auctions can be switched to hot mode")
+        if proxy.live_ceilings(item.pk, item.get_next_bid_amount()):
+            raise ValueError("Auctions with live automatic bids cannot be switched to hot mode")
+
+        redis = _redis()
+        redis.hset(STATE_KEY.format(item_id=item.pk), mapping={
+            'status': item.status,
+            'price': _to_cents(item.current_price),
+            'increment': _to_cents(item.min_bid_increment),
+            'start_ts': item.start_time.timestamp(),
+            'end_ts': item.end_time.timestamp(),
+            'extend': item.auto_extend_time,
+            'seller_id': item.seller_id,
+            'category_id': item.category_id,
+            'total_bids': item.total_bids,
+        })
+        redis.sadd(HOT_LOTS_KEY, item.pk)
+    logger.info(f"Item {item.pk} switched to hot mode")
+
+
+def disable(item_id):
+    """
+    Flush outstanding bids and take the item out of hot mode.
+
+    Raises HotLotError, leaving the lot draining in hot mode for the next
+    flush, if its accepted bids could not all be written.
+    """
+    redis = _redis()
+    state_key = STATE_KEY.format(item_id=item_id)
+    pending_key = PENDING_KEY.format(item_id=item_id)
+
+    # Stop accepting bids in Redis before draining, so nothing is accepted
+    # there that the database path would not see.
+    if redis.exists(state_key):
+        redis.hset(state_key, 'status', 'draining')
+    flush(item_id, wait=True)
+    if redis.llen(pending_key):
+        raise HotLotError(f"Item {item_id} still has hot-lot bids to flush")
+
+    redis.srem(HOT_LOTS_KEY, item_id)
+    redis.delete(state_key, pending_key)
+    live.forget(item_id)
+    logger.info(f"Item {item_id} switched out of hot mode")
+
+
+def place_bid(item_id, user, amount):
+    """
+    Accept a bid on a hot lot.
+
+    Returns an unsaved Bid whose ``item`` carries the post-bid price, bid
+    count and end time; the row itself is written by the next flush.
+    """
+    if user.is_banned:
+        raise BidRejected("User account is banned")
+
+    now = time.time()
+    with transaction.atomic():
+        # The hold is checked under the user row lock, which is kept until
+        # Redis has decided, so concurrent bids of one user queue here
+        try:
+            holds.move({user.pk: amount}, checked={user.pk})
+        except InsufficientBalance:
+            raise BidRejected("Insufficient balance")
+
+        result = _script('place_bid', PLACE_BID_SCRIPT)(
+            keys=[
+                STATE_KEY.format(item_id=item_id),
+                PENDING_KEY.format(item_id=item_id),
+                scheduler.CLOSING_KEY,
+            ],
+            args=[user.pk, _to_cents(amount), now, item_id],
+        )
+
+        if int(result[0]) != 1:
+            message = result[1].decode() if isinstance(result[1], bytes) else result[1]
+            if message == 'min':
+                message = f"Bid must be at least {_from_cents(result[2])}"
+            raise BidRejected(message)
+
+    item = AuctionItem(
+        id=item_id,
+        category_id=int(result[3]) if result[3] else None,
+        current_price=amount,
+        total_bids=int(result[2]),
+        end_time=_to_datetime(result[1]),
+    )
+    return Bid(item=item, bidder=user, amount=amount, status='active', created_at=_to_datetime(now))
+
+
+def flush(item_id, batch_size=None, wait=False):
+    """
+    Write accepted bids for a hot lot to the database.
+
+    Entries are read from the head of the pending list and only trimmed once
+    the database transaction has committed, so a failed flush leaves them in
+    place for the next run, and entries the item's bid count already covers
+    are skipped. Returns the number of bids written, or 0 if another flush
+    of the item is running, unless ``wait`` is set.
+
+    Raises HotLotError, writing nothing of the batch, if it would not move
+    the item's price forward, or if ``wait`` is set and the other flush
+    does not finish in time.
+    """
+    batch_size = batch_size or settings.HOT_LOT_FLUSH_BATCH_SIZE
+    redis = _redis()
+    pending_key = PENDING_KEY.format(item_id=item_id)
+
+    lock = redis.lock(FLUSH_LOCK_KEY.format(item_id=item_id), timeout=60, blocking_timeout=5)
+    if not lock.acquire():
+        if wait:
+            raise HotLotError(f"Hot-lot bids for item {item_id} are being flushed elsewhere")
+        return 0
+
+    flushed = 0
+    try:
+        while True:
+            entries = redis.lrange(pending_key, 0, batch_size - 1)
+            if not entries:
+                break
+
+            parsed = [entry.decode().split(':') for entry in entries]
+
+            with transaction.atomic():
+                previous_bid_id, previous_leader_id, previous_price, written = (
+                    AuctionItem.objects.select_for_update(of=('self',))
+                    .values_list('leading_bid_id', 'leading_bid__bidder_id', 'current_price', 'total_bids')
+                    .get(pk=item_id)
+                )
+                bids = [
+                    Bid(
+                        item_id=item_id,
+                        bidder_id=int(bidder_id),
+                        amount=_from_cents(cents),
+                        status='outbid',
+                        created_at=_to_datetime(accepted_ts),
+                    )
+                    for bidder_id, cents, accepted_ts, _, total in parsed
+                    if int(total) > written
+                ]
+                if bids and bids[-1].amount <= previous_price:
+                    # Redis started from a stale price; writing the batch
+                    # would move the lot backwards and replace its leader
+                    raise HotLotError(
+                        f"Hot-lot bids for item {item_id} end at {bids[-1].amount}, "
+                        f"not above its price of {previous_price}"
+                    )
+                if bids:
+                    end_ts, total = parsed[-1][3], int(parsed[-1][4])
+                    bids[-1].status = 'active'
+                    if previous_bid_id:
+                        Bid.objects.filter(pk=previous_bid_id).update(status='outbid')
+                    Bid.objects.bulk_create(bids)
+                    AuctionItem.objects.filter(pk=item_id).update(
+                        current_price=bids[-1].amount,
+                        total_bids=total,
+                        leading_bid=bids[-1],
+                        end_time=_to_datetime(end_ts),
+                    )
+                    profile_stats.adjust(profile_stats.bids_placed(bid.bidder_id for bid in bids))
+                    # Each bid took its hold when it was accepted; release
+                    # the previous leader's and those of the bids outbid
+                    holds.release(
+                        [(previous_leader_id, previous_price)]
+                        + [(bid.bidder_id, bid.amount) for bid in bids[:-1]]
+                    )
+
+            redis.ltrim(pending_key, len(entries), -1)
+            flushed += len(bids)
+
+            if len(entries) < batch_size:
+                break
+    finally:
+        lock.release()
+
+    if flushed:
+        logger.info(f"Flushed {flushed} hot-lot bids for item {item_id}")
+    return flushed
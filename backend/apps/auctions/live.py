@@ -0,0 +1,157 @@
+"""
+Live bidding state of auction items.
+
+``AuctionItem`` rows mix content that rarely changes (title, description,
+images) with fields that change on every bid. Detail pages serve the
+content from the long-TTL response cache (see apps.auctions.caching) and
+merge in the live fields from a small Redis hash per item:
+
+* hot lots read their order-book hash (see apps.auctions.hot_lots);
+* other items read ``auction:live:<id>``, which the bid engine and the
+  closer write through after they commit. It is dropped when the item is
+  edited or leaves hot mode, and the next read reloads it from Postgres.
+
+Writes from concurrent commits and reloads can land out of order, so a
+write only applies if it does not move ``total_bids`` backwards or reopen
+an auction the closer has already marked as ended.
+"""
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+import logging
+import time
+
+from django.db import transaction
+from django_redis import get_redis_connection
+
+from . import caching, hot_lots
+
+logger = logging.getLogger(__name__)
+
+LIVE_KEY = 'auction:live:{item_id}'
+
+# Idle items drop out of Redis and are reloaded on their next read
+LIVE_TTL = 24 * 3600
+
+FIELDS = ('total_bids', 'current_price', 'start_ts', 'end_ts', 'status', 'leader_id')
+
+# KEYS: live hash
+# ARGV: ttl, then field/value pairs in FIELDS order (total_bids first)
+STORE_SCRIPT = """
+local stored = redis.call('HMGET', KEYS[1], 'total_bids', 'status')
+local stored_total = tonumber(stored[1])
+if stored_total then
+    local total = tonumber(ARGV[3])
+    if stored_total > total then
+        return 0
+    end
+    if stored_total == total and stored[2] ~= 'active' and ARGV[11] == 'active' then
+        return 0
+    end
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def _encode(state):
+    return {
+        'total_bids': state['total_bids'],
+        'current_price': str(state['current_price']),
+        'start_ts': state['start_time'].timestamp(),
+        'end_ts': state['end_time'].timestamp(),
+        'status': state['status'],
+        'leader_id': state['leading_bidder'] or '',
+    }
+
+
+def _decode(raw):
+    raw = {key.decode(): value.decode() for key, value in raw.items()}
+    return {
+        'current_price': Decimal(raw['current_price']),
+        'total_bids': int(raw['total_bids']),
+        'start_time': datetime.fromtimestamp(float(raw['start_ts']), tz=dt_timezone.utc),
+        'end_time': datetime.fromtimestamp(float(raw['end_ts']), tz=dt_timezone.utc),
+        'status': raw['status'],
+        'leading_bidder': int(raw['leader_id']) if raw['leader_id'] else None,
+    }
+
+
+def _load(item_id):
+    from django.db.models import F
+
+    from .models import AuctionItem
+
+    return (
+        AuctionItem.objects.filter(pk=item_id)
+        .values('current_price', 'total_bids', 'start_time', 'end_time', 'status')
+        .annotate(leading_bidder=F('leading_bid__bidder_id'))
+        .first()
+    )
+
+
+def store(item_id, state):
+    """Write an item's live state unless a later write got there first"""
+    encoded = _encode(state)
+    args = [LIVE_TTL]
+    for field in FIELDS:
+        args.extend([field, encoded[field]])
+    try:
+        _script('store', STORE_SCRIPT)(keys=[LIVE_KEY.format(item_id=item_id)], args=args)
+    except Exception as exc:
+        logger.error(f"Error storing live state for item {item_id}: {exc}")
+
+
+def store_on_commit(item_id, state):
+    """Write an item's live state once the current transaction commits"""
+    transaction.on_commit(lambda: store(item_id, state))
+
+
+def forget(*item_ids):
+    """Drop stored live state so the next read reloads it from the database"""
+    if not item_ids:
+        return
+    try:
+        _redis().delete(*(LIVE_KEY.format(item_id=item_id) for item_id in item_ids))
+    except Exception as exc:
+        logger.error(f"Error dropping live state for items {item_ids}: {exc}")
+
+
+def forget_on_commit(*item_ids):
+    """Drop stored live state once the current transaction commits"""
+    transaction.on_commit(lambda: forget(*item_ids))
+
+
+def get(item_id):
+    """Get an item's live bidding fields, or None if the item does not exist"""
+    started = time.perf_counter()
+    try:
+        state = hot_lots.get_state(item_id)
+        if state is None:
+            raw = _redis().hgetall(LIVE_KEY.format(item_id=item_id))
+            state = _decode(raw) if raw else None
+    except Exception as exc:
+        logger.error(f"Live state unavailable for item {item_id}: {exc}")
+        return _load(item_id)
+
+    if state is not None:
+        caching.record('item_live', 'hits', (time.perf_counter() - started) * 1000)
+        return state
+
+    state = _load(item_id)
+    if state is not None:
+        store(item_id, state)
+    caching.record('item_live', 'misses', (time.perf_counter() - started) * 1000)
+    return state
@@ -0,0 +1,102 @@
+"""
+Contention benchmark for the bid engine.
+
+Runs several worker threads that all bid on the same active item, each
+always bidding the minimum next amount it last saw, and reports accepted
+and rejected bids per second plus latency percentiles. Meant for a staging
+database: the bids it places are real.
+
+    python manage.py bench_bids <item_id> --workers 16 --bids 50
+"""
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.auctions.bidding import BidRejected, place_bid
+from apps.auctions.models import AuctionItem
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measure bid throughput under contention on a single item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('item_id', type=int)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--bids', type=int, default=25, help='Bids attempted per worker')
+
+    def handle(self, *args, **options):
+        try:
+            item = AuctionItem.objects.get(pk=options['item_id'])
+        except AuctionItem.DoesNotExist:
+            raise CommandError(f"Item {options['item_id']} does not exist")
+
+        if not item.is_active():
+            raise CommandError(f"Item {item.pk} is not active")
+
+        bidders = list(
+            User.objects.exclude(pk=item.seller_id)
+            .filter(is_banned=False, balance__gt=0)
+            .order_by('-balance')[:options['workers']]
+        )
+        if not bidders:
+            raise CommandError("No users with a positive balance to bid with")
+
+        self.stdout.write(
+            f"Benchmarking item {item.pk} with {len(bidders)} workers "
+            f"x {options['bids']} bids"
+        )
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(bidders)) as pool:
+            results = list(pool.map(
+                lambda user: self._worker(item.pk, user, options['bids']),
+                bidders
+            ))
+        elapsed = time.perf_counter() - started
+
+        accepted = sum(r['accepted'] for r in results)
+        rejected = sum(r['rejected'] for r in results)
+        latencies = sorted(l for r in results for l in r['latencies'])
+
+        item.refresh_from_db()
+        self.stdout.write(f"Elapsed:        {elapsed:.3f}s")
+        self.stdout.write(f"Accepted bids:  {accepted} ({accepted / elapsed:.1f}/s)")
+        self.stdout.write(f"Rejected bids:  {rejected} ({rejected / elapsed:.1f}/s)")
+        if latencies:
+            self.stdout.write(
+                f"Latency ms:     p50={statistics.median(latencies):.2f} "
+                f"p95={self._percentile(latencies, 95):.2f} "
+                f"p99={self._percentile(latencies, 99):.2f} "
+                f"max={latencies[-1]:.2f}"
+            )
+        self.stdout.write(f"Final price:    {item.current_price} after {item.total_bids} bids")
+
+    def _worker(self, item_id, user, count):
+        result = {'accepted': 0, 'rejected': 0, 'latencies': []}
+        try:
+            for _ in range(count):
+                price, increment = AuctionItem.objects.filter(pk=item_id).values_list(
+                    'current_price', 'min_bid_increment'
+                ).get()
+
+                started = time.perf_counter()
+                try:
+                    place_bid(item_id, user, price + increment)
+                    result['accepted'] += 1
+                except BidRejected:
+                    result['rejected'] += 1
+                result['latencies'].append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        return result
+
+    @staticmethod
+    def _percentile(values, pct):
+        index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+        return values[index]
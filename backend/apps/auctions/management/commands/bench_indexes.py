@@ -0,0 +1,232 @@
+"""
+Benchmark the auction hot-path queries with and without the model indexes.
+
+Each query is run with EXPLAIN ANALYZE as the schema stands, then again
+inside a transaction that drops every index declared in the auction models'
+``Meta.indexes`` and is rolled back afterwards. The drop holds an exclusive
+lock on the tables until the rollback, so only run this against a
+benchmark database.
+
+    python manage.py bench_indexes --seed --bids 1000000
+    python manage.py bench_indexes --repeat 5 --plans
+"""
+from datetime import timedelta
+import re
+import statistics
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.auctions.models import AuctionHistory, AuctionItem, Bid, Category, WatchList
+
+User = get_user_model()
+
+INDEXED_MODELS = [AuctionItem, Bid, WatchList, AuctionHistory]
+
+SEED_PREFIX = 'bench-'
+
+SEED_BIDS_SQL = """
+    INSERT INTO auction_bids (item_id, bidder_id, amount, status, max_bid, created_at)
+    SELECT i.ids[1 + g %% array_length(i.ids, 1)],
+           u.ids[1 + (g * 7919) %% array_length(u.ids, 1)],
+           (g / array_length(i.ids, 1) + 1)::numeric(10, 2),
+           'outbid',
+           CASE WHEN g %% 20 = 0 THEN (g / array_length(i.ids, 1) + 50)::numeric(10, 2) END,
+           now() - make_interval(secs => %(count)s - g)
+    FROM generate_series(1, %(count)s) AS g,
+         (SELECT array_agg(id) AS ids FROM auction_items WHERE slug LIKE %(prefix)s) AS i,
+         (SELECT array_agg(id) AS ids FROM users WHERE username LIKE %(prefix)s) AS u
+"""
+
+SEED_WATCHLIST_SQL = """
+    INSERT INTO auction_watchlist (item_id, user_id, notify_on_bid, notify_on_price_change,
+                                   notify_on_ending_soon, created_at)
+    SELECT i.id, u.ids[1 + (i.id * 31 + g) %% array_length(u.ids, 1)], true, true, true, now()
+    FROM auction_items i,
+         generate_series(1, %(per_item)s) AS g,
+         (SELECT array_agg(id) AS ids FROM users WHERE username LIKE %(prefix)s) AS u
+    WHERE i.slug LIKE %(prefix)s
+    ON CONFLICT DO NOTHING
+"""
+
+SEED_HISTORY_SQL = """
+    INSERT INTO auction_history (item_id, user_id, action, details, created_at)
+    SELECT item_id, bidder_id, 'bid_placed', NULL, created_at
+    FROM auction_bids
+    WHERE item_id IN (SELECT id FROM auction_items WHERE slug LIKE %(prefix)s)
+"""
+
+EXECUTION_TIME = re.compile(r'Execution Time: ([\d.]+) ms')
+
+
+class Command(BaseCommand):
+    help = 'Compare EXPLAIN ANALYZE timings of hot-path queries with and without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Seed a benchmark dataset first')
+        parser.add_argument('--bids', type=int, default=1_000_000)
+        parser.add_argument('--items', type=int, default=20_000)
+        parser.add_argument('--users', type=int, default=2_000)
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per query, median is reported')
+        parser.add_argument('--plans', action='store_true', help='Print the query plans')
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self._seed(options['users'], options['items'], options['bids'])
+
+        sample = self._sample()
+        if sample is None:
+            raise CommandError("No data to benchmark, run with --seed first")
+
+        queries = self._queries(*sample)
+
+        with_indexes = self._run(queries, options['repeat'])
+        with transaction.atomic():
+            dropped = self._drop_indexes()
+            without_indexes = self._run(queries, options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"Dropped {dropped} indexes for the baseline (rolled back)\n")
+        self.stdout.write(f"{'query':<24} {'no index ms':>12} {'indexed ms':>12} {'speedup':>9}")
+        for name in queries:
+            before, before_plan = without_indexes[name]
+            after, after_plan = with_indexes[name]
+            speedup = before / after if after else float('inf')
+            self.stdout.write(f"{name:<24} {before:>12.3f} {after:>12.3f} {speedup:>8.1f}x")
+
+            if options['plans']:
+                self.stdout.write(f"\n-- {name}, without indexes\n{before_plan}")
+                self.stdout.write(f"\n-- {name}, with indexes\n{after_plan}\n")
+
+    def _sample(self):
+        item = AuctionItem.objects.filter(status='active').order_by('-total_bids', 'id').first()
+        bidder = Bid.objects.order_by('bidder_id').values_list('bidder_id', flat=True).first()
+        if item is None or bidder is None:
+            return None
+        return item, bidder
+
+    def _queries(self, item, bidder_id):
+        now = timezone.now()
+        return {
+            'active ending soon': AuctionItem.objects.filter(status='active').order_by('end_time')[:20],
+            'active newest': AuctionItem.objects.filter(status='active').order_by('-created_at')[:20],
+            'category listing': AuctionItem.objects.filter(
+                category_id=item.category_id, status='active'
+            ).order_by('-created_at')[:20],
+            'seller listing': AuctionItem.objects.filter(
+                seller_id=item.seller_id, status='active'
+            ).order_by('-created_at')[:20],
+            'due lots': AuctionItem.objects.filter(
+                status='active', end_time__lte=now
+            ).values_list('id', flat=True)[:1000],
+            'highest bid': Bid.objects.filter(item=item).order_by('-amount', '-id')[:1],
+            'item bid history': Bid.objects.filter(item=item).order_by('-created_at')[:50],
+            'bidder active bids': Bid.objects.filter(
+                bidder_id=bidder_id, status='active'
+            ).order_by('-created_at')[:50],
+            'proxy ceilings': Bid.objects.filter(
+                item=item, max_bid__gte=item.get_next_bid_amount()
+            ).values('bidder_id').annotate(ceiling=Max('max_bid'), placed_at=Min('created_at')).order_by(),
+            'item watchers': WatchList.objects.filter(item=item).values_list('user_id', flat=True),
+            'user watchlist': WatchList.objects.filter(user_id=bidder_id).order_by('-created_at')[:20],
+            'item history': AuctionHistory.objects.filter(item=item).order_by('-created_at')[:50],
+        }
+
+    def _run(self, queries, repeat):
+        results = {}
+        for name, queryset in queries.items():
+            timings = []
+            plan = ''
+            for _ in range(max(1, repeat)):
+                plan = queryset.explain(analyze=True, buffers=True)
+                match = EXECUTION_TIME.search(plan)
+                timings.append(float(match.group(1)) if match else 0.0)
+            results[name] = (statistics.median(timings), plan)
+        return results
+
+    def _drop_indexes(self):
+        dropped = 0
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(f'DROP INDEX IF EXISTS "{index.name}"')
+                    dropped += 1
+        return dropped
+
+    def _seed(self, users, items, bids):
+        self.stdout.write(f"Seeding {users} users, {items} items and {bids} bids...")
+        now = timezone.now()
+
+        User.objects.bulk_create(
+            [
+                User(
+                    username=f'{SEED_PREFIX}{n}',
+                    email=f'{SEED_PREFIX}{n}@example.com',
+                    api_key=f'{SEED_PREFIX}{n}',
+                )
+                for n in range(users)
+            ],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+        seller_ids = list(
+            User.objects.filter(username__startswith=SEED_PREFIX).values_list('id', flat=True)
+        )
+        categories = [
+            Category.objects.get_or_create(name=f'Benchmark {n}', defaults={'slug': f'{SEED_PREFIX}{n}'})[0]
+            for n in range(20)
+        ]
+
+        # One in five lots is active, the rest have already closed
+        AuctionItem.objects.bulk_create(
+            [
+                AuctionItem(
+                    title=f'Benchmark lot {n}',
+                    slug=f'{SEED_PREFIX}{n}',
+                    description='Benchmark lot',
+                    category=categories[n % len(categories)],
+                    seller_id=seller_ids[n % len(seller_ids)],
+                    starting_price=1,
+                    current_price=1,
+                    status='active' if n % 5 == 0 else 'ended',
+                    end_time=now + timedelta(minutes=n % 10_000 - 100),
+                )
+                for n in range(items)
+            ],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+
+        prefix = f'{SEED_PREFIX}%'
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_BIDS_SQL, {'count': bids, 'prefix': prefix})
+            cursor.execute(SEED_WATCHLIST_SQL, {'per_item': 5, 'prefix': prefix})
+            cursor.execute(SEED_HISTORY_SQL, {'prefix': prefix})
+
+            # Leave the newest bid on each lot active, as the engine would
+            cursor.execute("""
+                UPDATE auction_bids b SET status = 'active'
+                FROM (
+                    SELECT DISTINCT ON (item_id) id FROM auction_bids
+                    WHERE item_id IN (SELECT id FROM auction_items WHERE slug LIKE %s)
+                    ORDER BY item_id, amount DESC, id DESC
+                ) leaders
+                WHERE b.id = leaders.id
+            """, [prefix])
+            cursor.execute("""
+                UPDATE auction_items i
+                SET current_price = s.price, total_bids = s.total
+                FROM (
+                    SELECT item_id, max(amount) AS price, count(*) AS total
+                    FROM auction_bids GROUP BY item_id
+                ) s
+                WHERE i.id = s.item_id AND i.slug LIKE %s
+            """, [prefix])
+
+            for model in INDEXED_MODELS:
+                cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+
+        self.stdout.write(self.style.SUCCESS("Seeded benchmark data"))
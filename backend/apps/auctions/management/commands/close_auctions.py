@@ -0,0 +1,22 @@
+"""
+Close every auction past its end time and report throughput.
+
+    python manage.py close_auctions [--batch-size 1000]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.auctions.closing import close_due_auctions
+
+
+class Command(BaseCommand):
+    help = 'Settle all due auctions in set-based batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        closed, sold, elapsed = close_due_auctions(options['batch_size'])
+        rate = closed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} auctions ({sold} sold) in {elapsed:.2f}s, {rate:.0f} lots/sec"
+        ))
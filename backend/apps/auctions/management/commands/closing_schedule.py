@@ -0,0 +1,31 @@
+"""
+Inspect or rebuild the Redis auction closing schedule.
+
+    python manage.py closing_schedule status
+    python manage.py closing_schedule rebuild
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+
+from apps.auctions import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Show or rebuild the schedule used to close auctions on time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'rebuild'])
+
+    def handle(self, *args, **options):
+        if options['action'] == 'rebuild':
+            scheduled = scheduler.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Scheduled {scheduled} active auctions"))
+            return
+
+        self.stdout.write(f"Scheduled auctions: {scheduler.pending_count()}")
+        head = scheduler.next_due()
+        if head:
+            item_id, ts = head
+            due_at = datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+            self.stdout.write(f"Next to close: item {item_id} at {due_at.isoformat()}")
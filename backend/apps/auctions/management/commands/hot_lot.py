@@ -0,0 +1,46 @@
+"""
+Switch auctions in and out of hot-lot mode.
+
+    python manage.py hot_lot enable <item_id> [<item_id> ...]
+    python manage.py hot_lot disable <item_id> [<item_id> ...]
+    python manage.py hot_lot list
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.auctions import hot_lots
+from apps.auctions.exceptions import HotLotError
+from apps.auctions.models import AuctionItem
+
+
+class Command(BaseCommand):
+    help = 'Enable, disable or list Redis-backed hot-lot bidding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['enable', 'disable', 'list'])
+        parser.add_argument('item_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        action = options['action']
+
+        if action == 'list':
+            for item_id in hot_lots.get_hot_lots():
+                self.stdout.write(str(item_id))
+            return
+
+        if not options['item_ids']:
+            raise CommandError(f"'{action}' needs at least one item id")
+
+        for item_id in options['item_ids']:
+            if action == 'enable':
+                try:
+                    item = AuctionItem.objects.get(pk=item_id)
+                    hot_lots.enable(item)
+                except (AuctionItem.DoesNotExist, ValueError) as e:
+                    raise CommandError(f"Item {item_id}: {e}")
+            else:
+                try:
+                    hot_lots.disable(item_id)
+                except HotLotError as e:
+                    raise CommandError(f"Item {item_id}: {e}")
+
+            self.stdout.write(self.style.SUCCESS(f"Item {item_id}: hot mode {action}d"))
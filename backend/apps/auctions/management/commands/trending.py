@@ -0,0 +1,30 @@
+"""
+Inspect or rebuild the Redis trending scores.
+
+    python manage.py trending status [--category ID]
+    python manage.py trending rebuild
+"""
+from django.core.management.base import BaseCommand
+
+from apps.auctions import trending
+
+
+class Command(BaseCommand):
+    help = 'Show the top trending items or rebuild the trending scores from recent events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['status', 'rebuild'])
+        parser.add_argument('--category', type=int, default=None)
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['action'] == 'rebuild':
+            scored = trending.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Scored {scored} active items"))
+            return
+
+        ranked = trending.top(options['category'], options['limit'])
+        if not ranked:
+            self.stdout.write("No trending items")
+        for position, (item_id, score) in enumerate(ranked, 1):
+            self.stdout.write(f"{position:>3}. item {item_id}  score {score:.3f}")
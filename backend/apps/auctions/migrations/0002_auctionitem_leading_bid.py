@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0001_create_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionitem',
+            name='leading_bid',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_item', to='auctions.bid'),
+        ),
+        # Point every item at its highest bid (latest wins a tie, which is
+        # the automatic reply of a proxy that matched the newcomer)
+        migrations.RunSQL(
+            sql="""
+                UPDATE auction_items AS i
+                SET leading_bid_id = b.id
+                FROM (
+                    SELECT DISTINCT ON (item_id) id, item_id
+                    FROM auction_bids
+                    ORDER BY item_id, amount DESC, id DESC
+                ) AS b
+                WHERE b.item_id = i.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        # Every bid except an item's leader is outbid; settled won/lost rows
+        # are left alone
+        migrations.RunSQL(
+            sql="""
+                UPDATE auction_bids AS b
+                SET status = 'outbid'
+                WHERE b.status = 'active'
+                  AND NOT EXISTS (
+                      SELECT 1 FROM auction_items AS i
+                      WHERE i.leading_bid_id = b.id
+                  );
+
+                UPDATE auction_bids AS b
+                SET status = 'active'
+                FROM auction_items AS i
+                WHERE i.leading_bid_id = b.id
+                  AND i.status = 'active'
+                  AND b.status = 'outbid';
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:18
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking writes on the bid tables
+    atomic = False
+
+    dependencies = [
+        ('auctions', '0002_auctionitem_leading_bid'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='auctionhistory',
+            index=models.Index(fields=['item', '-created_at'], name='history_item_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionhistory',
+            index=models.Index(fields=['user', '-created_at'], name='history_user_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_time'], name='items_active_end_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-created_at'], name='items_active_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(fields=['category', 'status', '-created_at'], name='items_cat_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(fields=['seller', 'status', '-created_at'], name='items_seller_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(fields=['status', '-created_at'], name='items_status_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bid',
+            index=models.Index(fields=['item', '-amount', '-id'], name='bids_item_amount_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bid',
+            index=models.Index(fields=['item', '-created_at'], name='bids_item_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bid',
+            index=models.Index(fields=['bidder', 'status', '-created_at'], name='bids_bidder_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bid',
+            index=models.Index(condition=models.Q(('max_bid__isnull', False)), fields=['item', 'max_bid'], name='bids_item_proxy_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='watchlist',
+            index=models.Index(fields=['item', 'user'], name='watch_item_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='watchlist',
+            index=models.Index(fields=['user', '-created_at'], name='watch_user_created_idx'),
+        ),
+    ]
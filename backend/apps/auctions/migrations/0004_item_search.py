@@ -0,0 +1,101 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:21
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations
+
+BACKFILL_BATCH_SIZE = 5000
+
+# Rewriting the title fires the search vector trigger for one batch of rows
+BACKFILL_SQL = """
+    WITH batch AS (
+        SELECT id FROM auction_items WHERE id > %s ORDER BY id LIMIT %s
+    )
+    UPDATE auction_items i SET title = i.title
+    FROM batch
+    WHERE i.id = batch.id
+    RETURNING i.id
+"""
+
+
+def backfill_search_vector(apps, schema_editor):
+    # The migration is not atomic, so each batch commits on its own and
+    # only locks its own rows
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            cursor.execute(BACKFILL_SQL, [last_id, BACKFILL_BATCH_SIZE])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            last_id = max(ids)
+
+
+class Migration(migrations.Migration):
+    # Backfill in batches and build the indexes without blocking writes on
+    # auction_items
+    atomic = False
+
+    dependencies = [
+        ('auctions', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='auctionitem',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # A generated column cannot read the category name from another
+        # table, so the document is kept up to date by triggers instead. The
+        # item trigger only fires when a searchable column is written, not on
+        # the price and bid count updates of the bid engine.
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION auction_items_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    NEW.search_vector :=
+                        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                        setweight(to_tsvector('english', coalesce(
+                            (SELECT name FROM auction_categories WHERE id = NEW.category_id), ''
+                        )), 'B') ||
+                        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER auction_items_search_vector_trigger
+                    BEFORE INSERT OR UPDATE OF title, description, category_id ON auction_items
+                    FOR EACH ROW EXECUTE FUNCTION auction_items_search_vector_update();
+
+                CREATE FUNCTION auction_categories_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE auction_items SET title = title WHERE category_id = NEW.id;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER auction_categories_search_vector_trigger
+                    AFTER UPDATE OF name ON auction_categories
+                    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+                    EXECUTE FUNCTION auction_categories_search_vector_update();
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS auction_categories_search_vector_trigger ON auction_categories;
+                DROP FUNCTION IF EXISTS auction_categories_search_vector_update();
+                DROP TRIGGER IF EXISTS auction_items_search_vector_trigger ON auction_items;
+                DROP FUNCTION IF EXISTS auction_items_search_vector_update();
+            """,
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='items_search_vector_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='items_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
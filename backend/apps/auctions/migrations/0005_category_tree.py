@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_item_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='full_name',
+            field=models.CharField(blank=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='subtree_item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        # Backfill the materialized paths, names and active-item counts
+        # (the same statements as apps.auctions.categories.rebuild)
+        migrations.RunSQL(
+            sql="""
+                WITH RECURSIVE tree AS (
+                    SELECT id, id::text || '/' AS path, 0 AS depth, name::text AS full_name
+                    FROM auction_categories
+                    WHERE parent_id IS NULL
+                    UNION ALL
+                    SELECT c.id, t.path || c.id || '/', t.depth + 1, t.full_name || ' > ' || c.name
+                    FROM auction_categories c
+                    JOIN tree t ON c.parent_id = t.id
+                )
+                UPDATE auction_categories c
+                SET path = t.path, depth = t.depth, full_name = t.full_name
+                FROM tree t
+                WHERE c.id = t.id;
+
+                UPDATE auction_categories c
+                SET item_count = n.total
+                FROM (
+                    SELECT category_id, count(*) AS total
+                    FROM auction_items
+                    WHERE status = 'active'
+                    GROUP BY category_id
+                ) n
+                WHERE c.id = n.category_id;
+
+                UPDATE auction_categories c
+                SET subtree_item_count = s.total
+                FROM (
+                    SELECT a.id, sum(d.item_count) AS total
+                    FROM auction_categories a
+                    JOIN auction_categories d ON d.path LIKE a.path || '%'
+                    GROUP BY a.id
+                ) s
+                WHERE c.id = s.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,69 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_category_tree'),
+    ]
+
+    operations = [
+        # Keep the heap tuple small so bid updates rewrite only the live
+        # columns: descriptions longer than toast_tuple_target move out of
+        # line and an UPDATE that leaves them alone reuses the TOAST pointer.
+        # fillfactor leaves room for the new row versions on the same page.
+        # Existing rows are only moved by a table rewrite (VACUUM FULL or
+        # pg_repack), new and updated rows pick the settings up directly.
+        migrations.RunSQL(
+            sql="ALTER TABLE auction_items SET (fillfactor = 85, toast_tuple_target = 256);",
+            reverse_sql="ALTER TABLE auction_items RESET (fillfactor, toast_tuple_target);",
+        ),
+        # Only rebuild the search document when a searchable value actually
+        # changed, not whenever one is written with the same value. Category
+        # renames write the new document directly instead of touching titles.
+        migrations.RunSQL(
+            sql="""
+                DROP TRIGGER auction_items_search_vector_trigger ON auction_items;
+
+                CREATE TRIGGER auction_items_search_vector_insert_trigger
+                    BEFORE INSERT ON auction_items
+                    FOR EACH ROW EXECUTE FUNCTION auction_items_search_vector_update();
+
+                CREATE TRIGGER auction_items_search_vector_update_trigger
+                    BEFORE UPDATE OF title, description, category_id ON auction_items
+                    FOR EACH ROW WHEN (
+                        OLD.title IS DISTINCT FROM NEW.title
+                        OR OLD.category_id IS DISTINCT FROM NEW.category_id
+                        OR OLD.description IS DISTINCT FROM NEW.description
+                    )
+                    EXECUTE FUNCTION auction_items_search_vector_update();
+
+                CREATE OR REPLACE FUNCTION auction_categories_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE auction_items
+                    SET search_vector =
+                        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'B') ||
+                        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+                    WHERE category_id = NEW.id;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql;
+            """,
+            reverse_sql="""
+                DROP TRIGGER auction_items_search_vector_update_trigger ON auction_items;
+                DROP TRIGGER auction_items_search_vector_insert_trigger ON auction_items;
+
+                CREATE TRIGGER auction_items_search_vector_trigger
+                    BEFORE INSERT OR UPDATE OF title, description, category_id ON auction_items
+                    FOR EACH ROW EXECUTE FUNCTION auction_items_search_vector_update();
+
+                CREATE OR REPLACE FUNCTION auction_categories_search_vector_update() RETURNS trigger AS $$
+                BEGIN
+                    UPDATE auction_items SET title = title WHERE category_id = NEW.id;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql;
+            """,
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_item_storage'),
+    ]
+
+    operations = [
+        # No schema change: the default is applied by Django, so hot-lot
+        # flushes can write the time each bid was accepted.
+        migrations.AlterField(
+            model_name='bid',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
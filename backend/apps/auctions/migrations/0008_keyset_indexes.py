@@ -0,0 +1,41 @@
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build and drop the indexes without blocking writes on auction_items
+    atomic = False
+
+    dependencies = [
+        ('auctions', '0007_bid_created_at'),
+    ]
+
+    operations = [
+        # Active listings are paged on (end_time, id) or (created_at, id),
+        # optionally within a category
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['end_time', 'id'], name='items_active_end_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['category', 'end_time', 'id'], name='items_active_cat_end_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='auctionitem',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['-created_at', '-id'], name='items_active_created_id_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='auctionitem',
+            name='items_active_end_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='auctionitem',
+            name='items_active_created_idx',
+        ),
+        # Covered by unique_together (user, item) and the item foreign key index
+        RemoveIndexConcurrently(
+            model_name='watchlist',
+            name='watch_item_user_idx',
+        ),
+    ]
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchVectorField
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
@@ -30,9 +32,19 @@ class Category(models.Model):
     is_active = models.BooleanField(default=True)
     sort_order = models.PositiveIntegerField(default=0)
 
+    # Materialized tree (see apps.auctions.categories)
+    path = models.CharField(max_length=255, blank=True, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    full_name = models.CharField(max_length=500, blank=True, editable=False)
+    item_count = models.IntegerField(default=0, editable=False)
+    subtree_item_count = models.IntegerField(default=0, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Maintained by the tree helpers, never written from a stale instance
+    TREE_FIELDS = ('path', 'depth', 'full_name', 'item_count', 'subtree_item_count')
+
     class Meta:
         db_table = 'auction_categories'
         verbose_name = 'Category'
@@ -43,19 +55,47 @@ class Category(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
+        from .categories import place
+
         if not self.slug:
             self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Category.objects.filter(pk=self.pk).values_list(
+                    'path', 'full_name', 'depth', 'parent_id'
+                ).first()
+            if previous is not None and kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    f.name for f in self._meta.concrete_fields
+                    if not f.primary_key and f.name not in self.TREE_FIELDS
+                ]
+
+            super().save(*args, **kwargs)
+            place(self, previous)
 
     def get_absolute_url(self):
         return reverse('auctions:category', kwargs={'slug': self.slug})
 
     def get_full_path(self):
         """Get full category path"""
+        if self.full_name:
+            return self.full_name
         if self.parent:
             return f"{self.parent.get_full_path()} > {self.name}"
         return self.name
 
+    def get_descendant_ids(self, include_self=True):
+        """Get ids of all categories in this subtree"""
+        from .categories import get_descendant_ids
+        return get_descendant_ids(self, include_self)
+
+    def get_ancestor_ids(self):
+        """Get ids of all ancestors, root first"""
+        from .categories import ancestor_ids
+        return ancestor_ids(self.path)[:-1]
+
 
 class AuctionItem(models.Model):
     """Main auction item model"""
@@ -143,6 +183,13 @@ class AuctionItem(models.Model):
         blank=True,
         related_name='winning_item'
     )
+    leading_bid = models.OneToOneField(
+        'Bid',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='leading_item'
+    )
 
     # Additional Information
     location = models.CharField(max_length=200, blank=True)
@@ -158,6 +205,10 @@ class AuctionItem(models.Model):
     view_count = models.PositiveIntegerField(default=0)
     watch_count = models.PositiveIntegerField(default=0)
 
+    # Full-text search document over title, category name and description,
+    # maintained by database triggers (see apps.auctions.search)
+    search_vector = SearchVectorField(null=True, editable=False)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -167,10 +218,62 @@ class AuctionItem(models.Model):
         verbose_name = 'Auction Item'
         verbose_name_plural = 'Auction Items'
         ordering = ['-created_at']
+        indexes = [
+            # Listings and the closer only ever look at active lots; the id
+            # tie-breaker lets keyset pages seek straight to the cursor
+            models.Index(
+                fields=['end_time', 'id'],
+                name='items_active_end_id_idx',
+                condition=models.Q(status='active'),
+            ),
+            models.Index(
+                fields=['category', 'end_time', 'id'],
+                name='items_active_cat_end_idx',
+                condition=models.Q(status='active'),
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='items_active_created_id_idx',
+                condition=models.Q(status='active'),
+            ),
+            models.Index(fields=['category', 'status', '-created_at'], name='items_cat_status_idx'),
+            models.Index(fields=['seller', 'status', '-created_at'], name='items_seller_status_idx'),
+            models.Index(fields=['status', '-created_at'], name='items_status_created_idx'),
+            GinIndex(fields=['search_vector'], name='items_search_vector_idx'),
+            GinIndex(fields=['title'], name='items_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._remember_loaded_values(fields)
+
+    def _remember_loaded_values(self, fields=None):
+        """Remember column values as stored so save() can write only what changed"""
+        loaded = getattr(self, '_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__ and (fields is None or field.name in fields or field.attname in fields):
+                loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def _changed_fields(self):
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return None
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if not field.primary_key and field.attname in self.__dict__
+            and (field.attname not in loaded or getattr(self, field.attname) != loaded[field.attname])
+        ]
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -179,7 +282,19 @@ class AuctionItem(models.Model):
         if self.total_bids == 0:
             self.current_price = self.starting_price
 
+        # Write only the columns that changed: a full-row save rewrites the
+        # TOASTed description and fires the search trigger for nothing
+        if not self._state.adding and not args and not any(
+            kwargs.get(option) for option in ('update_fields', 'force_insert', 'force_update')
+        ):
+            changed = self._changed_fields()
+            if changed is not None:
+                if not changed:
+                    return
+                kwargs['update_fields'] = changed + ['updated_at']
+
         super().save(*args, **kwargs)
+        self._remember_loaded_values()
 
     def get_absolute_url(self):
         return reverse('auctions:item_detail', kwargs={'slug': self.slug})
@@ -211,47 +326,44 @@ class AuctionItem(models.Model):
         if not self.is_active():
             return False, "Auction is not active"
 
-        if user == self.seller:
+        if user.pk == self.seller_id:
             return False, "You cannot bid on your own item"
 
+        if user.is_banned:
+            return False, "User account is banned"
+
         if amount < self.get_next_bid_amount():
             return False, f"Bid must be at least {self.get_next_bid_amount()}"
 
-        if not user.can_bid(amount):
+        if not user.can_bid(amount, self.get_held_amount(user)):
             return False, "Insufficient balance"
 
         return True, "Valid bid"
 
-    def place_bid(self, user, amount):
-        """Place a bid on this item"""
-        can_bid, message = self.can_bid(user, amount)
-
-        if not can_bid:
-            raise ValueError(message)
+    def get_held_amount(self, user):
+        """Amount held from the user's balance for leading this auction"""
+        if self.leading_bid_id and self.leading_bid.bidder_id == user.pk:
+            return self.current_price
+        return 0
 
-        # Check if auction should be extended
-        time_left = self.time_left()
-        if time_left.total_seconds() < self.auto_extend_time:
-            self.end_time = timezone.now() + timedelta(seconds=self.auto_extend_time)
-            self.save()
+    def place_bid(self, user, amount, max_bid=None):
+        """Place a bid on this item (see apps.auctions.bidding)"""
+        from .bidding import place_bid
 
-        # Create bid
-        bid = Bid.objects.create(
-            item=self,
-            bidder=user,
-            amount=amount
-        )
+        bid = place_bid(self.pk, user, amount, max_bid)
 
-        # Update item
-        self.current_price = amount
-        self.total_bids += 1
-        self.save()
+        # Refresh the live fields from the locked row the engine updated
+        self.current_price = bid.item.current_price
+        self.total_bids = bid.item.total_bids
+        self.end_time = bid.item.end_time
 
         return bid
 
     def get_highest_bid(self):
         """Get the highest bid"""
-        return self.bids.order_by('-amount').first()
+        if self.leading_bid_id:
+            return self.leading_bid
+        return self.bids.order_by('-amount', '-id').first()
 
     def get_watchers(self):
         """Get users watching this item"""
@@ -264,19 +376,16 @@ class AuctionItem(models.Model):
         return self.current_price >= self.reserve_price
 
     def end_auction(self):
-        """End the auction and determine winner"""
+        """End the auction and determine winner (see apps.auctions.closing)"""
         if self.status != 'active':
             return
 
-        self.status = 'ended'
+        from .closing import close_auctions
 
-        highest_bid = self.get_highest_bid()
-        if highest_bid and self.has_reserve_met():
-            self.winner = highest_bid.bidder
-            self.winning_bid = highest_bid
-            self.status = 'sold'
-
-        self.save()
+        for result in close_auctions([self.pk], due_only=False):
+            self.status = 'sold' if result['sold'] else 'ended'
+            self.winner_id = result['bidder_id'] if result['sold'] else None
+            self.winning_bid_id = result['bid_id'] if result['sold'] else None
 
     def get_main_image(self):
         """Get main image for the item"""
@@ -343,24 +452,29 @@ class Bid(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))]
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Hot-lot bids are written behind with the time they were accepted
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         db_table = 'auction_bids'
         verbose_name = 'Bid'
         verbose_name_plural = 'Bids'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['item', '-amount', '-id'], name='bids_item_amount_idx'),
+            models.Index(fields=['item', '-created_at'], name='bids_item_created_idx'),
+            models.Index(fields=['bidder', 'status', '-created_at'], name='bids_bidder_status_idx'),
+            # Live proxy ceilings are looked up per item
+            models.Index(
+                fields=['item', 'max_bid'],
+                name='bids_item_proxy_idx',
+                condition=models.Q(max_bid__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.bidder.username} - {self.amount} on {self.item.title}"
 
-    def save(self, *args, **kwargs):
-        # Mark previous bids as outbid
-        if self.pk is None:  # New bid
-            self.item.bids.exclude(bidder=self.bidder).update(status='outbid')
-
-        super().save(*args, **kwargs)
-
 
 class Comment(models.Model):
     """Comments on auction items"""
@@ -414,6 +528,9 @@ class WatchList(models.Model):
         verbose_name = 'Watch List'
         verbose_name_plural = 'Watch Lists'
         unique_together = ['user', 'item']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='watch_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} watching {self.item.title}"
@@ -447,6 +564,10 @@ class AuctionHistory(models.Model):
         verbose_name = 'Auction History'
         verbose_name_plural = 'Auction History'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['item', '-created_at'], name='history_item_created_idx'),
+            models.Index(fields=['user', '-created_at'], name='history_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.item.title}"
@@ -482,7 +603,9 @@ class SavedSearch(models.Model):
         queryset = AuctionItem.objects.filter(status='active')
 
         if self.query:
-            queryset = queryset.filter(title__icontains=self.query)
+            queryset = queryset.filter(
+                search_vector=SearchQuery(self.query, search_type='websearch', config='english')
+            )
 
         if self.category:
             queryset = queryset.filter(category=self.category)
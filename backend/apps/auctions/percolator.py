@@ -0,0 +1,318 @@
+"""
+Reverse-indexed saved-search matcher ("percolator").
+
+Instead of running every saved search against each new item, the active
+saved searches with ``notify_on_match`` are loaded once per process into an
+in-memory index, and a newly activated item is matched against the index:
+
+* searches whose query is a plain list of words are filed under their
+  rarest lexeme, so an item only visits the searches filed under lexemes
+  it actually contains, and each candidate is then checked for all of its
+  lexemes;
+* searches whose query uses ``or``, ``-term`` or a quoted phrase are
+  checked against the item's attributes in Python and then against its
+  ``search_vector`` in Postgres, in one query for all of them;
+* searches without a query are bucketed by ``(category, condition)`` and
+  kept sorted by ``min_price``, so only the searches whose range starts at
+  or below the item's price are checked.
+
+Queries are parsed by Postgres with ``websearch_to_tsquery``, the same way
+``SavedSearch.get_matching_items`` runs them, so a saved search alerts on
+the items it would return.
+
+Saving or deleting a saved search records its id in a Redis change log
+under a new version number. On the next match every process reloads just
+the searches that changed since its version, and only rebuilds the whole
+index when the log no longer reaches back that far.
+"""
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, namedtuple
+from decimal import Decimal
+import logging
+import re
+import time
+
+from django.db import connection
+from django_redis import get_redis_connection
+
+from .search import SEARCH_CONFIG
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'saved_search_index:version'
+CHANGES_KEY = 'saved_search_index:changes'
+TRIMMED_KEY = 'saved_search_index:trimmed'
+
+# Changed search ids kept in the log; older processes rebuild in full
+MAX_CHANGES = 10000
+
+Entry = namedtuple('Entry', [
+    'id', 'user_id', 'terms', 'category_id', 'condition', 'min_price', 'max_price', 'operators',
+])
+
+# The parsed query of a plain list of words: 'red' & 'bike'
+PLAIN_QUERY = re.compile(r"'(?:[^']|'')+'(?: & '(?:[^']|'')+')*")
+LEXEME = re.compile(r"'((?:[^']|'')+)'")
+
+LOAD_SQL = """
+    SELECT id, user_id, category_id, condition, min_price, max_price,
+           CASE WHEN query <> '' THEN websearch_to_tsquery(%s, query)::text END
+    FROM auction_saved_searches
+    WHERE is_active AND notify_on_match {ids}
+"""
+
+ITEM_SQL = """
+    SELECT tsvector_to_array(search_vector), category_id, condition, current_price, seller_id
+    FROM auction_items
+    WHERE id = %s
+"""
+
+# Saved searches among the given ones whose query matches the item
+OPERATOR_MATCH_SQL = """
+    SELECT s.id
+    FROM auction_saved_searches s, auction_items i
+    WHERE i.id = %s AND s.id = ANY(%s)
+      AND i.search_vector @@ websearch_to_tsquery(%s, s.query)
+"""
+
+# KEYS: version, change log, newest version trimmed from the log
+# ARGV: most changes kept, changed search ids
+CHANGED_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+for i = 2, #ARGV do
+    redis.call('ZADD', KEYS[2], version, ARGV[i])
+end
+local keep = tonumber(ARGV[1])
+local trimmed = redis.call('ZRANGE', KEYS[2], -keep - 1, -keep - 1, 'WITHSCORES')
+if #trimmed > 0 then
+    redis.call('SET', KEYS[3], trimmed[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -keep - 1)
+end
+return version
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def parse_query(tsquery):
+    """
+    Get ``(terms, operators)`` for a parsed saved query: its lexemes if it
+    is a plain conjunction, otherwise no terms and ``operators`` set.
+    """
+    if tsquery is None:
+        return frozenset(), False
+    if not PLAIN_QUERY.fullmatch(tsquery):
+        # Also a query of only stop words, which matches nothing
+        return frozenset(), True
+    return frozenset(term.replace("''", "'") for term in LEXEME.findall(tsquery)), False
+
+
+class SavedSearchIndex:
+    """In-memory reverse index over saved searches"""
+
+    def __init__(self, entries=()):
+        entries = list(entries)
+        self.entries = {}
+        self.frequency = Counter(term for e in entries for term in e.terms)
+        self.by_term = defaultdict(dict)
+        self.with_operators = {}
+        # Per bucket: sort keys (min_price, id) for bisect and the entries
+        self.buckets = defaultdict(lambda: ([], []))
+        for entry in entries:
+            self._file(entry)
+
+    @property
+    def size(self):
+        return len(self.entries)
+
+    def _file(self, entry):
+        if entry.operators:
+            self.with_operators[entry.id] = entry
+            place = None
+        elif entry.terms:
+            place = min(entry.terms, key=lambda term: (self.frequency[term], term))
+            self.by_term[place][entry.id] = entry
+        else:
+            place = (entry.category_id, entry.condition)
+            keys, bucket = self.buckets[place]
+            key = (entry.min_price or Decimal('0'), entry.id)
+            position = bisect_left(keys, key)
+            keys.insert(position, key)
+            bucket.insert(position, entry)
+        self.entries[entry.id] = (entry, place)
+
+    def add(self, entry):
+        """Add a saved search, replacing an earlier version of it"""
+        self.remove(entry.id)
+        self.frequency.update(entry.terms)
+        self._file(entry)
+
+    def remove(self, search_id):
+        """Drop a saved search if it is in the index"""
+        if search_id not in self.entries:
+            return
+        entry, place = self.entries.pop(search_id)
+        self.frequency.subtract(entry.terms)
+
+        if entry.operators:
+            del self.with_operators[search_id]
+        elif entry.terms:
+            del self.by_term[place][search_id]
+            if not self.by_term[place]:
+                del self.by_term[place]
+        else:
+            keys, bucket = self.buckets[place]
+            position = bisect_left(keys, (entry.min_price or Decimal('0'), entry.id))
+            del keys[position], bucket[position]
+
+    @staticmethod
+    def _accepts(entry, category_id, condition, price):
+        return (
+            (entry.category_id is None or entry.category_id == category_id) and
+            (not entry.condition or entry.condition == condition) and
+            (not entry.min_price or price >= entry.min_price) and
+            (not entry.max_price or price <= entry.max_price)
+        )
+
+    def match(self, terms, category_id, condition, price):
+        """
+        Get ``(matches, candidates)`` for an item with these attributes:
+        entries of the saved searches it matches, and entries whose query
+        uses operators and still has to be checked against the item.
+        """
+        terms = frozenset(terms)
+        matches = []
+
+        for term in terms:
+            for entry in self.by_term.get(term, {}).values():
+                if entry.terms <= terms and self._accepts(entry, category_id, condition, price):
+                    matches.append(entry)
+
+        for key in ((category_id, condition), (category_id, ''), (None, condition), (None, '')):
+            if key not in self.buckets:
+                continue
+            keys, bucket = self.buckets[key]
+            for entry in bucket[:bisect_right(keys, (price, float('inf')))]:
+                if not entry.max_price or price <= entry.max_price:
+                    matches.append(entry)
+
+        candidates = [
+            entry for entry in self.with_operators.values()
+            if self._accepts(entry, category_id, condition, price)
+        ]
+        return matches, candidates
+
+
+def _load_entries(search_ids=None):
+    sql = LOAD_SQL.format(ids='AND id = ANY(%s)' if search_ids is not None else '')
+    params = [SEARCH_CONFIG] + ([list(search_ids)] if search_ids is not None else [])
+
+    entries = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for search_id, user_id, category_id, condition, min_price, max_price, tsquery in rows:
+                terms, operators = parse_query(tsquery)
+                entries.append(Entry(
+                    search_id, user_id, terms,
+                    category_id, condition or '', min_price, max_price, operators,
+                ))
+    return entries
+
+
+_index = None
+_index_version = None
+
+
+def changed(*search_ids):
+    """Record that saved searches were saved or deleted; returns the new version"""
+    return _script('changed', CHANGED_SCRIPT)(
+        keys=[VERSION_KEY, CHANGES_KEY, TRIMMED_KEY],
+        args=[MAX_CHANGES, *search_ids],
+    )
+
+
+def _pending_changes(since):
+    """
+    Get ``(version, search_ids)``: the current version and the searches
+    changed after ``since``, or None in place of the ids if the log does
+    not reach back that far.
+    """
+    pipe = _redis().pipeline(transaction=True)
+    pipe.get(VERSION_KEY)
+    pipe.get(TRIMMED_KEY)
+    pipe.zrangebyscore(CHANGES_KEY, f'({since}', '+inf')
+    version, trimmed, search_ids = pipe.execute()
+    version = int(version or 0)
+
+    # The version was reset, or changes after ``since`` were trimmed
+    if since > version or int(trimmed or 0) > since:
+        return version, None
+    return version, {int(search_id) for search_id in search_ids}
+
+
+def get_index():
+    """Get this process's index, applying saved-search changes since it was loaded"""
+    global _index, _index_version
+
+    search_ids = None
+    if _index is not None:
+        version, search_ids = _pending_changes(_index_version)
+        if search_ids is not None:
+            if search_ids:
+                entries = {entry.id: entry for entry in _load_entries(search_ids)}
+                for search_id in search_ids:
+                    if search_id in entries:
+                        _index.add(entries[search_id])
+                    else:
+                        _index.remove(search_id)
+            _index_version = version
+            return _index
+
+    started = time.perf_counter()
+    version = int(_redis().get(VERSION_KEY) or 0)
+    _index = SavedSearchIndex(_load_entries())
+    _index_version = version
+    logger.info(
+        f"Built saved-search index of {_index.size} searches "
+        f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+    )
+    return _index
+
+
+def match_item(item_id):
+    """
+    Match an item against the saved searches.
+
+    Returns ``(entries, seller_id)``; entries belonging to the seller are
+    left out.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(ITEM_SQL, [item_id])
+        row = cursor.fetchone()
+    if row is None:
+        return [], None
+
+    terms, category_id, condition, price, seller_id = row
+    entries, candidates = get_index().match(terms or (), category_id, condition, price)
+
+    candidates = {entry.id: entry for entry in candidates if entry.user_id != seller_id}
+    if candidates:
+        with connection.cursor() as cursor:
+            cursor.execute(OPERATOR_MATCH_SQL, [item_id, list(candidates), SEARCH_CONFIG])
+            entries += [candidates[search_id] for search_id, in cursor.fetchall()]
+
+    return [e for e in entries if e.user_id != seller_id], seller_id
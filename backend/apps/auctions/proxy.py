@@ -0,0 +1,65 @@
+"""
+Proxy (automatic) bidding resolver.
+
+A bid may carry a ``max_bid`` ceiling. When a new bid arrives, every bidder
+whose ceiling can still beat the next minimum is collected, sorted by
+ceiling (ties go to whoever committed first) and settled in one pass: the
+top bidder leads at the runner-up's ceiling plus one increment, capped at
+their own ceiling. Only the resulting visible bids are written, instead of
+one bid per increment as the proxies outbid each other.
+
+Once settled, every losing ceiling is at or below the visible price, so in
+steady state the only live proxy is the leader's and k stays small.
+"""
+from collections import namedtuple
+
+from django.db.models import Max, Min
+
+from .models import Bid
+
+ProxyBid = namedtuple('ProxyBid', ['bidder_id', 'ceiling', 'placed_at'])
+
+
+def live_ceilings(item_id, minimum):
+    """Get each bidder's highest ceiling that still reaches ``minimum``, by bidder id"""
+    rows = (
+        Bid.objects.filter(item_id=item_id, max_bid__gte=minimum)
+        .values('bidder_id')
+        .annotate(ceiling=Max('max_bid'), placed_at=Min('created_at'))
+        .order_by()
+    )
+    return {r['bidder_id']: ProxyBid(r['bidder_id'], r['ceiling'], r['placed_at']) for r in rows}
+
+
+def resolve(new_bid, amount, increment, contenders):
+    """
+    Settle ``new_bid`` (a ProxyBid whose ``amount`` already passed validation)
+    against competing proxies.
+
+    Returns ``(price, rows)``: the resulting visible price and the bid rows to
+    write, in order, as ``(bidder_id, amount, max_bid)`` tuples. The last row
+    is the leader's.
+    """
+    ranked = sorted(
+        contenders + [new_bid],
+        key=lambda p: (-p.ceiling, p.placed_at),
+    )
+    leader = ranked[0]
+
+    if len(ranked) == 1:
+        return amount, [(new_bid.bidder_id, amount, new_bid.ceiling)]
+
+    runner_up = ranked[1]
+    price = min(leader.ceiling, runner_up.ceiling + increment)
+
+    if leader.bidder_id == new_bid.bidder_id:
+        price = max(price, amount)
+        return price, [(new_bid.bidder_id, price, new_bid.ceiling)]
+
+    # An existing proxy holds the lead: the newcomer's bid is recorded at the
+    # amount they submitted, so their ceiling is not published, and the
+    # leader's proxy answers with a single automatic bid.
+    return price, [
+        (new_bid.bidder_id, amount, new_bid.ceiling),
+        (leader.bidder_id, price, leader.ceiling),
+    ]
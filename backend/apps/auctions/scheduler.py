@@ -0,0 +1,144 @@
+"""
+Auction closing scheduler.
+
+Active lots are indexed by end time in a Redis sorted set (score = epoch
+seconds, member = item id). ``check_auction_endings`` runs every second and
+atomically pops the members whose score has passed, so each lot is closed
+once and within about a second of expiry, without scanning
+``auction_items``.
+
+The set is kept in step with the database by:
+
+* the AuctionItem post_save signal (lots entering or leaving 'active');
+* the bid engine, which re-scores a lot when a bid auto-extends it;
+* the hot-lot Lua script, which re-scores the lot in the same atomic step
+  that extends it;
+* ``reconcile_closing_schedule``, which re-adds overdue active lots that
+  were missed (for example while Redis was unavailable).
+"""
+import logging
+import time
+
+from django.db import transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+CLOSING_KEY = 'auction:closing'
+
+# KEYS: closing set
+# ARGV: now (epoch seconds), max members to pop
+POP_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #due > 0 then
+    redis.call('ZREM', KEYS[1], unpack(due))
+end
+return due
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def schedule(item_id, end_time):
+    """Schedule (or reschedule) an item to close at ``end_time``"""
+    _redis().zadd(CLOSING_KEY, {item_id: end_time.timestamp()})
+
+
+def schedule_many(items):
+    """Schedule ``(item_id, end_time)`` pairs in one round trip"""
+    mapping = {item_id: end_time.timestamp() for item_id, end_time in items}
+    if mapping:
+        _redis().zadd(CLOSING_KEY, mapping)
+
+
+def unschedule(item_id):
+    """Remove an item from the closing schedule"""
+    _redis().zrem(CLOSING_KEY, item_id)
+
+
+def unschedule_many(item_ids):
+    """Remove several items from the closing schedule"""
+    if item_ids:
+        _redis().zrem(CLOSING_KEY, *item_ids)
+
+
+def _apply_safely(func, item_id, *args):
+    # The database change has already committed, so a Redis outage must not
+    # surface as a failed request; the reconcile task picks the item up.
+    try:
+        func(item_id, *args)
+    except Exception as exc:
+        logger.error(f"Error updating closing schedule for item {item_id}: {exc}")
+
+
+def schedule_on_commit(item_id, end_time):
+    """Schedule an item once the current transaction commits"""
+    transaction.on_commit(lambda: _apply_safely(schedule, item_id, end_time))
+
+
+def unschedule_on_commit(item_id):
+    """Unschedule an item once the current transaction commits"""
+    transaction.on_commit(lambda: _apply_safely(unschedule, item_id))
+
+
+def unschedule_many_on_commit(item_ids):
+    """Unschedule several items once the current transaction commits"""
+    transaction.on_commit(lambda: _apply_safely(unschedule_many, item_ids))
+
+
+def pop_due(limit=1000, now=None):
+    """Atomically take up to ``limit`` item ids whose end time has passed"""
+    now = time.time() if now is None else now
+    due = _script('pop_due', POP_DUE_SCRIPT)(keys=[CLOSING_KEY], args=[now, limit])
+    return [int(item_id) for item_id in due]
+
+
+def pending_count():
+    """Get the number of scheduled items"""
+    return _redis().zcard(CLOSING_KEY)
+
+
+def next_due():
+    """Get ``(item_id, epoch seconds)`` of the next item to close, or None"""
+    head = _redis().zrange(CLOSING_KEY, 0, 0, withscores=True)
+    if not head:
+        return None
+    item_id, score = head[0]
+    return int(item_id), score
+
+
+def rebuild(chunk_size=5000):
+    """Rebuild the schedule from every active item in the database"""
+    from .models import AuctionItem
+
+    redis = _redis()
+    redis.delete(CLOSING_KEY)
+
+    scheduled = 0
+    batch = []
+    for item_id, end_time in (
+        AuctionItem.objects.filter(status='active')
+        .values_list('id', 'end_time')
+        .iterator(chunk_size=chunk_size)
+    ):
+        batch.append((item_id, end_time))
+        if len(batch) >= chunk_size:
+            schedule_many(batch)
+            scheduled += len(batch)
+            batch = []
+
+    schedule_many(batch)
+    scheduled += len(batch)
+
+    logger.info(f"Rebuilt closing schedule with {scheduled} active items")
+    return scheduled
@@ -0,0 +1,178 @@
+"""
+Full-text search over active auction items.
+
+``auction_items.search_vector`` holds a weighted tsvector of the title (A),
+category name (B) and description (C), kept current by the triggers in
+migration 0004 and indexed with GIN. Queries are parsed with
+``websearch_to_tsquery`` (quoted phrases, ``or``, ``-word``) and ranked
+with ``ts_rank_cd``. Items whose title is a close trigram match for the
+query (``<%``, backed by a ``gin_trgm_ops`` index) are included too, so
+typos still find something.
+
+One statement returns both the requested page of ranked ids and the
+category, condition and price-bucket facet counts over the full match
+set, computed with GROUPING SETS over a single CTE scan.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+
+from .models import AuctionItem
+
+SEARCH_CONFIG = 'english'
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = [10, 50, 100, 500, 1000]
+
+MAX_PAGE_SIZE = 50
+MAX_OFFSET = 1000
+
+SEARCH_SQL = """
+    WITH matches AS (
+        SELECT i.id, i.category_id, c.name AS category_name, i.condition,
+               width_bucket(i.current_price, %(buckets)s::numeric[]) AS price_bucket,
+               {rank} AS rank, i.end_time
+        FROM auction_items i
+        JOIN auction_categories c ON c.id = i.category_id
+        WHERE {where}
+    ),
+    page AS (
+        SELECT id, rank, end_time FROM matches
+        ORDER BY {order}
+        LIMIT %(limit)s OFFSET %(offset)s
+    )
+    SELECT 'hit' AS kind, id, rank, NULL::text AS label, NULL::bigint AS hits,
+           row_number() OVER (ORDER BY {order}) AS position
+    FROM page
+    UNION ALL
+    SELECT CASE
+               WHEN GROUPING(category_id) = 0 THEN 'category'
+               WHEN GROUPING(condition) = 0 THEN 'condition'
+               WHEN GROUPING(price_bucket) = 0 THEN 'price'
+               ELSE 'total'
+           END,
+           coalesce(category_id, price_bucket),
+           NULL,
+           CASE
+               WHEN GROUPING(category_id) = 0 THEN max(category_name)
+               WHEN GROUPING(condition) = 0 THEN condition
+           END,
+           count(*),
+           NULL
+    FROM matches
+    GROUP BY GROUPING SETS ((category_id), (condition), (price_bucket), ())
+"""
+
+RANK_SQL = """
+    ts_rank_cd(i.search_vector, websearch_to_tsquery(%(config)s, %(q)s))
+    + word_similarity(%(q)s, i.title)
+"""
+
+MATCH_SQL = """
+    (i.search_vector @@ websearch_to_tsquery(%(config)s, %(q)s) OR %(q)s <%% i.title)
+"""
+
+
+def _price_label(bucket):
+    if bucket == 0:
+        return f"Under {PRICE_BUCKETS[0]}"
+    if bucket >= len(PRICE_BUCKETS):
+        return f"{PRICE_BUCKETS[-1]} and over"
+    return f"{PRICE_BUCKETS[bucket - 1]}-{PRICE_BUCKETS[bucket]}"
+
+
+def _to_decimal(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def search_items(query='', category=None, condition=None, min_price=None, max_price=None,
+                 limit=20, offset=0):
+    """
+    Search active items.
+
+    Returns a dict with the page of ``items`` (ranked best first, or ending
+    soonest when there is no query), the ``count`` of all matches and
+    ``facets`` for category, condition and price. Pages only reach
+    ``MAX_OFFSET`` deep: a larger offset raises ValueError and the last
+    page there has no ``has_next``.
+    """
+    query = (query or '').strip()
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, int(offset))
+    if offset > MAX_OFFSET:
+        raise ValueError(f"Offset cannot be more than {MAX_OFFSET}")
+
+    params = {
+        'config': SEARCH_CONFIG,
+        'q': query,
+        'buckets': PRICE_BUCKETS,
+        'limit': limit,
+        'offset': offset,
+    }
+    where = ["i.status = 'active'"]
+
+    if query:
+        where.append(MATCH_SQL)
+        rank = RANK_SQL
+        order = 'rank DESC, id DESC'
+    else:
+        rank = '0'
+        order = 'end_time, id'
+
+    if category:
+        where.append('i.category_id = %(category)s')
+        params['category'] = int(category)
+    if condition:
+        where.append('i.condition = %(condition)s')
+        params['condition'] = condition
+    if min_price not in (None, '') and _to_decimal(min_price) is not None:
+        where.append('i.current_price >= %(min_price)s')
+        params['min_price'] = _to_decimal(min_price)
+    if max_price not in (None, '') and _to_decimal(max_price) is not None:
+        where.append('i.current_price <= %(max_price)s')
+        params['max_price'] = _to_decimal(max_price)
+
+    sql = SEARCH_SQL.format(rank=rank, where=' AND '.join(where), order=order)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    hits = []
+    total = 0
+    facets = {'category': [], 'condition': [], 'price': []}
+    for kind, key, rank, label, count, position in rows:
+        if kind == 'hit':
+            hits.append((position, key, rank))
+        elif kind == 'total':
+            total = count
+        elif kind == 'category':
+            facets['category'].append({'id': key, 'name': label, 'count': count})
+        elif kind == 'condition':
+            facets['condition'].append({'value': label, 'count': count})
+        else:
+            facets['price'].append({'bucket': key, 'label': _price_label(key), 'count': count})
+
+    for values in facets.values():
+        values.sort(key=lambda facet: -facet['count'])
+    facets['price'].sort(key=lambda facet: facet['bucket'])
+
+    hits.sort()
+    items = AuctionItem.objects.select_related('category').defer('search_vector').in_bulk(
+        [key for _, key, _ in hits]
+    )
+    results = []
+    for _, key, rank in hits:
+        if key in items:
+            item = items[key]
+            item.rank = float(rank) if rank is not None else None
+            results.append(item)
+
+    return {
+        'items': results,
+        'count': total,
+        'facets': facets,
+        'has_next': offset + len(results) < total and offset + limit <= MAX_OFFSET,
+    }
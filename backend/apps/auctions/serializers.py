@@ -0,0 +1,99 @@
+from rest_framework import serializers
+from .models import AuctionItem, AuctionHistory, Bid
+
+
+def format_time_left(left):
+    """Format time left as e.g. '2d 3h 15m'"""
+    if not left:
+        return 'Ended'
+
+    hours, minutes = left.seconds // 3600, left.seconds % 3600 // 60
+    if left.days:
+        return f"{left.days}d {hours}h {minutes}m"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
+
+
+class AuctionItemListSerializer(serializers.ModelSerializer):
+    """Compact serializer for auction item listings"""
+
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+    is_active = serializers.SerializerMethodField()
+    time_left = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuctionItem
+        fields = [
+            'id', 'title', 'slug', 'category', 'category_name', 'condition',
+            'current_price', 'total_bids', 'view_count', 'watch_count', 'status', 'is_active',
+            'start_time', 'end_time', 'time_left', 'is_featured', 'created_at'
+        ]
+
+    def get_is_active(self, obj):
+        """Check if item is accepting bids"""
+        return obj.is_active()
+
+    def get_time_left(self, obj):
+        """Format time left as e.g. '2d 3h 15m'"""
+        return format_time_left(obj.time_left())
+
+
+class AuctionItemDetailSerializer(serializers.ModelSerializer):
+    """
+    Static fields of an auction item.
+
+    Live bidding fields (price, bid count, end time, status) are cached
+    separately, see AuctionItemDetailAPIView.
+    """
+
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    category_path = serializers.CharField(source='category.full_name', read_only=True)
+    seller_username = serializers.CharField(source='seller.username', read_only=True)
+    starting_price = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+    buy_now_price = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+    min_bid_increment = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False, read_only=True)
+    has_reserve = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuctionItem
+        fields = [
+            'id', 'title', 'slug', 'description', 'category', 'category_name',
+            'category_path', 'condition', 'seller', 'seller_username',
+            'starting_price', 'buy_now_price', 'min_bid_increment', 'has_reserve',
+            'start_time', 'auto_extend_time', 'location', 'weight', 'dimensions',
+            'allow_questions', 'is_featured', 'images', 'created_at', 'updated_at'
+        ]
+
+    def get_has_reserve(self, obj):
+        """Reveal whether there is a reserve, not its amount"""
+        return obj.reserve_price is not None
+
+    def get_images(self, obj):
+        """Image URLs, main image first"""
+        return [
+            {'url': image.image.url, 'caption': image.caption, 'is_main': image.is_main}
+            for image in sorted(obj.images.all(), key=lambda image: (not image.is_main, image.order))
+        ]
+
+
+class BidSerializer(serializers.ModelSerializer):
+    """Serializer for Bid model"""
+
+    bidder_username = serializers.CharField(source='bidder.username', read_only=True)
+
+    class Meta:
+        model = Bid
+        fields = ['id', 'item', 'bidder', 'bidder_username', 'amount', 'status', 'created_at']
+
+
+class AuctionHistorySerializer(serializers.ModelSerializer):
+    """Serializer for AuctionHistory model"""
+
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = AuctionHistory
+        fields = ['id', 'item', 'user', 'username', 'action', 'details', 'created_at']
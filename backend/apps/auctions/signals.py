@@ -0,0 +1,186 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from .models import AuctionItem, Category, Comment, SavedSearch, WatchList
+from . import caching, categories, counters, live, percolator, scheduler, statistics, trending
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=AuctionItem)
+def update_closing_schedule(sender, instance, **kwargs):
+    """Keep the closing schedule in step with the item's status and end time"""
+    try:
+        if instance.status == 'active':
+            scheduler.schedule_on_commit(instance.pk, instance.end_time)
+        else:
+            scheduler.unschedule_on_commit(instance.pk)
+    except Exception as e:
+        logger.error(f"Error updating closing schedule for item {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=AuctionItem)
+def remove_from_closing_schedule(sender, instance, **kwargs):
+    """Drop deleted items from the closing schedule"""
+    try:
+        scheduler.unschedule_on_commit(instance.pk)
+    except Exception as e:
+        logger.error(f"Error removing item {instance.pk} from closing schedule: {e}")
+
+
+@receiver(pre_save, sender=AuctionItem)
+def remember_previous_status(sender, instance, **kwargs):
+    """Keep the stored status, category and slug so post_save can see what changed"""
+    previous = None
+    if instance.pk:
+        previous = sender.objects.filter(pk=instance.pk).values_list('status', 'category_id', 'slug').first()
+    (
+        instance._previous_status, instance._previous_category_id, instance._previous_slug,
+    ) = previous or (None, None, None)
+
+
+@receiver(post_save, sender=AuctionItem)
+def update_category_counts(sender, instance, **kwargs):
+    """Keep active-item counts of the category tree current"""
+    deltas = Counter()
+    if getattr(instance, '_previous_status', None) == 'active':
+        deltas[instance._previous_category_id] -= 1
+    if instance.status == 'active':
+        deltas[instance.category_id] += 1
+
+    if any(deltas.values()):
+        categories.adjust_item_counts(deltas)
+
+
+@receiver(post_delete, sender=AuctionItem)
+def remove_from_category_counts(sender, instance, **kwargs):
+    """Drop deleted active items from the category counts"""
+    if instance.status == 'active':
+        categories.adjust_item_counts({instance.category_id: -1})
+
+
+@receiver(post_save, sender=AuctionItem)
+def update_statistics(sender, instance, created, **kwargs):
+    """Move item and active-auction statistics with the item"""
+    changes = Counter()
+    previous_category_id = instance.category_id if created else getattr(instance, '_previous_category_id', None)
+    if created:
+        changes[(instance.category_id, 'total_items')] += 1
+    elif previous_category_id != instance.category_id:
+        changes[(previous_category_id, 'total_items')] -= 1
+        changes[(instance.category_id, 'total_items')] += 1
+        changes[(previous_category_id, 'total_bids')] -= instance.total_bids
+        changes[(instance.category_id, 'total_bids')] += instance.total_bids
+
+    if getattr(instance, '_previous_status', None) == 'active':
+        changes[(previous_category_id, 'active_auctions')] -= 1
+    if instance.status == 'active':
+        changes[(instance.category_id, 'active_auctions')] += 1
+
+    statistics.adjust_on_commit(changes)
+
+
+@receiver(post_delete, sender=AuctionItem)
+def remove_from_statistics(sender, instance, **kwargs):
+    """Drop deleted items from the statistics"""
+    changes = Counter({
+        (instance.category_id, 'total_items'): -1,
+        (instance.category_id, 'total_bids'): -instance.total_bids,
+    })
+    if instance.status == 'active':
+        changes[(instance.category_id, 'active_auctions')] -= 1
+    elif instance.status == 'sold':
+        changes[(instance.category_id, 'sold_items')] -= 1
+        changes[(instance.category_id, 'gmv_cents')] -= statistics.to_cents(instance.current_price)
+    statistics.adjust_on_commit(changes)
+
+
+@receiver(post_save, sender=get_user_model())
+def count_registered_user(sender, instance, created, **kwargs):
+    """Count new users in the statistics"""
+    if created:
+        statistics.adjust_on_commit({(None, 'registered_users'): 1})
+
+
+@receiver(post_delete, sender=get_user_model())
+def uncount_deleted_user(sender, instance, **kwargs):
+    """Drop deleted users from the statistics"""
+    statistics.adjust_on_commit({(None, 'registered_users'): -1})
+
+
+@receiver(post_save, sender=AuctionItem)
+def match_saved_searches(sender, instance, **kwargs):
+    """Queue saved-search notifications when an item becomes active"""
+    if instance.status != 'active' or getattr(instance, '_previous_status', None) == 'active':
+        return
+
+    try:
+        from .tasks import notify_saved_search_matches
+        item_id = instance.pk
+        transaction.on_commit(lambda: notify_saved_search_matches.delay(item_id))
+    except Exception as e:
+        logger.error(f"Error queuing saved-search matching for item {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=SavedSearch)
+@receiver(post_delete, sender=SavedSearch)
+def invalidate_saved_search_index(sender, instance, **kwargs):
+    """Make every process reload the saved search in its saved-search index"""
+    try:
+        search_id = instance.pk
+        transaction.on_commit(lambda: percolator.changed(search_id))
+    except Exception as e:
+        logger.error(f"Error invalidating saved-search index: {e}")
+
+
+@receiver(post_save, sender=AuctionItem)
+@receiver(post_delete, sender=AuctionItem)
+def invalidate_item_cache(sender, instance, **kwargs):
+    """Drop cached content and live state for the item, its slugs and the lists it may appear in"""
+    try:
+        # The stored slug stops resolving after a rename; the new one may
+        # have pointed at another item
+        slugs = {instance.slug, getattr(instance, '_previous_slug', None)} - {None, ''}
+        caching.bump_on_commit(
+            caching.item_namespace(instance.pk), caching.LISTINGS,
+            *(caching.slug_namespace(slug) for slug in slugs),
+        )
+        live.forget_on_commit(instance.pk)
+    except Exception as e:
+        logger.error(f"Error invalidating cache for item {instance.pk}: {e}")
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    """Drop the cached category tree"""
+    try:
+        caching.bump_on_commit(caching.CATEGORIES)
+    except Exception as e:
+        logger.error(f"Error invalidating category cache: {e}")
+
+
+@receiver(post_save, sender=WatchList)
+def count_watch_added(sender, instance, created, **kwargs):
+    """Buffer the item's watcher count increment and score it for trending"""
+    if created:
+        counters.record_watch_on_commit(instance.item_id, 1)
+        category_id = AuctionItem.objects.filter(pk=instance.item_id).values_list('category_id', flat=True).first()
+        trending.record_on_commit(instance.item_id, category_id, 'watch')
+
+
+@receiver(post_delete, sender=WatchList)
+def count_watch_removed(sender, instance, **kwargs):
+    """Buffer the item's watcher count decrement"""
+    counters.record_watch_on_commit(instance.item_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def score_comment(sender, instance, created, **kwargs):
+    """Score new comments for trending"""
+    if created:
+        category_id = AuctionItem.objects.filter(pk=instance.item_id).values_list('category_id', flat=True).first()
+        trending.record_on_commit(instance.item_id, category_id, 'comment')
@@ -0,0 +1,171 @@
+"""
+Site-wide and per-category auction statistics, maintained incrementally.
+
+Counters live in Redis hashes (one global, one per category) and are moved
+by the events that change them, after the change commits:
+
+* item created, deleted or moved between categories: ``total_items``;
+* item activated or deactivated, auction closed: ``active_auctions``;
+* bids accepted by the bid engine: ``total_bids``;
+* auctions closed with a sale: ``sold_items`` and ``gmv_cents``;
+* users registered or deleted: ``registered_users`` (global only).
+
+Reading them is a single HGETALL, falling back to counting in the database
+while Redis is unavailable. ``reconcile`` recomputes everything with one
+grouped scan of ``auction_items`` and runs periodically; increments that
+race with it may be lost or counted twice, and the next run corrects them.
+"""
+from collections import Counter
+from decimal import Decimal
+import logging
+
+from django.db import connection, transaction
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = 'auction:stats'
+CATEGORY_KEY = 'auction:stats:category:{category_id}'
+CATEGORIES_KEY = 'auction:stats:categories'
+RECONCILE_LOCK_KEY = 'auction:stats:reconcile'
+
+FIELDS = ('total_items', 'active_auctions', 'total_bids', 'sold_items', 'gmv_cents')
+
+RECONCILE_SQL = """
+    SELECT category_id,
+           count(*),
+           count(*) FILTER (WHERE status = 'active'),
+           coalesce(sum(total_bids), 0),
+           count(*) FILTER (WHERE status = 'sold'),
+           coalesce(sum(current_price * 100) FILTER (WHERE status = 'sold'), 0)::bigint
+    FROM auction_items
+    GROUP BY category_id
+"""
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def adjust(changes):
+    """
+    Apply counter changes given as ``{(category_id, field): delta}``.
+
+    Each change is applied to the global counters and, unless the category
+    is None, to that category's counters.
+    """
+    totals = Counter()
+    for (category_id, field), delta in changes.items():
+        totals[(None, field)] += delta
+        if category_id is not None:
+            totals[(category_id, field)] += delta
+
+    totals = {key: delta for key, delta in totals.items() if delta}
+    if not totals:
+        return
+
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for (category_id, field), delta in totals.items():
+            if category_id is None:
+                pipe.hincrby(GLOBAL_KEY, field, delta)
+            else:
+                pipe.sadd(CATEGORIES_KEY, category_id)
+                pipe.hincrby(CATEGORY_KEY.format(category_id=category_id), field, delta)
+        pipe.execute()
+    except Exception as exc:
+        logger.error(f"Error adjusting auction statistics: {exc}")
+
+
+def adjust_on_commit(changes):
+    """Apply counter changes once the current transaction commits"""
+    changes = dict(changes)
+    transaction.on_commit(lambda: adjust(changes))
+
+
+def _stats(values):
+    stats = {field: values.get(field, 0) for field in FIELDS}
+    stats['gmv'] = (Decimal(stats.pop('gmv_cents')) / 100).quantize(Decimal('0.01'))
+    if 'registered_users' in values:
+        stats['registered_users'] = values['registered_users']
+    return stats
+
+
+def _decode(raw):
+    return _stats({key.decode(): int(value) for key, value in raw.items()})
+
+
+def _count():
+    """Count everything in the database; returns ``(totals, per_category)``"""
+    from apps.accounts.models import User
+
+    with connection.cursor() as cursor:
+        cursor.execute(RECONCILE_SQL)
+        rows = cursor.fetchall()
+
+    totals = dict.fromkeys(FIELDS, 0)
+    per_category = {}
+    for category_id, *values in rows:
+        per_category[category_id] = dict(zip(FIELDS, (int(value) for value in values)))
+        for field, value in per_category[category_id].items():
+            totals[field] += value
+    totals['registered_users'] = User.objects.count()
+    return totals, per_category
+
+
+def _from_database(category_id):
+    totals, per_category = _count()
+    return _stats(totals if category_id is None else per_category.get(category_id, {}))
+
+
+def get(category_id=None):
+    """
+    Get the global statistics, or a category's.
+
+    On a cold start one caller reconciles while the rest wait for it; if
+    Redis is unavailable, or the wait runs out, they are counted from the
+    database instead.
+    """
+    try:
+        redis = _redis()
+        if category_id is not None:
+            return _decode(redis.hgetall(CATEGORY_KEY.format(category_id=category_id)))
+
+        raw = redis.hgetall(GLOBAL_KEY)
+        if not raw:
+            # Cold start
+            with redis.lock(RECONCILE_LOCK_KEY, timeout=60, blocking_timeout=5):
+                raw = redis.hgetall(GLOBAL_KEY)
+                if not raw:
+                    reconcile()
+                    raw = redis.hgetall(GLOBAL_KEY)
+        return _decode(raw)
+    except Exception as exc:
+        logger.error(f"Error reading auction statistics, counting from the database: {exc}")
+        return _from_database(category_id)
+
+
+def reconcile():
+    """Recompute every counter from the database; returns the number of categories"""
+    totals, per_category = _count()
+
+    redis = _redis()
+    stale = {int(c) for c in redis.smembers(CATEGORIES_KEY)} - set(per_category)
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(GLOBAL_KEY, mapping=totals)
+    for category_id in stale:
+        pipe.delete(CATEGORY_KEY.format(category_id=category_id))
+    pipe.delete(CATEGORIES_KEY)
+    if per_category:
+        pipe.sadd(CATEGORIES_KEY, *per_category)
+    for category_id, values in per_category.items():
+        pipe.hset(CATEGORY_KEY.format(category_id=category_id), mapping=values)
+    pipe.execute()
+
+    logger.info(f"Reconciled auction statistics for {len(per_category)} categories")
+    return len(per_category)
@@ -0,0 +1,234 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_hot_lot_bids():
+    """Write bids accepted on hot lots through to the database"""
+    try:
+        from . import hot_lots
+
+        total = 0
+        for item_id in hot_lots.get_hot_lots():
+            try:
+                total += hot_lots.flush(item_id)
+            except Exception as exc:
+                logger.error(f"Error flushing hot-lot bids for item {item_id}: {exc}")
+
+        return f"Flushed {total} hot-lot bids"
+
+    except Exception as exc:
+        logger.error(f"Error flushing hot-lot bids: {exc}")
+        return f"Error flushing hot-lot bids: {exc}"
+
+
+@shared_task
+def flush_item_counters():
+    """Write buffered view and watch counts through to the database"""
+    try:
+        from . import counters
+
+        items, elapsed = counters.flush()
+        return f"Flushed counters for {items} items in {elapsed * 1000:.0f}ms"
+
+    except Exception as exc:
+        logger.error(f"Error flushing item counters: {exc}")
+        return f"Error flushing item counters: {exc}"
+
+
+@shared_task
+def check_auction_endings():
+    """Close auctions whose end time has passed"""
+    try:
+        import time
+        from datetime import timedelta
+        from django.conf import settings
+        from django.utils import timezone
+        from . import closing, scheduler
+        from .models import AuctionItem
+
+        started = time.monotonic()
+        closed = sold = 0
+        while True:
+            due = scheduler.pop_due(limit=settings.AUCTION_CLOSE_BATCH_SIZE)
+            if not due:
+                break
+
+            try:
+                results = closing.close_auctions(due)
+            except Exception as exc:
+                logger.error(f"Error ending auctions {due}: {exc}")
+                retry_at = timezone.now() + timedelta(seconds=5)
+                scheduler.schedule_many((item_id, retry_at) for item_id in due)
+                break
+
+            closed += len(results)
+            sold += sum(1 for r in results if r['sold'])
+
+            # Lots extended by a late bid, or locked by one in flight, go
+            # back on the schedule at their current end time
+            settled = {r['id'] for r in results}
+            scheduler.schedule_many(
+                AuctionItem.objects.filter(status='active', id__in=set(due) - settled)
+                .values_list('id', 'end_time')
+            )
+
+            if len(due) < settings.AUCTION_CLOSE_BATCH_SIZE:
+                break
+
+        if closed:
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Ended {closed} auctions ({sold} sold) in {elapsed:.2f}s, "
+                f"{closed / elapsed:.0f} lots/sec"
+            )
+        return f"Ended {closed} auctions"
+
+    except Exception as exc:
+        logger.error(f"Error checking auction endings: {exc}")
+        return f"Error checking auction endings: {exc}"
+
+
+@shared_task
+def reconcile_closing_schedule():
+    """Re-schedule overdue active auctions missing from the closing schedule"""
+    try:
+        from django.utils import timezone
+        from . import scheduler
+        from .models import AuctionItem
+
+        overdue = list(
+            AuctionItem.objects.filter(status='active', end_time__lte=timezone.now())
+            .values_list('id', 'end_time')
+        )
+        scheduler.schedule_many(overdue)
+
+        if overdue:
+            logger.warning(f"Re-scheduled {len(overdue)} overdue auctions")
+        return f"Re-scheduled {len(overdue)} overdue auctions"
+
+    except Exception as exc:
+        logger.error(f"Error reconciling closing schedule: {exc}")
+        return f"Error reconciling closing schedule: {exc}"
+
+
+@shared_task
+def notify_saved_search_matches(item_id):
+    """Notify owners of saved searches that match a newly activated item"""
+    try:
+        from django.conf import settings
+        from django.contrib.contenttypes.models import ContentType
+        from django.urls import reverse
+        from apps.notifications.models import Notification
+        from . import percolator
+        from .models import AuctionItem
+
+        entries, _ = percolator.match_item(item_id)
+        if not entries:
+            return f"No saved searches match item {item_id}"
+
+        item = AuctionItem.objects.only('id', 'title').get(pk=item_id)
+        content_type = ContentType.objects.get_for_model(AuctionItem)
+        action_url = reverse('auctions:item_detail', kwargs={'pk': item.pk})
+
+        # One notification per user, naming the first search that matched
+        searches = {}
+        for entry in entries:
+            searches.setdefault(entry.user_id, entry.id)
+        recipients = list(searches.items())
+
+        batch_size = settings.SAVED_SEARCH_NOTIFY_BATCH_SIZE
+        for start in range(0, len(recipients), batch_size):
+            Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=user_id,
+                    notification_type='new_item',
+                    title='New item matches your saved search',
+                    message=f'"{item.title}" matches one of your saved searches.',
+                    content_type=content_type,
+                    object_id=item.pk,
+                    data={'item_id': item.pk, 'saved_search_id': search_id},
+                    action_url=action_url,
+                )
+                for user_id, search_id in recipients[start:start + batch_size]
+            ])
+
+        logger.info(f"Item {item_id} matched {len(entries)} saved searches, notified {len(recipients)} users")
+        return f"Notified {len(recipients)} users about item {item_id}"
+
+    except Exception as exc:
+        logger.error(f"Error matching saved searches for item {item_id}: {exc}")
+        return f"Error matching saved searches for item {item_id}: {exc}"
+
+
+@shared_task
+def rebuild_category_tree():
+    """Recompute category paths and active-item counts to repair drift"""
+    try:
+        from . import categories
+
+        categories.rebuild()
+        return "Rebuilt category tree"
+
+    except Exception as exc:
+        logger.error(f"Error rebuilding category tree: {exc}")
+        return f"Error rebuilding category tree: {exc}"
+
+
+@shared_task
+def maintain_trending():
+    """Rebase trending scores when due and drop items that are no longer active"""
+    try:
+        from . import trending
+
+        rebased = trending.rebase()
+        dropped = trending.prune()
+        return f"Dropped {dropped} inactive trending items{', rebased scores' if rebased else ''}"
+
+    except Exception as exc:
+        logger.error(f"Error maintaining trending scores: {exc}")
+        return f"Error maintaining trending scores: {exc}"
+
+
+@shared_task
+def update_auction_statistics():
+    """Reconcile the incrementally maintained auction statistics with the database"""
+    try:
+        from . import statistics
+
+        categories = statistics.reconcile()
+        return f"Reconciled auction statistics for {categories} categories"
+
+    except Exception as exc:
+        logger.error(f"Error reconciling auction statistics: {exc}")
+        return f"Error reconciling auction statistics: {exc}"
+
+
+@shared_task
+def publish_bid_update(item_id):
+    """Send the latest coalesced bid update of a lot to its WebSocket groups"""
+    try:
+        from . import fanout
+
+        sent = fanout.publish_trailing(item_id)
+        return f"Published bid update for item {item_id}" if sent else f"No bid update for item {item_id}"
+
+    except Exception as exc:
+        logger.error(f"Error publishing bid update for item {item_id}: {exc}")
+        return f"Error publishing bid update for item {item_id}: {exc}"
+
+
+@shared_task
+def send_bid_update_to_watchers(item_id, event):
+    """Send a lot's bid update to the personal groups of its watchers"""
+    try:
+        from . import fanout
+
+        watchers = fanout.send_to_watchers(item_id, event)
+        return f"Sent bid update for item {item_id} to {watchers} watchers"
+
+    except Exception as exc:
+        logger.error(f"Error sending bid update for item {item_id} to watchers: {exc}")
+        return f"Error sending bid update for item {item_id} to watchers: {exc}"
@@ -0,0 +1,34 @@
+from apps.auctions import caching
+
+
+def resolve_slug(slug, pk):
+    return caching.fetch(
+        'item_slug', f'item:slug:{slug}', lambda: pk, 60, namespaces=[caching.slug_namespace(slug)],
+    )
+
+
+def test_unknown_slug_is_not_cached():
+    assert resolve_slug('new-bike', None) is None
+    assert resolve_slug('new-bike', 7) == 7
+
+
+def test_bumping_a_slug_drops_what_it_resolved_to():
+    assert resolve_slug('old-bike', 7) == 7
+    assert resolve_slug('old-bike', 8) == 7
+
+    caching.bump(caching.slug_namespace('old-bike'))
+
+    assert resolve_slug('old-bike', None) is None
+
+
+def test_renaming_an_item_bumps_both_slugs(make_item, django_capture_on_commit_callbacks):
+    item = make_item(slug='old-bike')
+    assert resolve_slug('old-bike', item.pk) == item.pk
+    assert resolve_slug('new-bike', 99) == 99
+
+    with django_capture_on_commit_callbacks(execute=True):
+        item.slug = 'new-bike'
+        item.save()
+
+    assert resolve_slug('old-bike', None) is None
+    assert resolve_slug('new-bike', item.pk) == item.pk
@@ -0,0 +1,24 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from apps.auctions import fanout, tasks
+
+STATE = {
+    'current_price': Decimal('25.00'),
+    'total_bids': 3,
+    'end_time': datetime(2030, 1, 1, tzinfo=dt_timezone.utc),
+    'status': 'active',
+    'leading_bidder': 42,
+}
+
+
+def test_bid_request_sends_to_the_lot_group_and_queues_watchers(monkeypatch):
+    sent, queued = [], []
+    monkeypatch.setattr(fanout.broadcast, 'send', lambda groups, *args, **kwargs: sent.append((groups, kwargs['bid'])))
+    monkeypatch.setattr(tasks.send_bid_update_to_watchers, 'delay', lambda *args: queued.append(args))
+
+    fanout.publish(7, STATE)
+
+    assert sent == [(['auction_7_notifications'], queued[0][1])]
+    assert queued == [(7, {'item': 7, 'price': '25.00', 'bids': 3, 'end': 1893456000,
+                           'status': 'active', 'seq': 1})]
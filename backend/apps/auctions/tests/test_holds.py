@@ -0,0 +1,109 @@
+"""Balance holds taken and released by the bid engine, hot lots and the closer"""
+from decimal import Decimal
+
+import pytest
+
+from apps.accounts.models import User
+from apps.auctions import hot_lots
+from apps.auctions.bidding import place_bid
+from apps.auctions.closing import close_auctions
+from apps.auctions.exceptions import BidRejected
+
+
+def reserved_of(*users):
+    reserved = dict(User.objects.filter(pk__in=[u.pk for u in users]).values_list('id', 'reserved_balance'))
+    return [reserved[u.pk] for u in users]
+
+
+def test_hold_follows_the_lead(make_item, make_user):
+    first, second = make_user(balance='100.00'), make_user(balance='100.00')
+    item = make_item()
+
+    place_bid(item.pk, first, '20.00')
+    assert reserved_of(first, second) == [Decimal('20.00'), Decimal('0.00')]
+
+    place_bid(item.pk, second, '25.00')
+    assert reserved_of(first, second) == [Decimal('0.00'), Decimal('25.00')]
+
+    # Raising one's own lead only holds the difference
+    place_bid(item.pk, second, '30.00')
+    assert reserved_of(first, second) == [Decimal('0.00'), Decimal('30.00')]
+
+
+def test_held_funds_cannot_back_another_bid(make_item, make_user):
+    bidder = make_user(balance='50.00')
+    leading, other = make_item(), make_item()
+    place_bid(leading.pk, bidder, '40.00')
+
+    with pytest.raises(BidRejected):
+        place_bid(other.pk, bidder, '20.00')
+
+    other.refresh_from_db()
+    assert other.total_bids == 0
+    assert reserved_of(bidder) == [Decimal('40.00')]
+
+
+def test_closing_releases_the_winner_hold(make_item, make_user):
+    bidder = make_user(balance='100.00')
+    item = make_item()
+    place_bid(item.pk, bidder, '20.00')
+
+    close_auctions([item.pk], due_only=False)
+
+    assert reserved_of(bidder) == [Decimal('0.00')]
+
+
+def test_hot_lot_takes_the_hold_when_the_bid_is_accepted(make_item, make_user):
+    first, second = make_user(balance='100.00'), make_user(balance='100.00')
+    item = make_item()
+    hot_lots.enable(item)
+
+    hot_lots.place_bid(item.pk, first, Decimal('20.00'))
+    hot_lots.place_bid(item.pk, second, Decimal('25.00'))
+
+    # Both accepted bids are held until the flush writes them
+    assert reserved_of(first, second) == [Decimal('20.00'), Decimal('25.00')]
+
+    assert hot_lots.flush(item.pk) == 2
+    assert reserved_of(first, second) == [Decimal('0.00'), Decimal('25.00')]
+
+
+def test_hot_lot_rejection_rolls_the_hold_back(make_item, make_user):
+    bidder = make_user(balance='100.00')
+    item = make_item()
+    hot_lots.enable(item)
+    hot_lots.place_bid(item.pk, bidder, Decimal('20.00'))
+
+    with pytest.raises(BidRejected):
+        hot_lots.place_bid(item.pk, bidder, Decimal('20.50'))
+
+    assert reserved_of(bidder) == [Decimal('20.00')]
+    assert hot_lots.get_state(item.pk)['current_price'] == Decimal('20.00')
+
+
+def test_hot_lot_bid_must_fit_available_balance(make_item, make_user):
+    bidder = make_user(balance='30.00')
+    item = make_item()
+    hot_lots.enable(item)
+    hot_lots.place_bid(item.pk, bidder, Decimal('20.00'))
+
+    with pytest.raises(BidRejected, match='Insufficient balance'):
+        hot_lots.place_bid(item.pk, bidder, Decimal('21.00'))
+
+    assert hot_lots.get_state(item.pk)['total_bids'] == 1
+
+
+def test_proxy_leader_that_cannot_cover_its_lead_is_exhausted(make_item, make_user):
+    proxy_bidder, bidder = make_user(balance='1000.00'), make_user(balance='100.00')
+    item = make_item()
+    place_bid(item.pk, proxy_bidder, '20.00', max_bid='100.00')
+    # Spent elsewhere after setting the ceiling: 5.00 available on top of the hold
+    User.objects.filter(pk=proxy_bidder.pk).update(balance=Decimal('25.00'))
+
+    bid = place_bid(item.pk, bidder, '30.00')
+
+    item.refresh_from_db()
+    assert bid.status == 'active'
+    assert item.leading_bid_id == bid.pk
+    assert item.current_price == Decimal('30.00')
+    assert reserved_of(proxy_bidder, bidder) == [Decimal('0.00'), Decimal('30.00')]
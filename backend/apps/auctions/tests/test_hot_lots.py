@@ -0,0 +1,67 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.auctions import hot_lots
+from apps.auctions.bidding import place_bid
+from apps.auctions.exceptions import BidRejected, HotLotError
+from apps.auctions.models import AuctionItem, Bid
+
+
+@pytest.fixture
+def bidders(make_user):
+    return [make_user(balance='1000.00') for _ in range(2)]
+
+
+def test_enable_copies_the_committed_state(make_item, bidders):
+    stale = make_item()
+    place_bid(stale.pk, bidders[0], '30.00')
+
+    hot_lots.enable(stale)
+
+    state = hot_lots.get_state(stale.pk)
+    assert state['current_price'] == Decimal('30.00')
+    assert state['total_bids'] == 1
+
+
+def test_flush_refuses_a_batch_below_the_stored_price(make_item, bidders):
+    item = make_item()
+    hot_lots.enable(item)
+    hot_lots.place_bid(item.pk, bidders[0], Decimal('20.00'))
+    AuctionItem.objects.filter(pk=item.pk).update(current_price=Decimal('40.00'))
+
+    with pytest.raises(HotLotError):
+        hot_lots.flush(item.pk)
+
+    assert not Bid.objects.filter(item=item).exists()
+    assert AuctionItem.objects.get(pk=item.pk).current_price == Decimal('40.00')
+
+
+def test_disable_keeps_the_lot_while_another_flush_runs(redis):
+    redis.hset(hot_lots.STATE_KEY.format(item_id=7), mapping={'status': 'active', 'price': 2000})
+    redis.sadd(hot_lots.HOT_LOTS_KEY, 7)
+    redis.rpush(hot_lots.PENDING_KEY.format(item_id=7), '1:2100:0:0:1')
+    redis.lock(hot_lots.FLUSH_LOCK_KEY.format(item_id=7), timeout=60).acquire()
+
+    with pytest.raises(HotLotError):
+        hot_lots.disable(7)
+
+    assert hot_lots.is_hot(7)
+    assert redis.hget(hot_lots.STATE_KEY.format(item_id=7), 'status') == b'draining'
+    assert redis.llen(hot_lots.PENDING_KEY.format(item_id=7)) == 1
+
+
+def test_banned_bidder_gets_the_database_path_message():
+    now = timezone.now()
+    item = AuctionItem(pk=7, seller_id=1, status='active', start_time=now - timedelta(hours=1),
+                       end_time=now + timedelta(hours=1), current_price=Decimal('10.00'),
+                       min_bid_increment=Decimal('1.00'))
+    user = User(pk=2, is_banned=True)
+
+    with pytest.raises(BidRejected) as rejected:
+        hot_lots.place_bid(item.pk, user, Decimal('20.00'))
+
+    assert item.can_bid(user, Decimal('20.00'))[1] == str(rejected.value)
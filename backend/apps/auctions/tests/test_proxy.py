@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+
+from apps.auctions.bidding import place_bid
+from apps.auctions.models import AuctionItem, Bid
+from apps.auctions.proxy import ProxyBid, resolve
+
+T0 = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+INCREMENT = Decimal('1.00')
+
+
+def proxy(bidder_id, ceiling, seconds=0):
+    return ProxyBid(bidder_id, Decimal(ceiling), T0 + timedelta(seconds=seconds))
+
+
+def test_single_bid_leads_at_its_amount():
+    price, rows = resolve(proxy(1, '50'), Decimal('20'), INCREMENT, [])
+
+    assert price == Decimal('20')
+    assert rows == [(1, Decimal('20'), Decimal('50'))]
+
+
+def test_newcomer_beats_lower_proxy_by_one_increment():
+    price, rows = resolve(proxy(2, '90', 5), Decimal('20'), INCREMENT, [proxy(1, '80')])
+
+    assert price == Decimal('81')
+    assert rows == [(2, Decimal('81'), Decimal('90'))]
+
+
+def test_leader_is_capped_at_own_ceiling():
+    price, rows = resolve(proxy(2, '80.50', 5), Decimal('20'), INCREMENT, [proxy(1, '80')])
+
+    assert price == Decimal('80.50')
+    assert rows[-1][0] == 2
+
+
+def test_existing_proxy_answers_without_publishing_newcomer_ceiling():
+    price, rows = resolve(proxy(2, '50', 5), Decimal('20'), INCREMENT, [proxy(1, '80')])
+
+    assert price == Decimal('51')
+    # The newcomer's visible bid is what they submitted, not their ceiling
+    assert rows == [
+        (2, Decimal('20'), Decimal('50')),
+        (1, Decimal('51'), Decimal('80')),
+    ]
+
+
+def test_equal_ceilings_go_to_the_earlier_proxy():
+    price, rows = resolve(proxy(2, '80', 5), Decimal('20'), INCREMENT, [proxy(1, '80')])
+
+    assert price == Decimal('80')
+    assert rows[-1][0] == 1
+
+
+@pytest.fixture
+def bidders(make_user):
+    return [make_user(balance='1000.00') for _ in range(2)]
+
+
+def test_proxy_outbids_a_manual_bid(make_item, bidders):
+    first, second = bidders
+    item = make_item()
+
+    place_bid(item.pk, first, '15.00', max_bid='40.00')
+    bid = place_bid(item.pk, second, '20.00')
+
+    item = AuctionItem.objects.select_related('leading_bid').get(pk=item.pk)
+    assert bid.status == 'outbid'
+    assert bid.amount == Decimal('20.00')
+    assert item.leading_bid.bidder_id == first.pk
+    assert item.current_price == Decimal('21.00')
+    assert item.total_bids == 3
+
+
+def test_raising_a_ceiling_keeps_time_priority(make_item, bidders):
+    first, second = bidders
+    item = make_item()
+
+    # Two live ceilings, the earlier one first's
+    Bid.objects.create(item=item, bidder=first, amount=Decimal('20.00'), max_bid=Decimal('60.00'),
+                       status='outbid', created_at=T0)
+    leading = Bid.objects.create(item=item, bidder=second, amount=Decimal('30.00'),
+                                 max_bid=Decimal('60.00'), created_at=T0 + timedelta(seconds=5))
+    AuctionItem.objects.filter(pk=item.pk).update(
+        current_price=Decimal('30.00'), total_bids=2, leading_bid=leading,
+    )
+
+    # The new bid reuses first's earlier proxy, so first wins the tie
+    bid = place_bid(item.pk, first, '40.00', max_bid='60.00')
+
+    item = AuctionItem.objects.select_related('leading_bid').get(pk=item.pk)
+    assert bid.status == 'active'
+    assert item.leading_bid.bidder_id == first.pk
+    assert item.current_price == Decimal('60.00')
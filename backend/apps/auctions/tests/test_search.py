@@ -0,0 +1,18 @@
+import pytest
+from rest_framework.test import APIRequestFactory
+
+from apps.auctions.search import MAX_OFFSET, search_items
+from apps.auctions.views import SearchItemsAPIView
+
+
+def test_offset_beyond_the_cap_is_rejected():
+    with pytest.raises(ValueError):
+        search_items('bike', offset=MAX_OFFSET + 1)
+
+
+def test_page_beyond_the_cap_is_a_bad_request():
+    request = APIRequestFactory().get('/api/auctions/search/', {'q': 'bike', 'page': 100, 'per_page': 20})
+
+    response = SearchItemsAPIView.as_view()(request)
+
+    assert response.status_code == 400
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+import pytest
+from redis.exceptions import ConnectionError
+
+from apps.auctions import statistics
+
+COUNTS = (
+    {'total_items': 3, 'active_auctions': 2, 'total_bids': 9, 'sold_items': 1, 'gmv_cents': 2550,
+     'registered_users': 4},
+    {5: {'total_items': 3, 'active_auctions': 2, 'total_bids': 9, 'sold_items': 1, 'gmv_cents': 2550}},
+)
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    calls = []
+
+    def count():
+        calls.append(1)
+        return COUNTS
+
+    monkeypatch.setattr(statistics, '_count', count)
+    return calls
+
+
+def test_cold_start_reconciles_once(counted):
+    first = statistics.get()
+    second = statistics.get()
+
+    assert first == second
+    assert first['gmv'] == Decimal('25.50')
+    assert first['registered_users'] == 4
+    assert len(counted) == 1
+
+
+def test_redis_outage_falls_back_to_the_database(counted, monkeypatch):
+    def unavailable():
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(statistics, '_redis', unavailable)
+
+    assert statistics.get()['total_items'] == 3
+    assert statistics.get(5)['total_bids'] == 9
+    assert statistics.get(6)['total_bids'] == 0
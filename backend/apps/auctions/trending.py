@@ -0,0 +1,270 @@
+"""
+Trending items: time-decayed engagement scores kept in Redis sorted sets.
+
+Each event on an active item (a bid, a new watcher, a comment, a unique
+view) adds its weight to the item's score in the global set and in its
+category's set. Scores decay exponentially with ``TRENDING_HALF_LIFE``
+using forward decay: instead of shrinking every stored score as time
+passes, an event at time ``t`` adds ``weight * exp((t - epoch) / tau)``.
+Newer events weigh more, ranking is exactly that of the decayed scores,
+and an update is a single ZINCRBY. The epoch is moved forward now and then
+by ``rebase``, which scales every set down so the numbers stay small.
+
+Each set keeps the ``TRENDING_SET_SIZE`` best items; an item falling off
+the end loses its accumulated score, which only matters if it was not
+trending anyway. Closed items are removed by the closer and any inactive
+leftovers by ``prune``. Reading the top N is a ZREVRANGE, O(log n + N).
+
+``rebuild`` recomputes all sets from recent bids, watchlist additions and
+comments, for a cold start or after Redis data loss.
+"""
+from datetime import timedelta
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+EPOCH_KEY = 'auction:trending:epoch'
+GLOBAL_KEY = 'auction:trending:all'
+CATEGORY_KEY = 'auction:trending:category:{category_id}'
+CATEGORIES_KEY = 'auction:trending:categories'
+
+WEIGHTS = {
+    'bid': 5.0,
+    'watch': 3.0,
+    'comment': 2.0,
+    'view': 1.0,
+}
+
+# Rebase once the epoch is this many half-lives old
+REBASE_AFTER = 8
+
+# KEYS: epoch, category ids set, then the sorted sets to add to
+# ARGV: now (epoch seconds), weight, tau, item id, set size, category id or ''
+RECORD_SCRIPT = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+if not epoch then
+    epoch = tonumber(ARGV[1])
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+if ARGV[6] ~= '' then
+    redis.call('SADD', KEYS[2], ARGV[6])
+end
+local increment = tonumber(ARGV[2]) * math.exp((tonumber(ARGV[1]) - epoch) / tonumber(ARGV[3]))
+local size = tonumber(ARGV[5])
+for i = 3, #KEYS do
+    redis.call('ZINCRBY', KEYS[i], increment, ARGV[4])
+    if redis.call('ZCARD', KEYS[i]) > size then
+        redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -size - 1)
+    end
+end
+return 1
+"""
+
+# KEYS: epoch, then every sorted set
+# ARGV: new epoch, tau
+REBASE_SCRIPT = """
+local epoch = tonumber(redis.call('GET', KEYS[1]))
+local new_epoch = tonumber(ARGV[1])
+if not epoch or new_epoch <= epoch then
+    return 0
+end
+local factor = math.exp((epoch - new_epoch) / tonumber(ARGV[2]))
+for i = 2, #KEYS do
+    redis.call('ZUNIONSTORE', KEYS[i], 1, KEYS[i], 'WEIGHTS', factor)
+end
+redis.call('SET', KEYS[1], ARGV[1])
+return 1
+"""
+
+REBUILD_SQL = """
+    WITH events AS (
+        SELECT item_id, created_at, %(bid)s AS weight FROM auction_bids
+        WHERE created_at >= %(since)s
+        UNION ALL
+        SELECT item_id, created_at, %(watch)s FROM auction_watchlist
+        WHERE created_at >= %(since)s
+        UNION ALL
+        SELECT item_id, created_at, %(comment)s FROM auction_comments
+        WHERE created_at >= %(since)s
+    )
+    SELECT i.id, i.category_id,
+           sum(e.weight * exp((extract(epoch FROM e.created_at) - %(epoch)s) / %(tau)s))
+    FROM events e
+    JOIN auction_items i ON i.id = e.item_id
+    WHERE i.status = 'active'
+    GROUP BY i.id, i.category_id
+"""
+
+_scripts = {}
+
+
+def _redis():
+    return get_redis_connection('default')
+
+
+def _script(name, source):
+    if name not in _scripts:
+        _scripts[name] = _redis().register_script(source)
+    return _scripts[name]
+
+
+def _tau():
+    # Half-life to time constant: exp(-half_life / tau) == 1/2
+    return settings.TRENDING_HALF_LIFE / math.log(2)
+
+
+def _keys(category_id):
+    keys = [GLOBAL_KEY]
+    if category_id:
+        keys.append(CATEGORY_KEY.format(category_id=category_id))
+    return keys
+
+
+def record(item_id, category_id, event):
+    """Add an event on an item to its trending scores"""
+    try:
+        _script('record', RECORD_SCRIPT)(
+            keys=[EPOCH_KEY, CATEGORIES_KEY] + _keys(category_id),
+            args=[
+                time.time(), WEIGHTS[event], _tau(), item_id,
+                settings.TRENDING_SET_SIZE, category_id or '',
+            ],
+        )
+    except Exception as exc:
+        logger.error(f"Error recording trending {event} for item {item_id}: {exc}")
+
+
+def record_on_commit(item_id, category_id, event):
+    """Add an event to the trending scores once the current transaction commits"""
+    transaction.on_commit(lambda: record(item_id, category_id, event))
+
+
+def remove(items):
+    """Drop items, given as ``(item_id, category_id)`` pairs, from the trending sets"""
+    items = list(items)
+    if not items:
+        return
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        pipe.zrem(GLOBAL_KEY, *(item_id for item_id, _ in items))
+        for item_id, category_id in items:
+            if category_id:
+                pipe.zrem(CATEGORY_KEY.format(category_id=category_id), item_id)
+        pipe.execute()
+    except Exception as exc:
+        logger.error(f"Error removing {len(items)} items from trending: {exc}")
+
+
+def remove_on_commit(items):
+    """Drop items from the trending sets once the current transaction commits"""
+    items = list(items)
+    transaction.on_commit(lambda: remove(items))
+
+
+def top(category_id=None, limit=20):
+    """
+    Get ``[(item_id, score)]`` of the highest scoring items, best first.
+
+    Scores are the decayed scores as of now.
+    """
+    redis = _redis()
+    key = CATEGORY_KEY.format(category_id=category_id) if category_id else GLOBAL_KEY
+    pipe = redis.pipeline(transaction=False)
+    pipe.get(EPOCH_KEY)
+    pipe.zrevrange(key, 0, limit - 1, withscores=True)
+    epoch, ranked = pipe.execute()
+    if not ranked:
+        return []
+
+    decay = math.exp((float(epoch) - time.time()) / _tau())
+    return [(int(item_id), score * decay) for item_id, score in ranked]
+
+
+def _category_ids(redis):
+    return sorted(int(category_id) for category_id in redis.smembers(CATEGORIES_KEY))
+
+
+def _all_keys(redis):
+    return [GLOBAL_KEY] + [CATEGORY_KEY.format(category_id=c) for c in _category_ids(redis)]
+
+
+def rebase():
+    """Move the epoch to now once it is old, scaling every score down to match"""
+    redis = _redis()
+    epoch = redis.get(EPOCH_KEY)
+    now = time.time()
+    if epoch is None or now - float(epoch) < REBASE_AFTER * settings.TRENDING_HALF_LIFE:
+        return False
+    _script('rebase', REBASE_SCRIPT)(keys=[EPOCH_KEY] + _all_keys(redis), args=[now, _tau()])
+    logger.info("Rebased trending scores")
+    return True
+
+
+def prune():
+    """
+    Drop items that are no longer active, or have moved to another category,
+    from the trending sets; returns the number dropped.
+    """
+    from .models import AuctionItem
+
+    redis = _redis()
+    dropped = 0
+    for category_id in [None] + _category_ids(redis):
+        key = CATEGORY_KEY.format(category_id=category_id) if category_id else GLOBAL_KEY
+        item_ids = [int(item_id) for item_id in redis.zrange(key, 0, -1)]
+        if not item_ids:
+            continue
+        queryset = AuctionItem.objects.filter(pk__in=item_ids, status='active')
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        active = set(queryset.values_list('id', flat=True))
+        inactive = [item_id for item_id in item_ids if item_id not in active]
+        if inactive:
+            redis.zrem(key, *inactive)
+            dropped += len(inactive)
+    return dropped
+
+
+def rebuild():
+    """Recompute every trending set from recent events; returns the number of items scored"""
+    redis = _redis()
+    now = time.time()
+    tau = _tau()
+    window = REBASE_AFTER * settings.TRENDING_HALF_LIFE
+
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, {
+            'bid': WEIGHTS['bid'],
+            'watch': WEIGHTS['watch'],
+            'comment': WEIGHTS['comment'],
+            'since': timezone.now() - timedelta(seconds=window),
+            'epoch': now,
+            'tau': tau,
+        })
+        rows = cursor.fetchall()
+
+    scores = {}
+    for item_id, category_id, score in rows:
+        for key in _keys(category_id):
+            scores.setdefault(key, []).append((item_id, float(score)))
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(*_all_keys(redis))
+    pipe.set(EPOCH_KEY, now)
+    category_ids = {category_id for _, category_id, _ in rows if category_id}
+    if category_ids:
+        pipe.sadd(CATEGORIES_KEY, *category_ids)
+    for key, members in scores.items():
+        members.sort(key=lambda member: -member[1])
+        pipe.zadd(key, dict(members[:settings.TRENDING_SET_SIZE]))
+    pipe.execute()
+
+    logger.info(f"Rebuilt trending scores for {len(rows)} items")
+    return len(rows)
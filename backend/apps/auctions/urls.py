@@ -28,6 +28,7 @@ from .views import (
     AuctionStatisticsAPIView,
     TrendingItemsAPIView,
     FeaturedItemsAPIView,
+    CacheStatsAPIView,
     EndAuctionAPIView,
     ExtendAuctionAPIView,
     CancelAuctionAPIView,
@@ -90,6 +91,7 @@ urlpatterns = [
     path('statistics/', AuctionStatisticsAPIView.as_view(), name='statistics'),
     path('trending/', TrendingItemsAPIView.as_view(), name='trending_items'),
     path('featured/', FeaturedItemsAPIView.as_view(), name='featured_items'),
+    path('cache/stats/', CacheStatsAPIView.as_view(), name='cache_stats'),
 
     # Auction Management
     path('items/<int:pk>/end/', EndAuctionAPIView.as_view(), name='end_auction'),
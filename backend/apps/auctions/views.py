@@ -1,3 +1,4 @@
+from django.conf import settings  # type: ignore
 from django.shortcuts import render  # type: ignore
 from django.http import JsonResponse  # type: ignore
 from django.utils import timezone  # type: ignore
@@ -5,7 +6,22 @@ from rest_framework import status  # type: ignore
 from rest_framework.views import APIView  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from rest_framework.decorators import api_view, permission_classes  # type: ignore
-from rest_framework.permissions import AllowAny, IsAuthenticated  # type: ignore
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated  # type: ignore
+
+from auction.pagination import KeysetPagination  # type: ignore
+
+from . import caching, counters, live, statistics, trending
+from .bidding import BidRejected, place_bid
+from .categories import get_tree
+from .models import AuctionHistory, AuctionItem, Bid, Category
+from .search import search_items
+from .serializers import (
+    AuctionHistorySerializer,
+    AuctionItemDetailSerializer,
+    AuctionItemListSerializer,
+    BidSerializer,
+    format_time_left,
+)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Web views
@@ -35,9 +51,34 @@ class AuctionItemListAPIView(APIView):
     """List all auction items."""
     permission_classes = [AllowAny]
 
+    # Cursor-paginated sort orders, each backed by an index on auction_items
+    ORDERINGS = {
+        'ending_soon': 'end_time',
+        'newest': '-created_at',
+    }
+
+    # Drafts and cancelled lots are only visible to their sellers
+    PUBLIC_STATUSES = ('active', 'ended', 'sold')
+
     def get(self, request):
-        # Placeholder implementation
-        return Response({'items': [], 'count': 0, 'next': None, 'previous': None})
+        ordering = self.ORDERINGS.get(request.query_params.get('ordering'), 'end_time')
+
+        item_status = request.query_params.get('status', 'active')
+        if item_status not in self.PUBLIC_STATUSES:
+            return Response({'error': 'Invalid status'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        items = AuctionItem.objects.filter(status=item_status).select_related('category')
+
+        category = request.query_params.get('category')
+        if category:
+            items = items.filter(category_id=category)
+
+        paginator = KeysetPagination(ordering)
+        page = paginator.paginate_queryset(items, request)
+        return Response(paginator.get_paginated_data(
+            'items', AuctionItemListSerializer(page, many=True).data
+        ))
 
 class AuctionItemCreateAPIView(APIView):
     """Create a new auction item."""
@@ -47,13 +88,57 @@ class AuctionItemCreateAPIView(APIView):
         return Response({'message': 'Create auction item not yet implemented'},
                         status=status.HTTP_501_NOT_IMPLEMENTED)
 
+def _item_static(pk):
+    """Item content for the detail page; changes only when the item is edited"""
+    item = (
+        AuctionItem.objects.select_related('category', 'seller')
+        .prefetch_related('images')
+        .defer('search_vector')
+        .filter(pk=pk)
+        .first()
+    )
+    if item is None:
+        return None
+    return {'item': AuctionItemDetailSerializer(item).data, 'reserve_price': item.reserve_price}
+
 class AuctionItemDetailAPIView(APIView):
     """Retrieve details of a specific auction item."""
     permission_classes = [AllowAny]
 
-    def get(self, request, pk):
-        return Response({'message': f'Details for item {pk} not yet implemented'},
-                        status=status.HTTP_501_NOT_IMPLEMENTED)
+    def get(self, request, pk=None, slug=None):
+        ttl = settings.RESPONSE_CACHE_ITEM_TTL
+        if pk is None:
+            pk = caching.fetch(
+                'item_slug', f'item:slug:{slug}',
+                lambda: AuctionItem.objects.filter(slug=slug).values_list('pk', flat=True).first(),
+                ttl, namespaces=[caching.slug_namespace(slug)],
+            )
+
+        static = pk and caching.fetch(
+            'item_detail', f'item:{pk}:static', lambda: _item_static(pk), ttl,
+            namespaces=[caching.item_namespace(pk)],
+        )
+        state = static and live.get(pk)
+        if not state or (state['status'] == 'draft' and request.user.pk != static['item']['seller']):
+            return Response({'error': 'Item not found'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        viewer = f'user:{request.user.pk}' if request.user.is_authenticated else request.META.get('REMOTE_ADDR', '')
+        if counters.record_view(pk, viewer) and state['status'] == 'active':
+            trending.record(pk, static['item']['category'], 'view')
+
+        now = timezone.now()
+        item = dict(static['item'])
+        item.update({key: value for key, value in state.items() if key != 'start_time'})
+        active = state['status'] == 'active' and state['start_time'] <= now <= state['end_time']
+        reserve_price = static['reserve_price']
+        item.update({
+            'is_active': active,
+            'time_left': format_time_left(state['end_time'] - now if active else None),
+            'next_bid_amount': state['current_price'] + item['min_bid_increment'],
+            'reserve_met': reserve_price is None or state['current_price'] >= reserve_price,
+        })
+        return Response(item)
 
 class AuctionItemUpdateAPIView(APIView):
     """Update an existing auction item."""
@@ -76,15 +161,54 @@ class PlaceBidAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, pk):
-        return Response({'message': 'Place bid not yet implemented'},
-                        status=status.HTTP_501_NOT_IMPLEMENTED)
+        amount = request.data.get('amount')
+        if amount in (None, ''):
+            return Response({'error': 'Amount is required'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            bid = place_bid(pk, request.user, amount, request.data.get('max_bid'))
+        except AuctionItem.DoesNotExist:
+            return Response({'error': 'Item not found'},
+                            status=status.HTTP_404_NOT_FOUND)
+        except BidRejected as e:
+            return Response({'error': str(e)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        item = bid.item
+        return Response({
+            'bid': {
+                'id': bid.id,
+                'amount': str(bid.amount),
+                'max_bid': str(bid.max_bid) if bid.max_bid is not None else None,
+                'status': bid.status,
+                'created_at': bid.created_at.isoformat(),
+            },
+            'item': {
+                'id': item.id,
+                'current_price': str(item.current_price),
+                'total_bids': item.total_bids,
+                'end_time': item.end_time.isoformat(),
+            },
+            'message': ('Bid placed successfully' if bid.status != 'outbid'
+                        else 'Bid placed but outbid by an automatic bid')
+        }, status=status.HTTP_201_CREATED)
 
 class ItemBidsAPIView(APIView):
     """List all bids for a given auction item."""
     permission_classes = [AllowAny]
 
     def get(self, request, pk):
-        return Response({'bids': [], 'count': 0})
+        if not AuctionItem.objects.filter(pk=pk).exists():
+            return Response({'error': 'Item not found'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        bids = Bid.objects.filter(item_id=pk).select_related('bidder')
+        paginator = KeysetPagination('-created_at')
+        page = paginator.paginate_queryset(bids, request)
+        return Response(paginator.get_paginated_data(
+            'bids', BidSerializer(page, many=True).data
+        ))
 
 class BidDetailAPIView(APIView):
     """Retrieve details of a specific bid."""
@@ -149,22 +273,57 @@ class CategoryListAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        return Response({'categories': [], 'count': 0})
+        tree = caching.fetch(
+            'category_list', 'categories:tree', get_tree, settings.RESPONSE_CACHE_CATEGORY_TTL,
+            namespaces=[caching.CATEGORIES],
+        )
+        return Response({'categories': tree, 'count': len(tree)})
 
 class CategoryDetailAPIView(APIView):
     """Retrieve details for a specific category."""
     permission_classes = [AllowAny]
 
     def get(self, request, pk=None, slug=None):
-        return Response({'message': 'Category detail not yet implemented'},
-                        status=status.HTTP_404_NOT_FOUND)
+        lookup = {'pk': pk} if pk is not None else {'slug': slug}
+        category = Category.objects.filter(is_active=True, **lookup).first()
+        if category is None:
+            return Response({'error': 'Category not found'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'id': category.id,
+            'name': category.name,
+            'slug': category.slug,
+            'description': category.description,
+            'full_path': category.get_full_path(),
+            'parent': category.parent_id,
+            'ancestors': category.get_ancestor_ids(),
+            'depth': category.depth,
+            'item_count': category.item_count,
+            'subtree_item_count': category.subtree_item_count,
+        })
 
 class CategoryItemsAPIView(APIView):
     """List items within a specific category."""
     permission_classes = [AllowAny]
 
     def get(self, request, pk):
-        return Response({'items': [], 'count': 0})
+        category = Category.objects.filter(pk=pk, is_active=True).first()
+        if category is None:
+            return Response({'error': 'Category not found'},
+                            status=status.HTTP_404_NOT_FOUND)
+
+        # The whole subtree: one range scan on the materialized path
+        items = AuctionItem.objects.filter(
+            status='active',
+            category_id__in=category.get_descendant_ids(),
+        ).select_related('category')
+
+        paginator = KeysetPagination('-created_at')
+        page = paginator.paginate_queryset(items, request)
+        data = paginator.get_paginated_data('items', AuctionItemListSerializer(page, many=True).data)
+        data['count'] = category.subtree_item_count
+        return Response(data)
 
 class ItemCommentsAPIView(APIView):
     """List comments for a specific auction item."""
@@ -197,19 +356,47 @@ class CommentReplyAPIView(APIView):
         return Response({'message': 'Reply comment not yet implemented'},
                         status=status.HTTP_501_NOT_IMPLEMENTED)
 
+def _search_response(request, query=''):
+    """Run a faceted search from query parameters"""
+    params = request.query_params
+    try:
+        per_page = int(params.get('per_page', 20))
+        page = max(1, int(params.get('page', 1)))
+        result = search_items(
+            query,
+            category=params.get('category'),
+            condition=params.get('condition'),
+            min_price=params.get('min_price'),
+            max_price=params.get('max_price'),
+            limit=per_page,
+            offset=(page - 1) * per_page,
+        )
+    except ValueError:
+        return Response({'error': 'Invalid search parameters'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'items': AuctionItemListSerializer(result['items'], many=True).data,
+        'count': result['count'],
+        'facets': result['facets'],
+        'page': page,
+        'has_next': result['has_next'],
+        'query': query,
+    })
+
 class SearchItemsAPIView(APIView):
     """Search for auction items."""
     permission_classes = [AllowAny]
 
     def get(self, request):
-        return Response({'items': [], 'count': 0, 'query': request.GET.get('q', '')})
+        return _search_response(request, request.GET.get('q', ''))
 
 class FilterItemsAPIView(APIView):
     """Filter auction items by given parameters."""
     permission_classes = [AllowAny]
 
     def get(self, request):
-        return Response({'items': [], 'count': 0, 'filters': dict(request.GET)})
+        return _search_response(request)
 
 class SavedSearchAPIView(APIView):
     """Manage saved searches for the authenticated user."""
@@ -227,26 +414,81 @@ class AuctionStatisticsAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        return Response({
-            'total_items': 0,
-            'active_auctions': 0,
-            'total_bids': 0,
-            'registered_users': 0
-        })
+        category = request.query_params.get('category')
+        if category and not category.isdigit():
+            return Response({'error': 'Invalid category'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Maintained incrementally in Redis, see apps.auctions.statistics
+        stats = statistics.get(int(category) if category else None)
+        if category:
+            stats['category'] = int(category)
+        return Response(stats)
+
+def _item_list(queryset, limit=20):
+    return list(AuctionItemListSerializer(queryset.select_related('category').defer('search_vector')[:limit], many=True).data)
+
+def _with_live_counts(items):
+    """Add view and watch increments not yet flushed to the database"""
+    pending = counters.get_pending(item['id'] for item in items)
+    return [
+        dict(item,
+             view_count=item['view_count'] + pending[item['id']]['views'],
+             watch_count=item['watch_count'] + pending[item['id']]['watches'])
+        for item in items
+    ]
 
 class TrendingItemsAPIView(APIView):
     """List trending auction items."""
     permission_classes = [AllowAny]
 
+    MAX_LIMIT = 50
+
     def get(self, request):
-        return Response({'items': [], 'count': 0})
+        try:
+            category = int(request.query_params['category']) if request.query_params.get('category') else None
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.MAX_LIMIT))
+        except ValueError:
+            return Response({'error': 'Invalid parameters'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Ranked straight from the trending sets; a few spare in case some closed meanwhile
+        ranked = trending.top(category, limit + 10)
+        if ranked:
+            items = AuctionItem.objects.filter(status='active').select_related('category').defer('search_vector')
+            items = items.in_bulk([item_id for item_id, _ in ranked])
+            data = []
+            for item_id, score in ranked:
+                if item_id in items and len(data) < limit:
+                    data.append(dict(AuctionItemListSerializer(items[item_id]).data, trending_score=round(score, 4)))
+        else:
+            # Nothing scored yet (cold start): most bid-on first
+            items = AuctionItem.objects.filter(status='active').order_by('-total_bids', '-id')
+            if category:
+                items = items.filter(category_id=category)
+            data = _item_list(items, limit)
+
+        return Response({'items': _with_live_counts(data), 'count': len(data)})
 
 class FeaturedItemsAPIView(APIView):
     """List featured auction items."""
     permission_classes = [AllowAny]
 
     def get(self, request):
-        return Response({'items': [], 'count': 0})
+        items = caching.fetch(
+            'featured', 'items:featured',
+            lambda: _item_list(AuctionItem.objects.filter(status='active', is_featured=True).order_by('end_time')),
+            settings.RESPONSE_CACHE_LIST_TTL,
+            namespaces=[caching.LISTINGS],
+        )
+        return Response({'items': items, 'count': len(items)})
+
+class CacheStatsAPIView(APIView):
+    """Response cache hit ratio and latency per endpoint."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'endpoints': caching.get_stats()})
 
 class EndAuctionAPIView(APIView):
     """End an auction early."""
@@ -319,14 +561,24 @@ class AuctionHistoryAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, pk):
-        return Response({'history': [], 'count': 0})
+        history = AuctionHistory.objects.filter(item_id=pk).select_related('user')
+        paginator = KeysetPagination('-created_at')
+        page = paginator.paginate_queryset(history, request)
+        return Response(paginator.get_paginated_data(
+            'history', AuctionHistorySerializer(page, many=True).data
+        ))
 
 class UserAuctionHistoryAPIView(APIView):
     """Retrieve past auction history for the authenticated user."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response({'history': [], 'count': 0})
+        history = AuctionHistory.objects.filter(user=request.user).select_related('user')
+        paginator = KeysetPagination('-created_at')
+        page = paginator.paginate_queryset(history, request)
+        return Response(paginator.get_paginated_data(
+            'history', AuctionHistorySerializer(page, many=True).data
+        ))
 
 class BulkWatchAPIView(APIView):
     """Add multiple items to watchlist."""
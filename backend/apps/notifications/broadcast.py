@@ -0,0 +1,62 @@
+"""
+Serialize-once group broadcasts.
+
+A group event is encoded to compact JSON once, by the sender, and carried
+in the channel-layer message as ``text``; consumers forward it to each
+socket verbatim instead of running ``json.dumps`` per connection.
+
+The global feed reaches every connected user, so it is split into
+``GLOBAL_FEED_PARTITIONS`` groups that consistent hashing places on
+different channel layer hosts; each connection joins one partition and
+senders address all of them.
+"""
+import binascii
+import json
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+GLOBAL_FEED_GROUP = 'global_notification_feed'
+
+
+def encode(message_type, **payload):
+    """Encode a WebSocket message once, compactly"""
+    return json.dumps({'type': message_type, **payload}, separators=(',', ':'), default=str)
+
+
+def message(handler, message_type, coalesce=None, **payload):
+    """
+    Channel-layer message for consumer method ``handler`` carrying the
+    encoded text.
+
+    Messages with the same ``coalesce`` key supersede each other, so a
+    connection that is behind only needs to send the latest.
+    """
+    event = {'type': handler, 'text': encode(message_type, **payload)}
+    if coalesce:
+        event['coalesce'] = coalesce
+    return event
+
+
+async def group_send(groups, event):
+    """Send one event to several groups"""
+    channel_layer = get_channel_layer()
+    for group in groups:
+        await channel_layer.group_send(group, event)
+
+
+def send(groups, handler, message_type, coalesce=None, **payload):
+    """Encode once and send to every group, from synchronous code"""
+    async_to_sync(group_send)(list(groups), message(handler, message_type, coalesce, **payload))
+
+
+def global_feed_group(channel_name):
+    """The global feed partition a connection joins"""
+    partition = binascii.crc32(channel_name.encode()) % settings.GLOBAL_FEED_PARTITIONS
+    return f'{GLOBAL_FEED_GROUP}_{partition}'
+
+
+def global_feed_groups():
+    """Every global feed partition, to send a global notification to"""
+    return [f'{GLOBAL_FEED_GROUP}_{partition}' for partition in range(settings.GLOBAL_FEED_PARTITIONS)]
@@ -1,15 +1,75 @@
+from collections import OrderedDict
+from urllib.parse import parse_qs
+import asyncio
 import json
 import logging
+import os
+import socket
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
+from apps.auctions.exceptions import BidRejected
+from .broadcast import global_feed_group
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Identifies the gateway process serving a connection
+GATEWAY_ID = f'{socket.gethostname()}:{os.getpid()}'
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+
+@database_sync_to_async
+def place_bid(user_id, auction_id, amount, max_bid):
+    """Place a bid through the bid engine; returns the reply frame for the bidder"""
+    from apps.auctions.bidding import place_bid as engine_place_bid
+
+    try:
+        bid = engine_place_bid(int(auction_id), User.objects.get(pk=user_id), amount, max_bid)
+    except BidRejected as e:
+        return {'type': 'bid_rejected', 'auction_id': auction_id, 'message': str(e)}
+    except (ObjectDoesNotExist, TypeError, ValueError):
+        return {'type': 'bid_rejected', 'auction_id': auction_id, 'message': 'Auction not found'}
+
+    return {
+        'type': 'bid_accepted',
+        'bid': {
+            'amount': str(bid.amount),
+            'status': bid.status,
+            'auction_id': auction_id
+        }
+    }
+
+
+@database_sync_to_async
+def resume_auction(auction_id, since):
+    """Frames bringing a client up to date on an auction after a reconnect (see fanout.resume)"""
+    from apps.auctions import fanout
+
+    return fanout.resume(int(auction_id), since)
+
+
+class BroadcastConsumer(AsyncWebsocketConsumer):
+    """Base consumer that forwards pre-encoded group events verbatim"""
+
+    def encode_event(self, event, message_type=None, key=None):
+        """Text of a group event, encoded here only if the sender did not (see broadcast.py)"""
+        text = event.get('text')
+        if text is None:
+            if message_type is None:
+                text = json.dumps(event)
+            else:
+                text = json.dumps({'type': message_type, key: event[key]})
+        return text
+
+    async def send_event(self, event, message_type=None, key=None):
+        """Send a group event to WebSocket"""
+        await self.send(text_data=self.encode_event(event, message_type, key))
+
+
+class NotificationConsumer(BroadcastConsumer):
     """Basic notification consumer for authenticated users"""
 
     async def connect(self):
@@ -34,7 +94,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         # Send connection confirmation
         await self.send(text_data=json.dumps({
             'type': 'connection_established',
-            'message': 'Connected to notifications'
+            'message': 'Connected to notifications',
+            'gateway': GATEWAY_ID
         }))
 
     async def disconnect(self, close_code):
@@ -86,20 +147,18 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     # Handle messages sent to the group
     async def notification_message(self, event):
         """Send notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'notification',
-            'notification': event['notification']
-        }))
+        await self.send_event(event, 'notification', 'notification')
 
     async def notification_update(self, event):
         """Send notification update to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'notification_update',
-            'update': event['update']
-        }))
+        await self.send_event(event, 'notification_update', 'update')
+
+    async def auction_bid(self, event):
+        """Send a bid update on a watched auction to WebSocket"""
+        await self.send_event(event, 'bid_update', 'bid')
 
 
-class UserNotificationConsumer(AsyncWebsocketConsumer):
+class UserNotificationConsumer(BroadcastConsumer):
     """User-specific notification consumer"""
 
     async def connect(self):
@@ -167,17 +226,18 @@ class UserNotificationConsumer(AsyncWebsocketConsumer):
     # Handle messages sent to the group
     async def notification_message(self, event):
         """Send notification to WebSocket"""
-        await self.send(text_data=json.dumps(event))
+        await self.send_event(event)
 
     async def auction_update(self, event):
         """Send auction update to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'auction_update',
-            'update': event['update']
-        }))
+        await self.send_event(event, 'auction_update', 'update')
+
+    async def auction_bid(self, event):
+        """Send a bid update on a watched or subscribed auction to WebSocket"""
+        await self.send_event(event, 'bid_update', 'bid')
 
 
-class AdminNotificationConsumer(AsyncWebsocketConsumer):
+class AdminNotificationConsumer(BroadcastConsumer):
     """Admin notification broadcasting consumer"""
 
     async def connect(self):
@@ -228,10 +288,10 @@ class AdminNotificationConsumer(AsyncWebsocketConsumer):
     # Handle messages sent to the group
     async def admin_message(self, event):
         """Send admin message to WebSocket"""
-        await self.send(text_data=json.dumps(event))
+        await self.send_event(event)
 
 
-class AuctionNotificationConsumer(AsyncWebsocketConsumer):
+class AuctionNotificationConsumer(BroadcastConsumer):
     """Auction-specific notification consumer"""
 
     async def connect(self):
@@ -253,6 +313,11 @@ class AuctionNotificationConsumer(AsyncWebsocketConsumer):
         await self.accept()
         logger.info(f"User {self.user.id} connected to auction {self.auction_id} notifications")
 
+        # Reconnecting clients pass the last seq they saw: ?since=<seq>
+        since = parse_qs(self.scope.get('query_string', b'').decode()).get('since')
+        if since:
+            await self.handle_resume(since[0])
+
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         if hasattr(self, 'group_name'):
@@ -269,26 +334,22 @@ class AuctionNotificationConsumer(AsyncWebsocketConsumer):
 
             if message_type == 'place_bid':
                 await self.handle_place_bid(data)
+            elif message_type == 'resume':
+                await self.handle_resume(data.get('since'))
             elif message_type == 'watch_auction':
                 await self.handle_watch_auction()
         except json.JSONDecodeError:
             pass
 
+    async def handle_resume(self, since):
+        """Send the updates missed since seq ``since``, or a snapshot"""
+        for frame in await resume_auction(self.auction_id, since):
+            await self.send(text_data=json.dumps(frame))
+
     async def handle_place_bid(self, data):
-        """Handle bid placement"""
-        bid_amount = data.get('amount')
-        # Here you would process the bid and notify other users
-        await self.channel_layer.group_send(
-            self.group_name,
-            {
-                'type': 'bid_placed',
-                'bid': {
-                    'amount': bid_amount,
-                    'user': self.user.username,
-                    'auction_id': self.auction_id
-                }
-            }
-        )
+        """Handle bid placement; the update reaches the group once the bid commits"""
+        reply = await place_bid(self.user.pk, self.auction_id, data.get('amount'), data.get('max_bid'))
+        await self.send(text_data=json.dumps(reply))
 
     async def handle_watch_auction(self):
         """Handle watching auction"""
@@ -296,29 +357,20 @@ class AuctionNotificationConsumer(AsyncWebsocketConsumer):
         pass
 
     # Handle messages sent to the group
-    async def bid_placed(self, event):
-        """Send bid notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'bid_placed',
-            'bid': event['bid']
-        }))
+    async def auction_bid(self, event):
+        """Send a committed bid update to WebSocket"""
+        await self.send_event(event, 'bid_update', 'bid')
 
     async def auction_ended(self, event):
         """Send auction end notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'auction_ended',
-            'auction': event['auction']
-        }))
+        await self.send_event(event, 'auction_ended', 'auction')
 
     async def auction_extended(self, event):
         """Send auction extension notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'auction_extended',
-            'extension': event['extension']
-        }))
+        await self.send_event(event, 'auction_extended', 'extension')
 
 
-class NotificationFeedConsumer(AsyncWebsocketConsumer):
+class NotificationFeedConsumer(BroadcastConsumer):
     """Global notification feed consumer"""
 
     async def connect(self):
@@ -329,7 +381,8 @@ class NotificationFeedConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
-        self.group_name = 'global_notification_feed'
+        # One partition of the feed; senders address all of them
+        self.group_name = global_feed_group(self.channel_name)
 
         await self.channel_layer.group_add(
             self.group_name,
@@ -339,6 +392,12 @@ class NotificationFeedConsumer(AsyncWebsocketConsumer):
         await self.accept()
         logger.info(f"User {self.user.id} connected to global notification feed")
 
+        await self.send(text_data=json.dumps({
+            'type': 'connection_established',
+            'message': 'Connected to global feed',
+            'gateway': GATEWAY_ID
+        }))
+
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
         if hasattr(self, 'group_name'):
@@ -369,14 +428,208 @@ class NotificationFeedConsumer(AsyncWebsocketConsumer):
     # Handle messages sent to the group
     async def global_notification(self, event):
         """Send global notification to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'global_notification',
-            'notification': event['notification']
-        }))
+        await self.send_event(event, 'global_notification', 'notification')
 
     async def system_message(self, event):
         """Send system message to WebSocket"""
+        await self.send_event(event, 'system_message', 'message')
+
+
+class StreamConsumer(BroadcastConsumer):
+    """
+    One multiplexed connection per client.
+
+    The client subscribes to topics with ``{"type": "subscribe", "topic":
+    ...}`` frames (and leaves them with ``unsubscribe``):
+
+    * ``user``: the user's own notifications (``user:<id>`` for staff);
+    * ``auction:<id>``: bids and updates on one auction; the subscription
+      is followed by a snapshot of the lot, or only the updates missed
+      if the frame carries the last ``since`` seq the client saw;
+    * ``feed``: the global notification feed;
+    * ``admin``: admin notifications, staff only.
+
+    Bids can be placed with ``{"type": "place_bid", "auction_id": ...,
+    "amount": ...}``. A connection holds at most
+    ``STREAM_MAX_SUBSCRIPTIONS`` topics.
+
+    Outgoing events go through a per-connection outbox sent at no more
+    than ``STREAM_SEND_RATE`` frames per second. While the connection is
+    behind, events with the same coalesce key (bid updates on one lot)
+    replace each other in place. If the outbox still grows past
+    ``STREAM_OUTBOX_SIZE`` the client is not keeping up and is
+    disconnected with code 4008.
+    """
+
+    SLOW_CONSUMER_CODE = 4008
+
+    async def connect(self):
+        """Handle WebSocket connection"""
+        self.user = self.scope["user"]
+
+        if self.user.is_anonymous:
+            await self.close()
+            return
+
+        self.groups = set()
+        self.outbox = OrderedDict()
+        self.outbox_ready = asyncio.Event()
+        self.sequence = 0
+        self.writer = None
+
+        await self.accept()
+        self.writer = asyncio.ensure_future(self.drain_outbox())
+        logger.info(f"User {self.user.id} connected to stream")
+
         await self.send(text_data=json.dumps({
-            'type': 'system_message',
-            'message': event['message']
+            'type': 'connection_established',
+            'message': 'Connected to stream',
+            'gateway': GATEWAY_ID
         }))
+
+    async def disconnect(self, close_code):
+        """Handle WebSocket disconnection"""
+        if getattr(self, 'writer', None):
+            self.writer.cancel()
+        for group in getattr(self, 'groups', ()):
+            await self.channel_layer.group_discard(group, self.channel_name)
+        logger.info(f"User disconnected from stream: {close_code}")
+
+    async def receive(self, text_data):
+        """Handle frames from WebSocket"""
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send_error('Invalid JSON')
+            return
+
+        message_type = data.get('type')
+        if message_type == 'subscribe':
+            await self.handle_subscribe(data.get('topic'), data.get('since'))
+        elif message_type == 'unsubscribe':
+            await self.handle_unsubscribe(data.get('topic'))
+        elif message_type == 'place_bid':
+            reply = await place_bid(
+                self.user.pk, data.get('auction_id'), data.get('amount'), data.get('max_bid')
+            )
+            await self.send(text_data=json.dumps(reply))
+        elif message_type == 'ping':
+            await self.send(text_data=json.dumps({'type': 'pong'}))
+
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'error', 'message': message}))
+
+    def group_for(self, topic):
+        """Group behind a topic, or None if the user may not subscribe to it"""
+        if not isinstance(topic, str):
+            return None
+        name, _, ident = topic.partition(':')
+        if name == 'user':
+            if not ident or int(ident) == self.user.id or self.user.is_staff:
+                return f'user_{ident or self.user.id}_notifications'
+        elif name == 'auction' and ident.isdigit():
+            return f'auction_{ident}_notifications'
+        elif name == 'feed' and not ident:
+            return global_feed_group(self.channel_name)
+        elif name == 'admin' and not ident and self.user.is_staff:
+            return 'admin_notifications'
+        return None
+
+    async def handle_subscribe(self, topic, since=None):
+        """
+        Subscribe the connection to a topic. Auction topics are followed by
+        the updates missed since seq ``since``, or a snapshot of the lot.
+        """
+        try:
+            group = self.group_for(topic)
+        except ValueError:
+            group = None
+        if group is None:
+            await self.send_error(f'Cannot subscribe to {topic}')
+            return
+
+        if group not in self.groups:
+            if len(self.groups) >= settings.STREAM_MAX_SUBSCRIPTIONS:
+                await self.send_error(
+                    f'Subscription limit of {settings.STREAM_MAX_SUBSCRIPTIONS} reached'
+                )
+                return
+            self.groups.add(group)
+            await self.channel_layer.group_add(group, self.channel_name)
+
+        await self.send(text_data=json.dumps({'type': 'subscribed', 'topic': topic}))
+
+        if topic.startswith('auction:'):
+            for frame in await resume_auction(topic.partition(':')[2], since):
+                await self.send(text_data=json.dumps(frame))
+
+    async def handle_unsubscribe(self, topic):
+        """Unsubscribe the connection from a topic"""
+        try:
+            group = self.group_for(topic)
+        except ValueError:
+            group = None
+        if group in self.groups:
+            self.groups.discard(group)
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send(text_data=json.dumps({'type': 'unsubscribed', 'topic': topic}))
+
+    async def send_event(self, event, message_type=None, key=None):
+        """Queue a group event in the outbox, replacing any it supersedes"""
+        coalesce = event.get('coalesce')
+        if coalesce is None:
+            self.sequence += 1
+            coalesce = self.sequence
+        self.outbox[coalesce] = self.encode_event(event, message_type, key)
+
+        if len(self.outbox) > settings.STREAM_OUTBOX_SIZE:
+            logger.warning(f"Closing slow stream connection of user {self.user.id}")
+            self.outbox.clear()
+            await self.close(code=self.SLOW_CONSUMER_CODE)
+            return
+        self.outbox_ready.set()
+
+    async def drain_outbox(self):
+        """Send queued events in order, at most STREAM_SEND_RATE per second"""
+        interval = 1 / settings.STREAM_SEND_RATE
+        next_send = 0
+        while True:
+            await self.outbox_ready.wait()
+            while self.outbox:
+                delay = next_send - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    if not self.outbox:
+                        break
+                _, text = self.outbox.popitem(last=False)
+                await self.send(text_data=text)
+                next_send = max(next_send, time.monotonic()) + interval
+            self.outbox_ready.clear()
+
+    # Handle messages sent to the subscribed groups
+    async def notification_message(self, event):
+        await self.send_event(event, 'notification', 'notification')
+
+    async def notification_update(self, event):
+        await self.send_event(event, 'notification_update', 'update')
+
+    async def auction_bid(self, event):
+        await self.send_event(event, 'bid_update', 'bid')
+
+    async def auction_update(self, event):
+        await self.send_event(event, 'auction_update', 'update')
+
+    async def auction_ended(self, event):
+        await self.send_event(event, 'auction_ended', 'auction')
+
+    async def auction_extended(self, event):
+        await self.send_event(event, 'auction_extended', 'extension')
+
+    async def global_notification(self, event):
+        await self.send_event(event, 'global_notification', 'notification')
+
+    async def system_message(self, event):
+        await self.send_event(event, 'system_message', 'message')
+
+    async def admin_message(self, event):
+        await self.send_event(event)
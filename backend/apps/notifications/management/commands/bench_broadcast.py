@@ -0,0 +1,77 @@
+"""
+Benchmark delivering one group event to many sockets.
+
+Simulates the fan-out step of a channel-layer group send: the same event
+is handed to the ``auction_bid`` handler of N auction consumers whose
+socket writes go to a sink. Runs it once with a plain event that each
+consumer encodes itself and once with a pre-encoded event from
+apps.notifications.broadcast, and reports CPU time per event. The channel
+layer's own transport is not included; no Redis or database is needed.
+
+    python manage.py bench_broadcast --sockets 10000 --events 20
+"""
+from datetime import datetime, timezone
+from decimal import Decimal
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.auctions import fanout
+from apps.notifications import broadcast
+from apps.notifications.consumers import AuctionNotificationConsumer
+
+
+class Command(BaseCommand):
+    help = 'Measure per-event CPU cost of delivering a group event to many sockets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sockets', type=int, default=10000)
+        parser.add_argument('--events', type=int, default=20)
+
+    def handle(self, *args, **options):
+        sent = []
+
+        async def sink(message):
+            sent.append(message)
+
+        consumers = []
+        for _ in range(options['sockets']):
+            consumer = AuctionNotificationConsumer()
+            consumer.base_send = sink
+            consumers.append(consumer)
+
+        def events(encoded):
+            for number in range(options['events']):
+                bid = fanout.encode(1, {
+                    'current_price': Decimal('100.00') + number,
+                    'total_bids': number + 1,
+                    'end_time': datetime.now(timezone.utc),
+                    'leading_bidder': number % 7 + 1,
+                })
+                if encoded:
+                    yield broadcast.message('auction.bid', 'bid_update', bid=bid)
+                else:
+                    yield {'type': 'auction.bid', 'bid': bid}
+
+        async def deliver(batch):
+            for event in batch:
+                for consumer in consumers:
+                    await consumer.auction_bid(event)
+
+        results = {}
+        for name, encoded in (('per socket', False), ('pre-encoded', True)):
+            batch = list(events(encoded))
+            sent.clear()
+            started = time.process_time()
+            asyncio.run(deliver(batch))
+            elapsed = time.process_time() - started
+            results[name] = elapsed / len(batch)
+            self.stdout.write(
+                f"{name:<12} {results[name] * 1000:>9.2f} ms CPU per event, "
+                f"{results[name] / len(consumers) * 1e6:>6.2f} us per socket "
+                f"({len(sent)} frames)"
+            )
+
+        speedup = results['per socket'] / results['pre-encoded'] if results['pre-encoded'] else float('inf')
+        self.stdout.write(self.style.SUCCESS(f"Pre-encoded delivery is {speedup:.1f}x cheaper per event"))
@@ -0,0 +1,152 @@
+"""
+Load harness for the WebSocket gateway tier.
+
+Opens many authenticated connections to the global feed through nginx (or
+a single gateway), records which gateway process accepted each one, then
+broadcasts timestamped events to every feed partition through the channel
+layer and measures how long each takes to reach each socket. Needs the
+``websockets`` package, the database (for sessions of existing users) and
+the same channel layer hosts as the gateways.
+
+    python manage.py bench_gateway ws://localhost/ws/feed/ --connections 5000
+    python manage.py bench_gateway ws://localhost/ws/feed/ --broadcasts 100 --interval 0.1
+"""
+from collections import Counter
+from importlib import import_module
+import asyncio
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.notifications import broadcast
+
+User = get_user_model()
+
+
+def _percentile(values, percent):
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = 'Measure connections per gateway process and broadcast latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Global feed URL, e.g. ws://localhost/ws/feed/')
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=200, help='Connections opened at once')
+        parser.add_argument('--broadcasts', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=0.2, help='Seconds between broadcasts')
+        parser.add_argument('--users', type=int, default=100, help='Distinct users to connect as')
+
+    def handle(self, *args, **options):
+        try:
+            import websockets
+        except ImportError:
+            raise CommandError("The websockets package is required for this benchmark")
+
+        cookies = self._session_cookies(options['users'])
+        if not cookies:
+            raise CommandError("No active users to connect as")
+
+        asyncio.run(self._run(websockets, cookies, options))
+
+    def _session_cookies(self, count):
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+        cookies = []
+        for user in User.objects.filter(is_active=True).order_by('id')[:count]:
+            session = SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            cookies.append(f'{settings.SESSION_COOKIE_NAME}={session.session_key}')
+        return cookies
+
+    async def _run(self, websockets, cookies, options):
+        gateways = Counter()
+        latencies = []
+        failures = Counter()
+        sockets = []
+        gate = asyncio.Semaphore(options['concurrency'])
+
+        async def open_connection(number):
+            async with gate:
+                try:
+                    socket = await websockets.connect(
+                        options['url'],
+                        extra_headers={'Cookie': cookies[number % len(cookies)]},
+                        max_queue=None,
+                        open_timeout=30,
+                    )
+                    hello = json.loads(await asyncio.wait_for(socket.recv(), 30))
+                except Exception as exc:
+                    failures[type(exc).__name__] += 1
+                    return
+                gateways[hello.get('gateway', 'unknown')] += 1
+                sockets.append(socket)
+
+        async def read(socket):
+            try:
+                async for raw in socket:
+                    received = time.time()
+                    data = json.loads(raw)
+                    notification = data.get('notification') or {}
+                    if data.get('type') == 'global_notification' and 'sent_at' in notification:
+                        latencies.append(received - notification['sent_at'])
+            except Exception:
+                failures['dropped'] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(open_connection(n) for n in range(options['connections'])))
+        connect_time = time.perf_counter() - started
+
+        self.stdout.write(
+            f"Opened {len(sockets)}/{options['connections']} connections in {connect_time:.1f}s "
+            f"({len(sockets) / connect_time if connect_time else 0:.0f}/s)"
+        )
+        if failures:
+            self.stdout.write(f"Failures: {dict(failures)}")
+        if gateways:
+            counts = sorted(gateways.values())
+            self.stdout.write(
+                f"{len(gateways)} gateway processes, connections per process "
+                f"min {counts[0]} / mean {statistics.mean(counts):.0f} / max {counts[-1]}"
+            )
+            for gateway, count in gateways.most_common():
+                self.stdout.write(f"  {gateway:<40} {count:>7}")
+        if not sockets:
+            return
+
+        readers = [asyncio.ensure_future(read(socket)) for socket in sockets]
+        groups = broadcast.global_feed_groups()
+        for number in range(options['broadcasts']):
+            event = broadcast.message(
+                'global.notification', 'global_notification',
+                notification={'bench': number, 'sent_at': time.time()},
+            )
+            await broadcast.group_send(groups, event)
+            await asyncio.sleep(options['interval'])
+
+        # Let the last broadcast drain
+        await asyncio.sleep(max(2.0, options['interval'] * 5))
+        for socket in sockets:
+            await socket.close()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        expected = len(sockets) * options['broadcasts']
+        self.stdout.write(f"Delivered {len(latencies)}/{expected} broadcast messages")
+        if latencies:
+            latencies.sort()
+            self.stdout.write(
+                "Broadcast latency ms: "
+                + "  ".join(
+                    f"p{percent} {_percentile(latencies, percent) * 1000:.1f}"
+                    for percent in (50, 90, 99)
+                )
+                + f"  max {latencies[-1] * 1000:.1f}"
+            )
@@ -17,4 +17,7 @@ websocket_urlpatterns = [
 
     # Global notification feed
     re_path(r'ws/feed/$', consumers.NotificationFeedConsumer.as_asgi()),
+
+    # Multiplexed stream: one connection subscribing to any of the above
+    re_path(r'ws/stream/$', consumers.StreamConsumer.as_asgi()),
 ]
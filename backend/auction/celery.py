@@ -33,8 +33,8 @@ app.conf.update(
     result_expires=3600,  # 1 hour
     task_routes={
         'apps.auctions.tasks.process_bid': {'queue': 'auction_bids'},
-        'apps.auctions.tasks.check_auction_endings': {'queue': 'auction_management'},
         'apps.auctions.tasks.send_auction_reminders': {'queue': 'notifications'},
+        'apps.auctions.tasks.send_bid_update_to_watchers': {'queue': 'notifications'},
         'apps.notifications.tasks.send_notification': {'queue': 'notifications'},
         'apps.notifications.tasks.send_bulk_notification': {'queue': 'notifications'},
         'apps.accounts.tasks.send_welcome_email': {'queue': 'emails'},
@@ -42,25 +42,8 @@ app.conf.update(
     },
 )
 
-# Optional configuration, see the application user guide.
-app.conf.beat_schedule = {
-    'check-auction-endings': {
-        'task': 'apps.auctions.tasks.check_auction_endings',
-        'schedule': 60.0,  # Run every minute
-    },
-    'send-auction-reminders': {
-        'task': 'apps.auctions.tasks.send_auction_reminders',
-        'schedule': 300.0,  # Run every 5 minutes
-    },
-    'cleanup-expired-notifications': {
-        'task': 'apps.notifications.tasks.cleanup_expired_notifications',
-        'schedule': 3600.0,  # Run every hour
-    },
-    'update-auction-stats': {
-        'task': 'apps.auctions.tasks.update_auction_statistics',
-        'schedule': 1800.0,  # Run every 30 minutes
-    },
-}
+# The beat schedule is CELERY_BEAT_SCHEDULE in settings, loaded above
+
 
 @app.task(bind=True)
 def debug_task(self):
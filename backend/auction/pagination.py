@@ -0,0 +1,123 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of the last row seen, ``(timestamp,
+id)``, instead of an OFFSET, so every page costs one index range scan no
+matter how deep it is and no COUNT(*) is run. The cursor is opaque to
+clients: the direction, the timestamp in microseconds and the id packed
+into 17 bytes and base64-encoded (23 characters, short enough for Telegram
+callback data).
+
+Usage in an APIView::
+
+    paginator = KeysetPagination('-created_at')
+    page = paginator.paginate_queryset(queryset, request)
+    return Response(paginator.get_paginated_data('bids', serializer(page, many=True).data))
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timezone as dt_timezone
+import binascii
+import struct
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound  # type: ignore
+
+CURSOR_FORMAT = struct.Struct('>?qq')
+
+
+def encode_cursor(value, pk, reverse=False):
+    """Encode a ``(datetime, id)`` position as an opaque cursor"""
+    micros = round(value.timestamp() * 1_000_000)
+    raw = CURSOR_FORMAT.pack(reverse, micros, pk)
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into ``(datetime, id, reverse)``"""
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        reverse, micros, pk = CURSOR_FORMAT.unpack(raw)
+        value = datetime.fromtimestamp(micros / 1_000_000, tz=dt_timezone.utc)
+    except (binascii.Error, struct.error, ValueError, OverflowError):
+        raise NotFound("Invalid cursor")
+    return value, pk, reverse
+
+
+class KeysetPagination:
+    """Paginate a queryset on a timestamp field with the primary key as tie-breaker"""
+
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'per_page'
+
+    def __init__(self, ordering='-created_at', page_size=None):
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+        if page_size:
+            self.page_size = page_size
+
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _seek(self, queryset, value, pk, forward):
+        # Rows strictly after (value, pk) in the walking direction. The
+        # redundant range on the field lets Postgres start the index scan
+        # at the cursor instead of filtering from the top.
+        after = 'lt' if forward == self.descending else 'gt'
+        bound = 'lte' if after == 'lt' else 'gte'
+        return queryset.filter(
+            Q(**{f'{self.field}__{bound}': value}),
+            Q(**{f'{self.field}__{after}': value}) | Q(**{self.field: value, f'pk__{after}': pk}),
+        )
+
+    def _order(self, queryset, forward):
+        descending = self.descending == forward
+        prefix = '-' if descending else ''
+        return queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+
+    def paginate_queryset(self, queryset, request):
+        """Return the requested page as a list and remember the neighbouring cursors"""
+        size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        forward = True
+        if cursor:
+            value, pk, reverse = decode_cursor(cursor)
+            forward = not reverse
+            queryset = self._seek(queryset, value, pk, forward)
+
+        rows = list(self._order(queryset, forward)[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if not forward:
+            rows.reverse()
+
+        if rows:
+            first, last = rows[0], rows[-1]
+            # Going forward there is a next page only if the extra row came
+            # back; a previous page exists whenever we arrived via a cursor.
+            # Walking backwards the logic mirrors.
+            if (has_more if forward else bool(cursor)):
+                self.next_cursor = encode_cursor(getattr(last, self.field), last.pk)
+            if (bool(cursor) if forward else has_more):
+                self.previous_cursor = encode_cursor(getattr(first, self.field), first.pk, reverse=True)
+
+        return rows
+
+    def get_paginated_data(self, key, data):
+        """Wrap serialized rows with the pagination links"""
+        return {
+            key: data,
+            'next': self.next_cursor,
+            'previous': self.previous_cursor,
+            'has_next': self.next_cursor is not None,
+            'has_previous': self.previous_cursor is not None,
+        }
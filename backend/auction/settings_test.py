@@ -0,0 +1,24 @@
+"""
+Settings for the test suite.
+
+Tests need the Postgres database from the main settings; Redis, the
+channel layer, Celery and email are replaced by in-process fakes.
+"""
+from fakeredis import FakeConnection
+
+from .settings import *  # noqa: F401,F403
+from .settings import CACHES
+
+CACHES['default']['OPTIONS']['CONNECTION_POOL_KWARGS'] = {'connection_class': FakeConnection}
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+CELERY_TASK_ALWAYS_EAGER = True
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
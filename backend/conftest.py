@@ -0,0 +1,56 @@
+from datetime import timedelta
+from decimal import Decimal
+import itertools
+
+import pytest
+from django.utils import timezone
+from django_redis import get_redis_connection
+
+_sequence = itertools.count(1)
+
+
+@pytest.fixture(autouse=True)
+def redis():
+    """The fake Redis behind the default cache, emptied for every test"""
+    connection = get_redis_connection('default')
+    connection.flushall()
+    return connection
+
+
+@pytest.fixture
+def make_user(db):
+    from apps.accounts.models import User
+
+    def make_user(balance='0.00', **fields):
+        number = next(_sequence)
+        return User.objects.create_user(
+            username=f'user{number}',
+            email=f'user{number}@example.com',
+            password='password',
+            balance=Decimal(balance),
+            **fields,
+        )
+
+    return make_user
+
+
+@pytest.fixture
+def make_item(db, make_user):
+    from apps.auctions.models import AuctionItem, Category
+
+    def make_item(seller=None, starting_price='10.00', **fields):
+        number = next(_sequence)
+        category = Category.objects.create(name=f'Category {number}')
+        fields.setdefault('end_time', timezone.now() + timedelta(hours=1))
+        return AuctionItem.objects.create(
+            title=f'Item {number}',
+            description='Test item',
+            category=category,
+            seller=seller or make_user(),
+            starting_price=Decimal(starting_price),
+            min_bid_increment=Decimal('1.00'),
+            status='active',
+            **fields,
+        )
+
+    return make_item
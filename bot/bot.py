@@ -367,7 +367,7 @@ class AuctionBot:
             await self.send_not_linked_message(message)
             return
 
-        await self.show_items_list(message, page=1)
+        await self.show_items_list(message)
 
     async def cmd_turn_notifications(self, message: Message):
         """Handle /turn_notifications command"""
@@ -501,7 +501,7 @@ class AuctionBot:
                 await self.cmd_balance(callback.message)
 
             elif data == "browse_items":
-                await self.show_items_list(callback.message, page=1)
+                await self.show_items_list(callback.message)
 
             elif data == "view_history":
                 await self.cmd_history(callback.message)
@@ -509,9 +509,9 @@ class AuctionBot:
             elif data == "refresh_balance":
                 await self.cmd_balance(callback.message)
 
-            elif data.startswith("items_page_"):
-                page = int(data.split("_")[-1])
-                await self.show_items_list(callback.message, page=page, edit=True)
+            elif data.startswith("items_cursor_"):
+                cursor = data[len("items_cursor_"):]
+                await self.show_items_list(callback.message, cursor=cursor, edit=True)
 
             elif data.startswith("item_"):
                 item_id = data.split("_")[1]
@@ -529,10 +529,10 @@ class AuctionBot:
             logger.error(f"Error handling callback {data}: {e}")
             await callback.answer("❌ Error processing request")
 
-    async def show_items_list(self, message: Message, page: int = 1, edit: bool = False):
+    async def show_items_list(self, message: Message, cursor: Optional[str] = None, edit: bool = False):
         """Show paginated list of auction items"""
         try:
-            items = await self.get_auction_items(page=page, per_page=10)
+            items = await self.get_auction_items(cursor=cursor, per_page=10)
 
             if not items or not items.get('items'):
                 text = "🛍️ <b>Auction Items</b>\n\nNo items found."
@@ -567,18 +567,18 @@ class AuctionBot:
                     callback_data=f"item_{item['id']}"
                 ))
 
-            # Add pagination buttons
+            # Add pagination buttons (cursors are short enough for callback data)
             pagination_buttons = []
-            if items.get('has_previous'):
+            if items.get('previous'):
                 pagination_buttons.append(InlineKeyboardButton(
                     text="⬅️ Previous",
-                    callback_data=f"items_page_{page-1}"
+                    callback_data=f"items_cursor_{items['previous']}"
                 ))
 
-            if items.get('has_next'):
+            if items.get('next'):
                 pagination_buttons.append(InlineKeyboardButton(
                     text="Next ➡️",
-                    callback_data=f"items_page_{page+1}"
+                    callback_data=f"items_cursor_{items['next']}"
                 ))
 
             if pagination_buttons:
@@ -770,14 +770,15 @@ class AuctionBot:
 
         return None
 
-    async def get_auction_items(self, page: int = 1, per_page: int = 10) -> Optional[Dict]:
+    async def get_auction_items(self, cursor: Optional[str] = None, per_page: int = 10) -> Optional[Dict]:
         """Get auction items from backend"""
         try:
             params = {
-                'page': page,
                 'per_page': per_page,
                 'status': 'active'
             }
+            if cursor:
+                params['cursor'] = cursor
 
             async with self.http_client as client:
                 response = await client.get(